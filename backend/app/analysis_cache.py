@@ -0,0 +1,109 @@
+from typing import Dict, Any, Optional, BinaryIO
+import hashlib
+import json
+import os
+import re
+
+from .file_analyzer import ANALYZER_VERSION
+from .metrics import record_cache_lookup
+
+# Read uploads in 1 MiB chunks so multi-GB files are hashed without loading them
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_CONTENT_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+# Longer extensions or MIME types are rejected rather than put in a file name
+MAX_FILE_TYPE_LENGTH = 64
+
+def hash_stream(stream: BinaryIO, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Compute the SHA-256 hex digest of a binary stream, reading it chunk by chunk."""
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+def is_valid_content_hash(content_hash: str) -> bool:
+    """Check that a client-supplied hash is a lowercase SHA-256 hex digest."""
+    return bool(_CONTENT_HASH_RE.match(content_hash))
+
+def _escape_file_type(file_type: str) -> str:
+    # Injective and filename-safe: anything but [a-z0-9] becomes _<hex>
+    return re.sub(r"[^a-z0-9]", lambda m: "_%02x" % ord(m.group()), file_type.lower())
+
+class AnalysisCache:
+    """
+    Persistent cache of file analysis results keyed by content hash, file type and
+    analyzer version. The same bytes uploaded as ``.csv`` and as ``.txt`` are analyzed
+    differently, so they are cached separately.
+
+    Each entry is a small JSON file on disk, so the cache survives restarts and is
+    shared by every worker process pointing at the same directory. The modification
+    time of an entry doubles as its last-access time: hits touch the file, and when
+    the total size exceeds ``max_bytes`` the least recently used entries are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, content_hash: str, file_type: str) -> str:
+        if not is_valid_content_hash(content_hash):
+            raise ValueError(f"Invalid content hash: {content_hash}")
+        if len(file_type) > MAX_FILE_TYPE_LENGTH:
+            raise ValueError(f"File type longer than {MAX_FILE_TYPE_LENGTH} characters")
+        name = f"v{ANALYZER_VERSION}-{_escape_file_type(file_type)}-{content_hash}.json"
+        return os.path.join(self.directory, name)
+
+    def get(self, content_hash: str, file_type: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis of a content hash uploaded as ``file_type``, or None on a miss."""
+        path = self._path(content_hash, file_type)
+        try:
+            with open(path) as f:
+                analysis = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            record_cache_lookup("file_analysis", hit=False)
+            return None
+        record_cache_lookup("file_analysis", hit=True)
+
+        # Mark the entry as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return analysis
+
+    def set(self, content_hash: str, file_type: str, analysis: Dict[str, Any]) -> None:
+        """Store an analysis result and evict old entries if the cache is over budget."""
+        path = self._path(content_hash, file_type)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(analysis, f)
+        # Atomic rename so concurrent readers never observe a partial entry
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
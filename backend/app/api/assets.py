@@ -0,0 +1,82 @@
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from .models import AssetManifest
+from ..assets import IMMUTABLE_CACHE_CONTROL, Asset, AssetBundle, parse_range
+from ..compression import parse_accept_encoding
+
+router = APIRouter()
+
+def _read(path: str, start: int = 0, length: int = -1) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+@router.get("/model-assets/{name}")
+async def get_asset(name: str, http_request: Request) -> Response:
+    """
+    Serve a content-hashed asset.
+
+    The body is the precompressed variant matching Accept-Encoding. Range requests are
+    answered from the uncompressed file with 206.
+    """
+    bundle: AssetBundle = http_request.app.state.assets
+    asset = bundle.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    etags = {asset.etag(encoding) for encoding in asset.files}
+    if_none_match = http_request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etags & {t.strip() for t in if_none_match.split(",")}):
+        return Response(status_code=304, headers={**headers, "ETag": asset.etag()})
+
+    range_header = http_request.headers.get("range")
+    if_range = http_request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == asset.etag()):
+        return await _range_response(asset, range_header, headers)
+
+    encoding = asset.negotiate(parse_accept_encoding(http_request.headers.get("accept-encoding", "")))
+    headers["ETag"] = asset.etag(encoding)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    body = await run_in_threadpool(_read, asset.files[encoding])
+    return Response(body, media_type=asset.content_type, headers=headers)
+
+async def _range_response(asset: Asset, range_header: str, headers: dict) -> Response:
+    size = asset.sizes["identity"]
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        body = await run_in_threadpool(_read, asset.files["identity"])
+        return Response(body, media_type=asset.content_type, headers={**headers, "ETag": asset.etag()})
+    start, end = byte_range
+    body = await run_in_threadpool(_read, asset.files["identity"], start, end - start + 1)
+    return Response(
+        body,
+        status_code=206,
+        media_type=asset.content_type,
+        headers={**headers, "ETag": asset.etag(), "Content-Range": f"bytes {start}-{end}/{size}"}
+    )
+
+@router.get("/pipelines/{pipeline_id}/assets", response_model=AssetManifest)
+async def get_pipeline_assets(pipeline_id: str, http_request: Request) -> AssetManifest:
+    """List the assets a stored pipeline needs, for preloading before the 3D view mounts."""
+    stored = http_request.app.state.pipeline_store.get(pipeline_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    bundle: AssetBundle = http_request.app.state.assets
+    component_ids = [c.get("id") for c in stored["pipeline"].get("components", []) if isinstance(c, dict)]
+    assets = bundle.manifest(component_ids)
+    return AssetManifest(
+        pipeline_id=pipeline_id,
+        assets=assets,
+        total_bytes=sum(a.get("size", 0) for a in assets)
+    )
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from .models import AlternativesRequest, ComponentSuggestionsResponse, NextComponentsRequest
+from ..transition_index import TransitionIndex
+
+router = APIRouter()
+
+@router.post("/pipelines/next-components", response_model=ComponentSuggestionsResponse)
+async def next_components(request: NextComponentsRequest, http_request: Request) -> ComponentSuggestionsResponse:
+    """Suggest the most likely next components for a pipeline being built"""
+    index: TransitionIndex = http_request.app.state.transition_index
+    return ComponentSuggestionsResponse(suggestions=index.next_components(request.components, request.limit))
+
+@router.post("/pipelines/alternatives", response_model=ComponentSuggestionsResponse)
+async def alternatives(request: AlternativesRequest, http_request: Request) -> ComponentSuggestionsResponse:
+    """Suggest compatible replacements for one node of a pipeline"""
+    index: TransitionIndex = http_request.app.state.transition_index
+    suggestions = index.alternatives(request.component_id, request.components, request.limit)
+    if suggestions is None:
+        raise HTTPException(status_code=404, detail=f"Unknown component: {request.component_id}")
+    return ComponentSuggestionsResponse(suggestions=suggestions)
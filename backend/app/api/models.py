@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Literal
 
 class SearchStep(BaseModel):
@@ -20,6 +20,8 @@ class RecommendRequest(BaseModel):
     """Request to get component recommendations"""
     prompt: str
     mode: Literal['quick', 'agentic']
+    current_components: Optional[List[str]] = None  # ids already in the pipeline, excluded from results
+    limit: int = Field(5, ge=1, le=50)
 
 class RecommendResponse(BaseModel):
     """Response containing recommendations and any state updates"""
@@ -32,6 +34,12 @@ class PipelineRequest(BaseModel):
     prompt: str
     mode: Literal['quick', 'agentic']
     clarification_answers: Optional[Dict[str, str]] = None
+    use_cache: bool = True  # set to False to regenerate instead of reusing a similar request's pipeline
+    session_id: Optional[str] = None  # resume search and selection from this session's checkpoints
+
+class BatchPipelineRequest(BaseModel):
+    """Request to generate several pipelines in one call"""
+    requests: List[PipelineRequest]
 
 class PipelineResponse(BaseModel):
     """Response containing the generated pipeline"""
@@ -40,4 +48,138 @@ class PipelineResponse(BaseModel):
     name: str
     description: str
     search_steps: Optional[List[SearchStep]] = None
+    layout: Optional[Dict] = None  # layers and 2D/3D node positions
+    error: Optional[str] = None
+
+class JobResponse(BaseModel):
+    """State of a background job, including its result once finished"""
+    job_id: str
+    kind: str
+    status: Literal['queued', 'running', 'succeeded', 'failed']
+    created_at: float
+    updated_at: float
+    result: Optional[Dict] = None
     error: Optional[str] = None
+
+class SavePipelineRequest(BaseModel):
+    """Request to store a (possibly user-edited) pipeline as a new version"""
+    pipeline: Dict
+    parent_id: Optional[str] = None
+
+class PipelineSource(BaseModel):
+    """A prompt and set of clarification answers that produced a stored pipeline"""
+    prompt: str
+    mode: Optional[str] = None
+    clarification_answers: Optional[Dict[str, str]] = None
+    created_at: float
+
+class StoredPipeline(BaseModel):
+    """A pipeline from the store with its version link and provenance"""
+    id: str
+    parent_id: Optional[str] = None
+    created_at: float
+    pipeline: Dict
+    sources: List[PipelineSource]
+
+class PipelineSummary(BaseModel):
+    """Compact listing entry for a stored pipeline"""
+    id: str
+    parent_id: Optional[str] = None
+    created_at: float
+    name: Optional[str] = None
+    component_ids: List[str]
+
+class PipelineHistory(BaseModel):
+    """Version chain of a stored pipeline, oldest first, and the versions derived from it"""
+    id: str
+    versions: List[PipelineSummary]
+    children: List[PipelineSummary]
+
+class NextComponentsRequest(BaseModel):
+    """Pipeline being built, to suggest what comes next"""
+    components: List[str]  # component ids in pipeline order
+    limit: int = Field(5, ge=1, le=20)
+
+class AlternativesRequest(BaseModel):
+    """A node of a pipeline to suggest replacements for"""
+    component_id: str
+    components: List[str] = []  # the rest of the pipeline, for compatibility checks
+    limit: int = Field(5, ge=1, le=20)
+
+class ComponentSuggestion(BaseModel):
+    """A suggested component at edit time"""
+    id: str
+    name: str
+    type: str
+    score: float
+    reason: str
+
+class AssetEntry(BaseModel):
+    """An asset to preload, shared by the listed components"""
+    url: str  # hashed URL, or the catalog path if the asset wasn't built
+    source: str  # path referenced by the catalog
+    components: List[str]
+    content_type: Optional[str] = None
+    integrity: Optional[str] = None  # subresource integrity of the decoded bytes
+    size: Optional[int] = None
+    encoded_sizes: Dict[str, int] = {}
+
+class AssetManifest(BaseModel):
+    """Assets a stored pipeline needs"""
+    pipeline_id: str
+    assets: List[AssetEntry]
+    total_bytes: int
+
+class ProfileRequest(BaseModel):
+    """Components or code to dry-run on synthetic data"""
+    components: Optional[List[str]] = None  # catalog component ids
+    code: Optional[str] = None  # parsed for scikit-learn estimators, never executed
+    sizes: Optional[List[int]] = None  # rows; defaults to PROFILER_SIZES
+    columns: int = Field(20, ge=1, le=500)
+    dataset_hash: Optional[str] = None  # content hash from /analyze-file, to mimic an uploaded CSV
+
+class ProfileMeasurement(BaseModel):
+    """One workload run at one data size"""
+    rows: int
+    columns: int
+    status: Literal['ok', 'unavailable', 'error', 'timeout']
+    reason: Optional[str] = None
+    fit_ms: Optional[float] = None
+    transform_ms: Optional[float] = None
+    predict_ms: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    rss_increase_mb: Optional[float] = None
+
+class ComponentProfile(BaseModel):
+    """Measured performance of a component or estimator"""
+    component_id: Optional[str] = None
+    name: str
+    status: Literal['ok', 'partial', 'unavailable', 'unsupported', 'error', 'timeout']
+    reason: Optional[str] = None
+    measurements: List[ProfileMeasurement] = []
+    scaling_exponent: Optional[float] = None  # latency ~ rows^exponent
+    performance_impact: Dict[str, str] = {}
+    cached: bool = False
+
+class ProfileResponse(BaseModel):
+    """Profiles measured on this host"""
+    host: str
+    data_source: Literal['synthetic', 'dataset']
+    columns: int
+    sizes: List[int]
+    profiles: List[ComponentProfile]
+
+class SessionResponse(BaseModel):
+    """Checkpointed state of a generation session"""
+    session_id: str
+    created_at: float
+    updated_at: float
+    checkpoints: Dict[str, float]  # stage -> time it was checkpointed
+    clarification_questions: Optional[List[Dict]] = None
+    search_queries: Optional[List[str]] = None
+    selected_components: Optional[List[str]] = None
+    pipeline_ids: List[str]
+
+class ComponentSuggestionsResponse(BaseModel):
+    """Ranked component suggestions"""
+    suggestions: List[ComponentSuggestion]
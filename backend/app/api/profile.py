@@ -0,0 +1,93 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+
+from .models import ComponentProfile, ProfileRequest, ProfileResponse
+from ..analysis_cache import is_valid_content_hash
+from ..core.config import get_settings
+from ..file_analyzer import CSV_FILE_TYPES
+from ..profiler import PipelineProfiler, component_recipe, estimator_recipes, host_id
+
+router = APIRouter()
+
+# Data sizes a single request may ask for
+MAX_PROFILE_SIZES = 6
+
+@router.post("/profile-pipeline", response_model=ProfileResponse)
+async def profile_pipeline(request: ProfileRequest, http_request: Request) -> ProfileResponse:
+    """
+    Measure latency, peak memory and scaling of components on this host.
+
+    Catalog components run a fixed workload each; code is parsed for scikit-learn
+    estimators, which are then profiled. Nothing from the request is executed.
+    """
+    settings = get_settings()
+    catalog = {c.id: c for c in http_request.app.state.catalog}
+
+    targets = []
+    for component_id in request.components or []:
+        component = catalog.get(component_id)
+        if component is None:
+            raise HTTPException(status_code=400, detail=f"Unknown component: {component_id}")
+        targets.append((component_id, component.name, component_recipe(component)))
+    if request.code:
+        targets.extend((None, f"{r['module']}.{r['name']}", r) for r in estimator_recipes(request.code))
+    if not targets:
+        raise HTTPException(status_code=400, detail="Provide catalog components or code that uses scikit-learn estimators")
+
+    sizes = sorted(set(request.sizes or settings.PROFILER_SIZES))
+    if len(sizes) > MAX_PROFILE_SIZES or any(not 10 <= n <= settings.PROFILER_MAX_ROWS for n in sizes):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Up to {MAX_PROFILE_SIZES} sizes between 10 and {settings.PROFILER_MAX_ROWS} rows"
+        )
+
+    columns, column_stats, data_source = request.columns, None, "synthetic"
+    if request.dataset_hash:
+        if not is_valid_content_hash(request.dataset_hash):
+            raise HTTPException(status_code=400, detail="dataset_hash must be a lowercase SHA-256 hex digest")
+        analysis_cache = http_request.app.state.analysis_cache
+        analysis = next(
+            (a for a in (analysis_cache.get(request.dataset_hash, t) for t in CSV_FILE_TYPES) if a is not None),
+            None
+        )
+        if analysis is None:
+            raise HTTPException(status_code=404, detail="No analysis for this CSV, upload it to /analyze-file first")
+        profile = analysis.get("profile")
+        if not profile or not profile["numeric_columns"]:
+            raise HTTPException(status_code=400, detail="The dataset has no numeric columns to mimic")
+        column_stats = profile["numeric_columns"]
+        columns, data_source = len(column_stats), "dataset"
+        # Also measure at the dataset's own size, within the per-run limit
+        dataset_rows = min(profile["rows"], settings.PROFILER_MAX_ROWS, settings.PROFILER_MAX_CELLS // columns)
+        sizes = sorted(set(sizes) | {max(10, dataset_rows)})
+
+    # Synthetic data is float64, so cells bound each run's memory and the request's total work
+    if sizes[-1] * columns > settings.PROFILER_MAX_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Runs are limited to {settings.PROFILER_MAX_CELLS:,} cells (rows x columns), got {sizes[-1]:,} x {columns}"
+        )
+    runs = sum(1 for *_, recipe in targets if recipe is not None)
+    if runs * sum(sizes) * columns > settings.PROFILER_MAX_REQUEST_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Requests are limited to {settings.PROFILER_MAX_REQUEST_CELLS:,} cells (rows x columns) over all runs; "
+                   "profile fewer components or sizes"
+        )
+
+    profiler: PipelineProfiler = http_request.app.state.profiler
+
+    async def run(component_id, name, recipe) -> ComponentProfile:
+        if recipe is None:
+            return ComponentProfile(
+                component_id=component_id, name=name, status="unsupported",
+                reason="No profiling workload for this component"
+            )
+        result = await profiler.profile(recipe, sizes, columns, column_stats)
+        return ComponentProfile(component_id=component_id, name=name, **result)
+
+    profiles = await asyncio.gather(*(run(*target) for target in targets))
+    return ProfileResponse(
+        host=host_id(), data_source=data_source, columns=columns, sizes=sizes, profiles=list(profiles)
+    )
@@ -1,20 +1,60 @@
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+
+from .models import RecommendRequest, RecommendResponse, ComponentRecommendation
+from ..openai_utils import get_openai_client
+from ..pipeline_generator import build_search_steps, gather_search_context, select_components
+from ..recommender import ComponentRecommender
+from ..scheduler import ClientOverQuota, scheduling
+
+router = APIRouter()
+
+async def get_agentic_recommendations(request: RecommendRequest, recommender: ComponentRecommender):
+    """Recommend components picked by the LLM after a web search, scored by the local model."""
+    started_at = int(time.time() * 1000)
+    client = get_openai_client()
+    with scheduling(lane="background"):
+        search_queries, search_results = await gather_search_context(request.prompt, client)
+        context = request.prompt + "\n\nSearch Results:\n" + "\n".join(
+            f"- {item.get('title')}: {item.get('snippet')}"
+            for result in search_results if 'error' not in result
+            for item in result.get('results', [])[:3]
+        )
+        selected = await select_components(context, recommender.catalog, client)
+    confidence = recommender.score(request.prompt, [c.id for c in selected])
+    recommendations = [
+        ComponentRecommendation(
+            id=c.id,
+            name=c.name,
+            description=c.description,
+            confidence=confidence.get(c.id, 0.0),
+            reason="Selected by the agent after researching the request"
+        )
+        for c in selected if c.id not in set(request.current_components or [])
+    ]
+    return recommendations[:request.limit], build_search_steps(search_queries, started_at)
+
 @router.post("/recommend", response_model=RecommendResponse)
-async def recommend(request: RecommendRequest) -> RecommendResponse:
-    """Get component recommendations based on user message"""
+async def recommend(request: RecommendRequest, http_request: Request) -> RecommendResponse:
+    """Get component recommendations based on the user's prompt"""
+    recommender: ComponentRecommender = http_request.app.state.recommender
     try:
         if request.mode == 'quick':
-            # Use Claude for quick recommendations
-            recommendations = await get_quick_recommendations(request.message)
+            # Ranked locally without an LLM call, fast enough to run on every keystroke
+            recommendations = recommender.recommend(request.prompt, request.current_components or [], request.limit)
             return RecommendResponse(recommendations=recommendations)
         else:
             # Use agentic mode for more thorough search
-            recommendations, steps = await get_agentic_recommendations(request.message)
+            recommendations, steps = await get_agentic_recommendations(request, recommender)
             return RecommendResponse(
                 recommendations=recommendations,
                 search_steps=steps
             )
+    except ClientOverQuota as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         return RecommendResponse(
             recommendations=[],
             error=str(e)
-        ) 
\ No newline at end of file
+        )
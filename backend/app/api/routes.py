@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from . import assets, guidance, profile, recommend, sessions
+
+# Routers mounted on the app by main.py
+api_router = APIRouter()
+api_router.include_router(recommend.router)
+api_router.include_router(guidance.router)
+api_router.include_router(assets.router)
+api_router.include_router(sessions.router)
+api_router.include_router(profile.router)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from .models import SessionResponse
+from ..sessions import SessionStore
+
+router = APIRouter()
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str, http_request: Request) -> SessionResponse:
+    """Get a session's checkpoints and the pipelines generated in it."""
+    store: SessionStore = http_request.app.state.sessions
+    try:
+        session = await store.load(session_id, create=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return SessionResponse(**session.summary())
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: str, http_request: Request) -> None:
+    """Discard a session and its checkpoints."""
+    store: SessionStore = http_request.app.state.sessions
+    try:
+        deleted = await store.delete(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
@@ -0,0 +1,259 @@
+"""
+Content-hashed, precompressed 3D model assets.
+
+Catalog components reference model files such as ``/models/standard_scaler.glb``,
+resolved against ``ASSETS_DIR``. When the catalog loads, each file is copied to
+``ASSETS_BUILD_DIR`` under its content hash together with gzip and (if the brotli
+package is installed) brotli variants, and served from ``/model-assets/<name>.<hash>.<ext>``
+(a prefix of its own, so it can't be mistaken for the frontend's ``/assets/`` bundle).
+Manifests list absolute URLs under ``public_url``, since the frontend is served from
+another origin. Since a name never changes content, responses are cacheable forever.
+Builds are keyed by content hash, so restarts and other workers reuse existing files.
+
+With ``ASSETS_MESH_COMPRESSION`` enabled and ``gltfpack`` on the PATH, ``.glb`` files
+are also mesh-compressed (meshopt) before being precompressed.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+from dataclasses import dataclass, field
+import base64
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+if TYPE_CHECKING:
+    from .pipeline_generator import Component
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "/model-assets/"
+# Hashed names never change content, so browsers and CDNs can keep them indefinitely
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable, no-transform"
+CONTENT_TYPES = {
+    ".glb": "model/gltf-binary",
+    ".gltf": "model/gltf+json",
+    ".bin": "application/octet-stream",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".ktx2": "image/ktx2",
+}
+# Keep a compressed variant only if it is at least this much smaller
+MIN_COMPRESSION_SAVING = 0.05
+# Preference order when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+@dataclass
+class Asset:
+    """A built asset and its precompressed variants."""
+    source: str  # path referenced by the catalog, e.g. /models/standard_scaler.glb
+    name: str  # hashed file name, e.g. standard_scaler.3f2a9c1e0b7d4a65.glb
+    content_hash: str
+    content_type: str
+    integrity: str  # subresource integrity of the decoded bytes
+    files: Dict[str, str] = field(default_factory=dict)  # encoding ("identity", "gzip", "br") -> path
+    sizes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        return URL_PREFIX + self.name
+
+    def etag(self, encoding: str = "identity") -> str:
+        tag = self.content_hash[:32]
+        return f'"{tag}"' if encoding == "identity" else f'"{tag}-{encoding}"'
+
+    def negotiate(self, accepted: List[str]) -> str:
+        """Best available encoding for the codings a client accepts."""
+        for encoding in ENCODINGS:
+            if encoding in accepted and encoding in self.files:
+                return encoding
+        return "identity"
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    # Atomic rename so concurrent workers never serve a partial file
+    os.replace(tmp_path, path)
+
+class AssetBundle:
+    """Built assets of a component catalog, by hashed name and by component."""
+
+    def __init__(
+        self,
+        source_dir: str,
+        build_dir: str,
+        gzip_level: int = 9,
+        brotli_quality: int = 11,
+        mesh_compression: bool = False,
+        public_url: str = ""
+    ):
+        self.source_dir = os.path.realpath(source_dir)
+        self.public_url = public_url.rstrip("/")
+        self.build_dir = build_dir
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.gltfpack = shutil.which("gltfpack") if mesh_compression else None
+        if mesh_compression and self.gltfpack is None:
+            logger.warning("ASSETS_MESH_COMPRESSION is set but gltfpack is not on the PATH")
+        self._by_name: Dict[str, Asset] = {}
+        self._by_source: Dict[str, Asset] = {}
+        self._component_sources: Dict[str, str] = {}
+        os.makedirs(build_dir, exist_ok=True)
+
+    def build(self, catalog: Iterable["Component"]) -> None:
+        """Build every asset referenced by the catalog; missing files are skipped."""
+        missing = []
+        for component in catalog:
+            if not component.model_asset:
+                continue
+            self._component_sources[component.id] = component.model_asset
+            if component.model_asset in self._by_source:
+                continue
+            asset = self._build_one(component.model_asset)
+            if asset is None:
+                missing.append(component.model_asset)
+                continue
+            self._by_source[asset.source] = asset
+            self._by_name[asset.name] = asset
+        if missing:
+            logger.warning("%d catalog assets not found under %s: %s", len(missing), self.source_dir, ", ".join(missing))
+
+    def _resolve(self, source: str) -> Optional[str]:
+        path = os.path.realpath(os.path.join(self.source_dir, source.lstrip("/")))
+        # Catalog paths must stay inside the assets directory
+        if os.path.commonpath([path, self.source_dir]) != self.source_dir or not os.path.isfile(path):
+            return None
+        return path
+
+    def _build_one(self, source: str) -> Optional[Asset]:
+        path = self._resolve(source)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(os.path.basename(source))
+        mesh_compressed = self.gltfpack is not None and ext == ".glb"
+        content_hash = hashlib.sha256(data + (b"meshopt" if mesh_compressed else b"")).hexdigest()
+
+        identity_path = os.path.join(self.build_dir, content_hash + ext)
+        if not os.path.exists(identity_path):
+            if mesh_compressed:
+                data = self._compress_mesh(path, data)
+            _write_atomic(identity_path, data)
+        else:
+            with open(identity_path, "rb") as f:
+                data = f.read()
+
+        asset = Asset(
+            source=source,
+            name=f"{stem}.{content_hash[:16]}{ext}",
+            content_hash=content_hash,
+            content_type=CONTENT_TYPES.get(ext, "application/octet-stream"),
+            integrity="sha256-" + base64.b64encode(hashlib.sha256(data).digest()).decode("ascii"),
+            files={"identity": identity_path},
+            sizes={"identity": len(data)},
+        )
+        for encoding, suffix in (("gzip", ".gz"), ("br", ".br")):
+            variant_path = identity_path + suffix
+            if not os.path.exists(variant_path):
+                if encoding == "br" and brotli is None:
+                    continue
+                if encoding == "gzip":
+                    compressed = gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+                else:
+                    compressed = brotli.compress(data, quality=self.brotli_quality)
+                if len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+                    continue
+                _write_atomic(variant_path, compressed)
+            asset.files[encoding] = variant_path
+            asset.sizes[encoding] = os.path.getsize(variant_path)
+        return asset
+
+    def _compress_mesh(self, path: str, data: bytes) -> bytes:
+        output = os.path.join(self.build_dir, f"meshopt.{os.getpid()}.glb")
+        try:
+            subprocess.run(
+                [self.gltfpack, "-i", path, "-o", output, "-cc"],
+                check=True, capture_output=True, timeout=120
+            )
+            with open(output, "rb") as f:
+                compressed = f.read()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning("Mesh compression of %s failed: %s", path, e)
+            return data
+        finally:
+            if os.path.exists(output):
+                os.remove(output)
+        return compressed if len(compressed) < len(data) else data
+
+    def get(self, name: str) -> Optional[Asset]:
+        """Asset by hashed name."""
+        return self._by_name.get(name)
+
+    def manifest(self, component_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Assets needed to render the given components, once each, in pipeline order.
+
+        Assets that could not be built are listed under their catalog path with no
+        hash, so clients can still fetch them.
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        for component_id in component_ids:
+            source = self._component_sources.get(component_id)
+            if source is None:
+                continue
+            if source in entries:
+                entries[source]["components"].append(component_id)
+                continue
+            asset = self._by_source.get(source)
+            if asset is None:
+                entries[source] = {"url": source, "source": source, "components": [component_id]}
+                continue
+            entries[source] = {
+                "url": self.public_url + asset.url,
+                "source": source,
+                "components": [component_id],
+                "content_type": asset.content_type,
+                "integrity": asset.integrity,
+                "size": asset.sizes["identity"],
+                "encoded_sizes": {e: n for e, n in asset.sizes.items() if e != "identity"},
+            }
+        return list(entries.values())
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end).
+
+    Returns None when the header should be ignored (malformed, another unit, or several
+    ranges) and raises ValueError when the range can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep:
+        return None
+    if start_text == "":
+        # Suffix range: the last N bytes
+        if not end_text.isdigit():
+            return None
+        length = int(end_text)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    if not start_text.isdigit() or (end_text and not end_text.isdigit()):
+        return None
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size:
+        raise ValueError("Range starts past the end of the asset")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
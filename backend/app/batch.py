@@ -0,0 +1,180 @@
+"""
+Batch pipeline generation with shared search and deduplicated LLM work.
+
+A batch of N pipeline requests is processed as follows:
+
+1. Identical requests (same prompt, mode and clarification answers) are generated once.
+2. For agentic requests, search queries are generated per distinct prompt, then merged
+   across the whole batch so overlapping queries hit Tavily only once.
+3. Component selection runs for each distinct request with bounded concurrency.
+   All upstream calls go through the scheduler's background lane, behind interactive requests,
+   and wait for the client's quota to free up rather than failing the item with a 429.
+4. Results are yielded per item as soon as each one finishes.
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+import asyncio
+import json
+import re
+import time
+
+from .api.models import PipelineRequest
+from .metrics import REGISTRY, Counter
+from .scheduler import scheduling
+from .pipeline_generator import (
+    Component,
+    build_pipeline,
+    build_search_steps,
+    generate_search_queries,
+    perform_tavily_search
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+BATCH_ITEMS = REGISTRY.register(Counter(
+    "batch_items_total", "Batch pipeline items by outcome", ("outcome",)
+))
+BATCH_DEDUPLICATED = REGISTRY.register(Counter(
+    "batch_deduplicated_total", "Work skipped by batch deduplication", ("kind",)
+))
+
+# Words ignored when deciding whether two search queries are the same search
+_QUERY_STOPWORDS = {
+    "a", "an", "and", "are", "as", "best", "for", "from", "how", "in", "is", "of",
+    "on", "or", "the", "to", "using", "what", "with"
+}
+_QUERY_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def request_key(request: PipelineRequest) -> str:
+    """Key under which identical pipeline requests are collapsed."""
+    answers = sorted((request.clarification_answers or {}).items())
+    return json.dumps([request.prompt.strip(), request.mode, answers])
+
+def query_signature(query: str) -> str:
+    """
+    Normalize a search query to its set of content words, so reordered or
+    reworded variants ("churn prediction best practices" / "best practices for
+    churn prediction") map to the same search.
+    """
+    tokens = {t for t in _QUERY_TOKEN_RE.findall(query.lower()) if t not in _QUERY_STOPWORDS}
+    return " ".join(sorted(tokens)) or query.strip().lower()
+
+def merge_search_queries(queries_by_prompt: Dict[str, List[str]]) -> Tuple[List[str], Dict[str, List[int]]]:
+    """
+    Merge per-prompt search queries into one deduplicated list.
+
+    Returns the unique queries and, for each prompt, the indexes of its queries in that list.
+    """
+    unique_queries: List[str] = []
+    index_by_signature: Dict[str, int] = {}
+    indexes_by_prompt: Dict[str, List[int]] = {}
+    for prompt, queries in queries_by_prompt.items():
+        indexes = []
+        for query in queries:
+            signature = query_signature(query)
+            if signature not in index_by_signature:
+                index_by_signature[signature] = len(unique_queries)
+                unique_queries.append(query)
+            else:
+                BATCH_DEDUPLICATED.inc(kind="search_query")
+            indexes.append(index_by_signature[signature])
+        indexes_by_prompt[prompt] = indexes
+    return unique_queries, indexes_by_prompt
+
+async def generate_pipeline_batch(
+    requests: List[PipelineRequest],
+    component_catalog: List[Component],
+    client: "AsyncOpenAI",
+    concurrency: int
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate pipelines for a batch of requests, yielding one result per request index
+    as soon as it is ready, followed by a summary.
+    """
+    started_at = int(time.time() * 1000)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(fn: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await fn()
+
+    # 1. Collapse identical requests
+    unique_requests: Dict[str, PipelineRequest] = {}
+    indexes_by_key: Dict[str, List[int]] = {}
+    for index, request in enumerate(requests):
+        key = request_key(request)
+        if key in unique_requests:
+            BATCH_DEDUPLICATED.inc(kind="request")
+        unique_requests.setdefault(key, request)
+        indexes_by_key.setdefault(key, []).append(index)
+
+    # 2. Shared search phase for all distinct agentic prompts
+    agentic_prompts = list(dict.fromkeys(
+        r.prompt for r in unique_requests.values() if r.mode == 'agentic'
+    ))
+    search_summary = {"generated_queries": 0, "searches": 0}
+
+    async def search_phase() -> Dict[str, Tuple[List[str], List[Dict[str, Any]]]]:
+        with scheduling(lane="background", wait_for_quota=True):
+            return await shared_search()
+
+    async def shared_search() -> Dict[str, Tuple[List[str], List[Dict[str, Any]]]]:
+        query_lists = await asyncio.gather(*(
+            bounded(lambda p=prompt: generate_search_queries(p, client)) for prompt in agentic_prompts
+        ))
+        unique_queries, indexes_by_prompt = merge_search_queries(dict(zip(agentic_prompts, query_lists)))
+        search_summary["generated_queries"] = sum(len(q) for q in query_lists)
+        search_summary["searches"] = len(unique_queries)
+        results = await asyncio.gather(*(
+            bounded(lambda q=query: perform_tavily_search(q)) for query in unique_queries
+        ))
+        return {
+            prompt: (queries, [results[i] for i in indexes_by_prompt[prompt]])
+            for prompt, queries in zip(agentic_prompts, query_lists)
+        }
+
+    search_task: Optional[asyncio.Task] = asyncio.create_task(search_phase()) if agentic_prompts else None
+
+    # 3. Component selection per distinct request, bounded by the semaphore
+    async def run_item(key: str, request: PipelineRequest) -> Tuple[str, Dict[str, Any]]:
+        with scheduling(lane="background", wait_for_quota=True):
+            return await generate_item(key, request)
+
+    async def generate_item(key: str, request: PipelineRequest) -> Tuple[str, Dict[str, Any]]:
+        try:
+            search_results = None
+            search_steps = None
+            if request.mode == 'agentic':
+                search_queries, search_results = (await search_task)[request.prompt]
+                search_steps = build_search_steps(search_queries, started_at)
+            response = await bounded(lambda: build_pipeline(
+                request.prompt,
+                component_catalog,
+                client,
+                clarification_answers=request.clarification_answers,
+                search_results=search_results,
+                search_steps=search_steps
+            ))
+            return key, {"status": "ok", "pipeline": response.model_dump()}
+        except Exception as e:
+            return key, {"status": "error", "error": str(e)}
+
+    tasks = [asyncio.create_task(run_item(key, request)) for key, request in unique_requests.items()]
+    try:
+        # 4. Stream results in completion order, fanned out to every duplicate index
+        for next_done in asyncio.as_completed(tasks):
+            key, result = await next_done
+            for index in indexes_by_key[key]:
+                BATCH_ITEMS.inc(outcome=result["status"])
+                yield {"index": index, **result}
+    finally:
+        for task in tasks + ([search_task] if search_task else []):
+            task.cancel()
+
+    yield {
+        "summary": {
+            "items": len(requests),
+            "unique_requests": len(unique_requests),
+            **search_summary
+        }
+    }
@@ -0,0 +1,353 @@
+"""
+Pluggable cache shared by all uvicorn workers.
+
+Three interchangeable backends are available, selected with ``CACHE_BACKEND``:
+
+- ``memory``: per-process LRU, useful for development and tests
+- ``sqlite``: a local SQLite file shared by every worker process on the host
+- ``redis``: any Redis-protocol server shared across hosts (requires ``pip install redis``)
+
+All backends store the same JSON envelope (value plus absolute expiry time), so TTL
+semantics and serialization are identical whichever backend is configured. Callers use
+namespaced ``Cache`` objects from ``get_cache()``; each namespace reports its own hit
+ratio in the metrics. Namespaces created with ``evictable=False`` (such as jobs) hold
+state rather than cached results: their entries only go away when they expire, never
+to make room for other entries.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .core.config import get_settings
+from .metrics import record_cache_lookup
+
+T = TypeVar("T")
+
+def encode_entry(value: Any, ttl: Optional[float]) -> bytes:
+    """Serialize a JSON-compatible value with its absolute expiry time."""
+    expires_at = time.time() + ttl if ttl else None
+    return json.dumps({"e": expires_at, "v": value}, separators=(",", ":")).encode("utf-8")
+
+def decode_entry(data: bytes) -> Tuple[Any, Optional[float]]:
+    """Deserialize an entry into (value, expires_at)."""
+    entry = json.loads(data)
+    return entry["v"], entry["e"]
+
+def _expired(expires_at: Optional[float]) -> bool:
+    return expires_at is not None and expires_at <= time.time()
+
+class CacheBackend(ABC):
+    """Byte-level key/value store with TTL support."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the encoded entry for a key, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, data: bytes, ttl: Optional[float], evictable: bool = True) -> None:
+        """
+        Store an encoded entry; ``ttl`` is also used for native expiry where supported.
+
+        Entries that aren't ``evictable`` don't count towards the backend's size bound
+        and are only removed once expired.
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove a key if present."""
+
+    async def close(self) -> None:
+        """Release connections held by the backend."""
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache. Not shared between workers."""
+
+    # Drop expired non-evictable entries on every Nth write of one
+    PURGE_INTERVAL = 100
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        # Non-evictable entries: key -> (data, expires_at)
+        self._pinned: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._pinned_writes = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self._pinned:
+            return self._pinned[key][0]
+        data = self._entries.get(key)
+        if data is None:
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    async def set(self, key: str, data: bytes, ttl: Optional[float], evictable: bool = True) -> None:
+        if not evictable:
+            self._entries.pop(key, None)
+            self._pinned[key] = (data, time.time() + ttl if ttl else None)
+            self._pinned_writes += 1
+            if self._pinned_writes % self.PURGE_INTERVAL == 0:
+                for expired in [k for k, (_, expires_at) in self._pinned.items() if _expired(expires_at)]:
+                    del self._pinned[expired]
+            return
+        self._pinned.pop(key, None)
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._pinned.pop(key, None)
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache stored in a local SQLite file, shared by all worker processes on the host.
+
+    Uses WAL mode so readers don't block the writer. Entries carry their last access
+    time and the least recently used evictable ones are evicted once ``max_entries``
+    is exceeded. Queries run on a dedicated thread: a write lock held by another worker
+    can make one wait up to the busy timeout, and that must not stall the event loop.
+    The access time is only rewritten when it is ``ACCESS_UPDATE_INTERVAL`` seconds
+    old, so most reads don't write at all.
+    """
+
+    # Check the entry count on every Nth write rather than on each one
+    EVICTION_INTERVAL = 100
+    # LRU order only needs to be this precise; finer updates would make every read a write
+    ACCESS_UPDATE_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._writes = 0
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a blocking query on the backend's thread."""
+        # Threads don't survive fork(), so start one per process
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+            self._executor_pid = os.getpid()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across fork(), so open one per process
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL, "
+                "evictable INTEGER NOT NULL DEFAULT 1)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            if "evictable" not in columns:
+                # Cache files created before non-evictable entries existed
+                conn.execute("ALTER TABLE cache ADD COLUMN evictable INTEGER NOT NULL DEFAULT 1")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(self._get, key)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if _expired(row[1]):
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            if now - row[2] >= self.ACCESS_UPDATE_INTERVAL:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    async def set(self, key: str, data: bytes, ttl: Optional[float], evictable: bool = True) -> None:
+        await self._run(self._set, key, data, ttl, evictable)
+
+    def _set(self, key: str, data: bytes, ttl: Optional[float], evictable: bool) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at, evictable) VALUES (?, ?, ?, ?, ?)",
+                (key, data, now + ttl if ttl else None, now, int(evictable))
+            )
+            self._writes += 1
+            if self._writes % self.EVICTION_INTERVAL == 0:
+                self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache WHERE evictable = 1").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache WHERE evictable = 1 ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache on a Redis-protocol server (Redis, Valkey, KeyDB, ...), shared across hosts.
+
+    Evictable entries get a native TTL and non-evictable ones don't, so under a
+    ``volatile-*`` ``maxmemory-policy`` (e.g. ``volatile-lru``) the server only ever
+    evicts cached results. Under ``allkeys-*`` policies it may evict jobs too. Expired
+    non-evictable entries are tracked in a sorted set by expiry and deleted every
+    ``PURGE_INTERVAL`` writes of one.
+    """
+
+    PINNED_KEY = "cache:pinned-expiry"
+    PURGE_INTERVAL = 100
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package: pip install redis") from e
+        self._client = redis.from_url(url)
+        self._pinned_writes = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, data: bytes, ttl: Optional[float], evictable: bool = True) -> None:
+        # Expiry is also enforced from the envelope; native expiry just frees memory
+        if evictable:
+            await self._client.set(key, data, px=int(ttl * 1000) if ttl else None)
+            return
+        # No native TTL keeps the key out of volatile-* eviction
+        await self._client.set(key, data)
+        if ttl:
+            await self._client.zadd(self.PINNED_KEY, {key: time.time() + ttl})
+        self._pinned_writes += 1
+        if self._pinned_writes % self.PURGE_INTERVAL == 0:
+            await self._purge_pinned()
+
+    async def _purge_pinned(self) -> None:
+        now = time.time()
+        expired = await self._client.zrangebyscore(self.PINNED_KEY, 0, now)
+        if expired:
+            await self._client.delete(*expired)
+            await self._client.zrem(self.PINNED_KEY, *expired)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def close(self) -> None:
+        # redis-py renamed close() to aclose() in 5.0.1
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
+
+class Cache:
+    """Namespaced view over the shared backend that (de)serializes values and tracks hit ratios."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        default_ttl: Optional[float] = None,
+        evictable: bool = True
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.evictable = evictable
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss. ``None`` itself cannot be cached."""
+        data = await self.backend.get(self._key(key))
+        if data is not None:
+            value, expires_at = decode_entry(data)
+            if not _expired(expires_at):
+                record_cache_lookup(self.namespace, hit=True)
+                return value
+            await self.backend.delete(self._key(key))
+        record_cache_lookup(self.namespace, hit=False)
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; the write completes even if the caller is cancelled meanwhile."""
+        ttl = ttl if ttl is not None else self.default_ttl
+        # A result that was already paid for stays cached when its request is abandoned
+        await asyncio.shield(self.backend.set(self._key(key), encode_entry(value, ttl), ttl, self.evictable))
+
+    async def delete(self, key: str) -> None:
+        await self.backend.delete(self._key(key))
+
+def create_cache_backend(backend: str) -> CacheBackend:
+    """Build the configured cache backend."""
+    settings = get_settings()
+    if backend == "memory":
+        if settings.WEB_CONCURRENCY > 1:
+            raise RuntimeError(
+                "CACHE_BACKEND=memory is per process and can't be shared by "
+                f"{settings.WEB_CONCURRENCY} workers; use sqlite or redis"
+            )
+        return MemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(path=settings.CACHE_SQLITE_PATH, max_entries=settings.CACHE_MAX_ENTRIES)
+    if backend == "redis":
+        return RedisCacheBackend(url=settings.CACHE_REDIS_URL)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+@lru_cache()
+def get_cache_backend() -> CacheBackend:
+    """Get the process-wide cache backend selected by ``CACHE_BACKEND``."""
+    return create_cache_backend(get_settings().CACHE_BACKEND)
+
+_caches: Dict[str, Cache] = {}
+
+def get_cache(namespace: str, default_ttl: Optional[float] = None, evictable: bool = True) -> Cache:
+    """Get the cache for a namespace, e.g. ``get_cache("search", default_ttl=3600)``."""
+    if namespace not in _caches:
+        _caches[namespace] = Cache(get_cache_backend(), namespace, default_ttl, evictable)
+    return _caches[namespace]
+
+async def close_cache() -> None:
+    """Close the shared backend; called from the app's lifespan hook on shutdown."""
+    if get_cache_backend.cache_info().currsize:
+        await get_cache_backend().close()
+        get_cache_backend.cache_clear()
+        _caches.clear()
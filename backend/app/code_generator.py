@@ -1,20 +1,8 @@
 from typing import Dict, Any, Optional
 import json
-from .openai_utils import get_openai_client
+from .openai_utils import get_openai_client, create_chat_completion, strip_code_fences
+from .scheduler import ClientOverQuota
 from fastapi import HTTPException
-from openai import AsyncOpenAI
-import os
-from dotenv import load_dotenv
-import httpx
-
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-client = AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    http_client=httpx.AsyncClient()  # Initialize without proxies
-)
 
 async def refactor_code(code: str, prompt: str) -> str:
     """
@@ -28,7 +16,10 @@ async def refactor_code(code: str, prompt: str) -> str:
         str: The refactored code
     """
     try:
-        response = await client.chat.completions.create(
+        client = get_openai_client()
+        response = await create_chat_completion(
+            client,
+            "refactor_code",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert code refactoring assistant. Your task is to improve code based on specific requirements while maintaining its functionality. Only respond with the refactored code, no explanations or markdown formatting."},
@@ -41,14 +32,13 @@ async def refactor_code(code: str, prompt: str) -> str:
         refactored_code = response.choices[0].message.content.strip()
         
         # Remove any markdown formatting if present
-        if refactored_code.startswith("```"):
-            lines = refactored_code.split("\n")
-            start_idx = 1 if lines[0].strip() == "```python" else 0
-            end_idx = -1 if lines[-1].strip() == "```" else None
-            refactored_code = "\n".join(lines[start_idx:end_idx])
+        refactored_code = strip_code_fences(refactored_code)
         
         return refactored_code
         
+    except ClientOverQuota:
+        # Let the endpoint answer 429 with Retry-After
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -64,7 +54,10 @@ async def generate_code(pipeline: Dict[str, Any], language: str, framework: str)
         str: The generated code
     """
     try:
-        response = await client.chat.completions.create(
+        client = get_openai_client()
+        response = await create_chat_completion(
+            client,
+            "generate_code",
             model="gpt-4",
             messages=[
                 {
@@ -83,13 +76,12 @@ async def generate_code(pipeline: Dict[str, Any], language: str, framework: str)
         generated_code = response.choices[0].message.content.strip()
         
         # Remove any markdown formatting if present
-        if generated_code.startswith("```"):
-            lines = generated_code.split("\n")
-            start_idx = 1 if lines[0].strip() == "```python" else 0
-            end_idx = -1 if lines[-1].strip() == "```" else None
-            generated_code = "\n".join(lines[start_idx:end_idx])
+        generated_code = strip_code_fences(generated_code)
         
         return generated_code
         
+    except ClientOverQuota:
+        # Let the endpoint answer 429 with Retry-After
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
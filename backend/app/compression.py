@@ -0,0 +1,112 @@
+"""
+Response compression for large, non-streaming bodies.
+
+Pipelines with many components and the full catalog are tens of kilobytes of JSON,
+so they are compressed with brotli when the client accepts it and the brotli package
+is installed (``pip install brotli``), and with gzip otherwise. Streaming responses
+(batch NDJSON, server-sent events), partial content, bodies that are already encoded
+or marked ``no-transform`` (precompressed assets) pass through untouched, as do bodies
+smaller than ``COMPRESSION_MINIMUM_SIZE``.
+"""
+from typing import List, Optional
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def parse_accept_encoding(header: str) -> List[str]:
+    """Codings the client accepts (q > 0), e.g. ``"gzip, br;q=0.9"`` -> ["gzip", "br"]."""
+    codings = []
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            codings.append(coding.strip().lower())
+    return codings
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content coding for an Accept-Encoding header."""
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing complete response bodies above a size threshold."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                # Hold the start message until the first body chunk shows whether we can compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start_message is None:
+                await send(message)
+                return
+
+            response_headers = start_message.get("headers", [])
+            names = {k.lower() for k, _ in response_headers}
+            content_type = next((v for k, v in response_headers if k.lower() == b"content-type"), b"")
+            cache_control = next((v for k, v in response_headers if k.lower() == b"cache-control"), b"")
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in names
+                or b"content-range" in names
+                or b"no-transform" in cache_control
+                or content_type.startswith(b"text/event-stream")
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level)
+            response_headers = [
+                (k, v) for k, v in response_headers if k.lower() not in (b"content-length", b"vary")
+            ]
+            vary = next((v for k, v in start_message.get("headers", []) if k.lower() == b"vary"), None)
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,22 +1,116 @@
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
+import os
+
+# The backend directory; paths to files shipped with the repo are relative to it, not the cwd
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 class Settings(BaseSettings):
     """Application settings"""
     
     # API Keys
-    ANTHROPIC_API_KEY: str
-    TAVILY_API_KEY: str
+    OPENAI_API_KEY: Optional[str] = None
+    ANTHROPIC_API_KEY: Optional[str] = None
+    TAVILY_API_KEY: Optional[str] = None
+    
+    # Upstream Endpoints (point these at loadtest/stub_server.py for offline load tests)
+    OPENAI_BASE_URL: Optional[str] = None
+    TAVILY_SEARCH_URL: str = "https://api.tavily.com/search"
     
     # Model Settings
     GPT4_MODEL: str = "gpt-4-1106-preview"
     CLAUDE_MODEL: str = "claude-3-sonnet-20240229"
     
     # API Settings
-    CORS_ORIGINS: list[str] = ["*"]
+    CORS_ORIGINS: list[str] = ["http://localhost:5173"]  # Vite's default port
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    
+    # Storage Settings
+    COMPONENT_CATALOG_PATH: str = "app/data/component_catalog.json"
+    PIPELINE_STORE_PATH: str = ".data/pipelines.sqlite3"
+    ANALYSIS_CACHE_DIR: str = ".cache/analysis"
+    ANALYSIS_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    ASSETS_DIR: str = "../public"  # catalog model_asset paths are relative to this (and this to the backend)
+    ASSETS_BUILD_DIR: str = ".cache/assets"
+    ASSETS_MESH_COMPRESSION: bool = False  # needs gltfpack on the PATH
+    ASSETS_PUBLIC_URL: str = "http://localhost:8000"  # this backend as the frontend reaches it
+    
+    # Worker processes; uvicorn and gunicorn also read this as their default worker count
+    WEB_CONCURRENCY: int = 1
+    
+    # Shared Cache Settings ("memory", "sqlite" or "redis")
+    CACHE_BACKEND: str = "sqlite"
+    CACHE_SQLITE_PATH: str = ".cache/shared_cache.sqlite3"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_ENTRIES: int = 10000
+    SEARCH_CACHE_TTL: int = 24 * 60 * 60
+    COMPLETION_CACHE_TTL: int = 60 * 60
+    
+    # Session Settings (checkpoints of clarification, search and selection per session_id)
+    SESSION_IDLE_TTL: int = 30 * 60
+    
+    # Upstream Scheduler Settings (per worker process; 0 disables a limit)
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TOKENS_PER_MINUTE: int = 300_000
+    CLIENT_TOKENS_PER_MINUTE: int = 60_000
+    CLIENT_MAX_QUEUED: int = 20
+    SEARCH_MAX_CONCURRENCY: int = 8
+    TRUSTED_PROXIES: list[str] = []  # peers (IPs or CIDRs) whose X-Client-Id header is honoured
+    DISCONNECT_POLL_INTERVAL: float = 0.5  # seconds between client disconnect checks
+    
+    # Semantic Cache Settings (reuse pipelines generated for similar prompts)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.85
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+    SEMANTIC_CACHE_DIM: int = 512
+    SEMANTIC_CACHE_HNSW_MIN_ENTRIES: int = 2000
+    SEMANTIC_CACHE_ADAPT_MODEL: Optional[str] = None  # e.g. "gpt-3.5-turbo-1106"
+    
+    # Recommendation Settings
+    RECOMMENDER_HISTORY_LIMIT: int = 2000  # stored pipelines used for statistics and calibration
+    RECOMMENDER_MIN_TRAINING_PIPELINES: int = 20
+    RECOMMENDER_REFIT_INTERVAL: int = 50
+    TRANSITION_MAX_ORDER: int = 2  # components of prefix context used for next-component prediction
+    
+    # Profiling Settings (dry runs of components on synthetic data)
+    PROFILER_MAX_WORKERS: int = 2
+    PROFILER_TIMEOUT: float = 120.0  # seconds per component and data size
+    PROFILER_SIZES: list[int] = [1_000, 10_000, 100_000]  # rows
+    PROFILER_MAX_ROWS: int = 1_000_000
+    PROFILER_MAX_CELLS: int = 10_000_000  # rows x columns of one run; 8 bytes each
+    PROFILER_MAX_REQUEST_CELLS: int = 50_000_000  # rows x columns summed over a request's runs
+    PROFILE_CACHE_TTL: int = 7 * 24 * 60 * 60
+    
+    # Background Job Settings
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 100
+    JOB_RESULT_TTL: int = 60 * 60
+    
+    # Batch Generation Settings
+    BATCH_MAX_ITEMS: int = 100
+    BATCH_CONCURRENCY: int = 8
+    
+    # Tracing and Profiling Settings
+    TRACE_LOG_PATH: str = ".cache/traces/traces.jsonl"
+    TRACE_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    TRACE_LOG_BACKUP_COUNT: int = 5
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_INTERVAL: float = 0.005
+    PROFILE_DIR: str = ".cache/profiles"
     
     class Config:
         env_file = ".env"
+        extra = "ignore"
+
+    @field_validator("COMPONENT_CATALOG_PATH", "ASSETS_DIR")
+    @classmethod
+    def relative_to_backend(cls, path: str) -> str:
+        """Resolve repo paths against the backend directory, so the server can start from any cwd."""
+        return os.path.normpath(os.path.join(BACKEND_DIR, path))
 
 @lru_cache()
 def get_settings() -> Settings:
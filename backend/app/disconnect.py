@@ -0,0 +1,49 @@
+"""
+Cancel a request's upstream work when its client disconnects.
+
+A user closing the tab during pipeline or code generation would otherwise leave the
+handler waiting on LLM and search calls whose results nobody reads.
+``cancel_on_disconnect`` runs the handler's work in a task and checks for a client
+disconnect every ``DISCONNECT_POLL_INTERVAL`` seconds. If the client has gone, the
+task is cancelled, and cancellation reaches every upstream call the work is awaiting:
+
+- calls still waiting for a scheduler slot leave the queue
+- in-flight OpenAI and Tavily requests are closed
+- searches shared through ``SingleFlight`` are only cancelled once no other request
+  is waiting for them
+- cache writes and session checkpoints of results already received still complete
+"""
+from typing import Awaitable, TypeVar
+import asyncio
+
+from starlette.requests import Request
+
+from .metrics import REQUESTS_CANCELLED
+
+T = TypeVar("T")
+
+class ClientDisconnected(Exception):
+    """Raised when a request's work was cancelled because its client went away."""
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T], poll_interval: float) -> T:
+    """Await ``work``, cancelling it and raising ``ClientDisconnected`` if the client disconnects first."""
+    # The task copies the current context, so scheduling lane, client and trace carry over
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                # Let the work unwind (release scheduler slots, record metrics) before returning
+                await asyncio.wait({task})
+                if not task.cancelled():
+                    # Finished just before the cancellation landed
+                    return task.result()
+                REQUESTS_CANCELLED.inc(endpoint=request.url.path)
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            # The handler itself was cancelled, e.g. on shutdown
+            task.cancel()
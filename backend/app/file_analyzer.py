@@ -1,30 +1,62 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Optional
 import base64
 import json
-import pandas as pd
-from io import StringIO
+import os
+from io import BytesIO, TextIOWrapper
+
+# Bump whenever the shape or content of the analysis output changes so that
+# cached results produced by an older analyzer are no longer served.
+ANALYZER_VERSION = "2"
+
+# Numeric columns summarized in a dataset profile
+MAX_PROFILED_COLUMNS = 100
+
+def file_type_of(name: Optional[str], content_type: Optional[str] = None) -> str:
+    """Normalized type of an upload: its extension, or its MIME type if it has none."""
+    # Prefer the file extension over the MIME type, which is often generic
+    return (os.path.splitext(name or "")[1].lstrip(".") or content_type or "").lower()
+
+# File types analyzed as CSV: the extension, and MIME types of uploads without one
+CSV_FILE_TYPES = (file_type_of("data.csv"), "text/csv", "application/csv")
+
+def dataset_profile(df) -> Dict[str, Any]:
+    """Shape and numeric column statistics of a table, used to synthesize look-alike data."""
+    numeric_columns = []
+    for name in df.select_dtypes("number").columns[:MAX_PROFILED_COLUMNS]:
+        mean, std = df[name].mean(), df[name].std()
+        # Skip empty or constant columns, whose statistics aren't finite
+        if mean == mean and std == std:
+            numeric_columns.append({"name": str(name), "mean": float(mean), "std": float(std)})
+    return {"rows": len(df), "columns": len(df.columns), "numeric_columns": numeric_columns}
 
 def analyze_file_content(file: Dict[str, Any]) -> Dict[str, Any]:
     """Basic analysis of uploaded file content."""
-    file_type = file["type"].lower()
-    content = base64.b64decode(file["content"]).decode('utf-8')
-    
+    content = base64.b64decode(file["content"])
+    return analyze_file_stream(file["name"], file["type"], BytesIO(content))
+
+def analyze_file_stream(name: str, file_type: str, stream: BinaryIO) -> Dict[str, Any]:
+    """Basic analysis of a binary file stream, without loading it into memory twice."""
+    file_type = file_type.lower()
+
     analysis = {
         "file_type": file_type,
-        "name": file["name"],
+        "name": name,
         "insights": []
     }
-    
+
     try:
         if file_type.endswith('csv'):
-            # Basic CSV analysis
-            df = pd.read_csv(StringIO(content))
+            # Basic CSV analysis; pandas is slow to import so load it on first use
+            import pandas as pd
+            df = pd.read_csv(stream)
             analysis["insights"].extend([
                 f"Contains {len(df)} rows and {len(df.columns)} columns",
                 f"Columns: {', '.join(df.columns[:5])}{'...' if len(df.columns) > 5 else ''}"
             ])
+            analysis["profile"] = dataset_profile(df)
         elif file_type.endswith(('py', 'ipynb')):
             # Basic code file analysis
+            content = stream.read().decode('utf-8')
             analysis["insights"].append("Contains Python code")
             if 'sklearn' in content:
                 analysis["insights"].append("Uses scikit-learn")
@@ -34,12 +66,12 @@ def analyze_file_content(file: Dict[str, Any]) -> Dict[str, Any]:
                 analysis["insights"].append("Uses PyTorch")
         elif file_type.endswith('json'):
             # Basic JSON analysis
-            data = json.loads(content)
+            data = json.load(TextIOWrapper(stream, encoding='utf-8'))
             if isinstance(data, dict):
                 analysis["insights"].append(f"JSON object with keys: {', '.join(list(data.keys())[:5])}")
             elif isinstance(data, list):
                 analysis["insights"].append(f"JSON array with {len(data)} items")
     except Exception as e:
         analysis["error"] = str(e)
-    
-    return analysis 
\ No newline at end of file
+
+    return analysis
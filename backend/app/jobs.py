@@ -0,0 +1,136 @@
+"""
+Background job execution for long-running requests such as agentic pipeline generation.
+
+Submitting a job returns its id immediately. Jobs wait in a bounded in-process queue
+and are run by a fixed pool of worker tasks; when the queue is full, submission fails
+fast so the API can answer 503 with Retry-After instead of piling up connections.
+
+Job state is kept in the shared cache (``jobs`` namespace) for ``JOB_RESULT_TTL``
+seconds, so clients can reconnect and poll any uvicorn worker for the result. The
+namespace isn't evictable, so a burst of search or completion entries can't push out
+a job that is still queued or running.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+from .cache import get_cache
+from .metrics import REGISTRY, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+JOBS_QUEUED = REGISTRY.register(Gauge(
+    "jobs_queued", "Jobs waiting for a worker", ("kind",)
+))
+JOBS_RUNNING = REGISTRY.register(Gauge(
+    "jobs_running", "Jobs currently being processed", ("kind",)
+))
+JOBS_REJECTED = REGISTRY.register(Counter(
+    "jobs_rejected_total", "Jobs rejected because the queue was full", ("kind",)
+))
+JOB_DURATION = REGISTRY.register(Histogram(
+    "job_duration_seconds", "Time from job start to completion", ("kind", "status")
+))
+JOB_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "job_queue_wait_seconds", "Time jobs spend queued before a worker picks them up", ("kind",)
+))
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+class JobManager:
+    """Bounded queue of jobs processed by a fixed number of worker tasks."""
+
+    def __init__(self, workers: int, max_queue: int, result_ttl: float):
+        self.worker_count = workers
+        self.result_ttl = result_ttl
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=max_queue)
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def cache(self):
+        return get_cache("jobs", default_ttl=self.result_ttl, evictable=False)
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _save(self, job: Dict[str, Any]) -> None:
+        job["updated_at"] = time.time()
+        await self.cache.set(job["job_id"], job)
+
+    async def submit(self, kind: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Queue ``run`` for execution and return the new job record."""
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self._queue.put_nowait((job, run, time.perf_counter()))
+        except asyncio.QueueFull:
+            JOBS_REJECTED.inc(kind=kind)
+            raise JobQueueFull(retry_after=self._retry_after())
+        JOBS_QUEUED.inc(kind=kind)
+        await self._save(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.cache.get(job_id)
+
+    def _retry_after(self) -> int:
+        # Rough estimate: one queue's worth of jobs at ~30s each, spread over the workers
+        return max(1, int(self._queue.qsize() * 30 / max(1, self.worker_count)))
+
+    async def _worker(self) -> None:
+        while True:
+            job, run, queued_at = await self._queue.get()
+            try:
+                await self._run_job(job, run, queued_at)
+            except Exception:
+                # Never let a failure (e.g. an unreachable cache) take the worker down
+                logger.exception("Worker failed while processing job %s", job["job_id"])
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Dict[str, Any], run: Callable[[], Awaitable[Dict[str, Any]]], queued_at: float) -> None:
+        kind = job["kind"]
+        JOBS_QUEUED.dec(kind=kind)
+        JOB_QUEUE_WAIT.observe(time.perf_counter() - queued_at, kind=kind)
+
+        job["status"] = "running"
+        await self._save(job)
+        start = time.perf_counter()
+        try:
+            with JOBS_RUNNING.track_inprogress(kind=kind):
+                job["result"] = await run()
+            job["status"] = "succeeded"
+        except asyncio.CancelledError:
+            job["status"] = "failed"
+            job["error"] = "Server shutting down"
+            await self._save(job)
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job["job_id"])
+            job["status"] = "failed"
+            job["error"] = str(e)
+        JOB_DURATION.observe(time.perf_counter() - start, kind=kind, status=job["status"])
+        await self._save(job)
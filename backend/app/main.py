@@ -1,11 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import asyncio
 import json
 import os
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
-import httpx
 from typing import Optional, Dict, Any
 
 from .pipeline_generator import (
@@ -14,43 +16,219 @@ from .pipeline_generator import (
     PipelineResponse,
     ClarificationResponse,
     generate_pipeline,
-    generate_clarification_questions
+    generate_clarification_questions,
+    adapt_cached_pipeline,
+    get_search_client
+)
+from .api.models import (
+    SearchStep,
+    PipelineRequest,
+    BatchPipelineRequest,
+    JobResponse,
+    SavePipelineRequest,
+    StoredPipeline,
+    PipelineSummary,
+    PipelineHistory
 )
-from .api.models import SearchStep, PipelineRequest
 from .code_generator import generate_code, refactor_code
+from .file_analyzer import analyze_file_stream, file_type_of
+from .assets import AssetBundle
+from .analysis_cache import AnalysisCache, hash_stream, is_valid_content_hash
+from .openai_utils import get_openai_client
+from .core.config import get_settings
+from .cache import get_cache_backend, close_cache
+from .batch import generate_pipeline_batch
+from .pipeline_store import PipelineStore, pipeline_id as pipeline_content_id
+from .semantic_cache import SemanticCache, request_text
+from .recommender import ComponentRecommender
+from .transition_index import TransitionIndex
+from .sessions import SessionStore, fingerprint
+from .profiler import PipelineProfiler
+from .disconnect import ClientDisconnected, cancel_on_disconnect
+from .api.routes import api_router
+from .serialization import CatalogFragments, JSONBytesResponse, dumps
+from .compression import CompressionMiddleware
+from .jobs import JobManager, JobQueueFull, TERMINAL_STATUSES
+from .scheduler import ClientOverQuota, SchedulerContextMiddleware, current_client_id, scheduling
+from .metrics import REGISTRY, MetricsMiddleware
+from .tracing import TracingMiddleware, profile_path, shutdown_tracing
+
+# Load component catalog
+def load_component_catalog(path: Optional[str] = None) -> list[Component]:
+    # For now, we'll load from a static JSON file
+    # Later, this could be moved to a database
+    with open(path or get_settings().COMPONENT_CATALOG_PATH) as f:
+        catalog_data = json.load(f)
+    return [Component(**component) for component in catalog_data]
+
+@lru_cache()
+def get_component_catalog() -> list[Component]:
+    """Get the component catalog, loading and validating it once per process."""
+    return load_component_catalog()
+
+@lru_cache()
+def get_catalog_fragments() -> CatalogFragments:
+    """Get the pre-encoded JSON of every catalog component."""
+    return CatalogFragments(get_component_catalog())
+
+@lru_cache()
+def get_asset_bundle() -> AssetBundle:
+    """Get the content-hashed catalog assets, building missing variants on first use."""
+    settings = get_settings()
+    bundle = AssetBundle(
+        source_dir=settings.ASSETS_DIR,
+        build_dir=settings.ASSETS_BUILD_DIR,
+        mesh_compression=settings.ASSETS_MESH_COMPRESSION,
+        public_url=settings.ASSETS_PUBLIC_URL
+    )
+    bundle.build(get_component_catalog())
+    return bundle
+
+@lru_cache()
+def get_analysis_cache() -> AnalysisCache:
+    """Get the persistent analysis cache shared by all workers using the same directory."""
+    settings = get_settings()
+    return AnalysisCache(
+        directory=settings.ANALYSIS_CACHE_DIR,
+        max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES
+    )
 
-# Load environment variables
-load_dotenv()
+@lru_cache()
+def get_pipeline_store() -> PipelineStore:
+    """Get the persistent pipeline store."""
+    return PipelineStore(get_settings().PIPELINE_STORE_PATH)
+
+@lru_cache()
+def get_semantic_cache() -> SemanticCache:
+    """Get this worker's semantic cache, seeded from recently stored pipelines."""
+    settings = get_settings()
+    semantic_cache = SemanticCache(
+        dim=settings.SEMANTIC_CACHE_DIM,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        hnsw_min_entries=settings.SEMANTIC_CACHE_HNSW_MIN_ENTRIES
+    )
+    semantic_cache.load(get_pipeline_store().recent_sources(settings.SEMANTIC_CACHE_MAX_ENTRIES))
+    return semantic_cache
+
+@lru_cache()
+def get_recommender() -> ComponentRecommender:
+    """Get the local component recommender, trained on recently stored pipelines."""
+    settings = get_settings()
+    recommender = ComponentRecommender(
+        get_component_catalog(),
+        min_training_pipelines=settings.RECOMMENDER_MIN_TRAINING_PIPELINES,
+        refit_interval=settings.RECOMMENDER_REFIT_INTERVAL,
+        history_limit=settings.RECOMMENDER_HISTORY_LIMIT
+    )
+    recommender.load(get_pipeline_store().component_history(settings.RECOMMENDER_HISTORY_LIMIT))
+    return recommender
+
+@lru_cache()
+def get_transition_index() -> TransitionIndex:
+    """Get the next-component and alternative-swap index, built from stored pipelines and edits."""
+    settings = get_settings()
+    store = get_pipeline_store()
+    index = TransitionIndex(get_component_catalog(), max_order=settings.TRANSITION_MAX_ORDER)
+    index.load(
+        (component_ids for component_ids, _ in store.component_history(settings.RECOMMENDER_HISTORY_LIMIT)),
+        store.edits(settings.RECOMMENDER_HISTORY_LIMIT)
+    )
+    return index
+
+@lru_cache()
+def get_session_store() -> SessionStore:
+    """Get the store of resumable generation sessions, kept in the shared cache."""
+    return SessionStore(idle_ttl=get_settings().SESSION_IDLE_TTL)
+
+@lru_cache()
+def get_profiler() -> PipelineProfiler:
+    """Get the component profiler; it starts a process per measurement."""
+    settings = get_settings()
+    return PipelineProfiler(
+        max_workers=settings.PROFILER_MAX_WORKERS,
+        timeout=settings.PROFILER_TIMEOUT,
+        cache_ttl=settings.PROFILE_CACHE_TTL
+    )
+
+@lru_cache()
+def get_job_manager() -> JobManager:
+    """Get the background job manager for this worker process."""
+    settings = get_settings()
+    return JobManager(
+        workers=settings.JOB_WORKERS,
+        max_queue=settings.JOB_QUEUE_SIZE,
+        result_ttl=settings.JOB_RESULT_TTL
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build heavy shared services once at startup instead of at import time."""
+    app.state.ready = False
+    app.state.catalog = get_component_catalog()
+    get_catalog_fragments()
+    app.state.assets = get_asset_bundle()
+    app.state.analysis_cache = get_analysis_cache()
+    get_cache_backend()
+    app.state.pipeline_store = get_pipeline_store()
+    if get_settings().SEMANTIC_CACHE_ENABLED:
+        get_semantic_cache()
+    app.state.recommender = get_recommender()
+    app.state.transition_index = get_transition_index()
+    app.state.sessions = get_session_store()
+    app.state.profiler = get_profiler()
+    client = get_openai_client()
+    job_manager = get_job_manager()
+    job_manager.start()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await job_manager.stop()
+    get_job_manager.cache_clear()
+    await client.close()
+    get_openai_client.cache_clear()
+    if get_search_client.cache_info().currsize:
+        await get_search_client().aclose()
+        get_search_client.cache_clear()
+    await close_cache()
+    get_pipeline_store().close()
+    get_profiler().close()
+    shutdown_tracing()
 
 # Initialize FastAPI app
-app = FastAPI(title="ML Pipeline Generator")
+app = FastAPI(title="ML Pipeline Generator", lifespan=lifespan)
+app.include_router(api_router)
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:5173"],  # Vite's default port
+    allow_origins=get_settings().CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-client = AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    http_client=httpx.AsyncClient()  # Initialize without proxies
+# Compress large non-streaming responses (brotli if installed, else gzip)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=get_settings().COMPRESSION_MINIMUM_SIZE,
+    gzip_level=get_settings().GZIP_LEVEL,
+    brotli_quality=get_settings().BROTLI_QUALITY
 )
 
-# Load component catalog
-def load_component_catalog() -> list[Component]:
-    # For now, we'll load from a static JSON file
-    # Later, this could be moved to a database
-    with open("app/data/component_catalog.json") as f:
-        catalog_data = json.load(f)
-    return [Component(**component) for component in catalog_data]
+# Identify the client that upstream LLM and search calls are scheduled for
+app.add_middleware(SchedulerContextMiddleware, trusted_proxies=get_settings().TRUSTED_PROXIES)
+
+# Record per-endpoint latency and in-flight requests
+app.add_middleware(MetricsMiddleware)
+
+# Trace every request: X-Trace-Id and Server-Timing headers plus the JSONL trace log
+app.add_middleware(TracingMiddleware)
 
 class ClarificationRequest(BaseModel):
     prompt: str
     domain: str
+    session_id: Optional[str] = None
 
 class GenerateCodeRequest(BaseModel):
     pipeline: Dict[str, Any]
@@ -65,64 +243,364 @@ class ValidatePipelineRequest(BaseModel):
     current_components: list[Dict[str, Any]]
     new_components: list[Dict[str, Any]]
 
+@app.get("/healthz")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: startup has finished and shared services are initialized."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose request, stage, LLM, token and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiles/{trace_id}", response_class=PlainTextResponse)
+async def get_profile(trace_id: str):
+    """Download the folded-stack profile captured for a request sent with X-Profile: 1."""
+    try:
+        path = profile_path(trace_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No profile recorded for this trace id")
+    return FileResponse(path, media_type="text/plain")
+
+def over_quota(e: ClientOverQuota) -> HTTPException:
+    """429 response for a client whose upstream calls are over quota."""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def client_closed() -> HTTPException:
+    """499 (client closed request) for work cancelled because the client disconnected."""
+    return HTTPException(status_code=499, detail="Client closed request")
+
 @app.post("/generate-clarification", response_model=ClarificationResponse)
 async def create_clarification_questions(request: ClarificationRequest) -> ClarificationResponse:
     """Generate contextual clarification questions based on the prompt and domain."""
     try:
+        session = await get_session_store().load(request.session_id) if request.session_id else None
+        key = fingerprint(request.prompt, request.domain)
+        checkpoint = session.get("clarification", key) if session else None
+        if checkpoint is not None:
+            return ClarificationResponse(**checkpoint)
         response = await generate_clarification_questions(
             prompt=request.prompt,
             domain=request.domain,
-            client=client
+            client=get_openai_client()
         )
+        if session:
+            await session.put("clarification", key, response.model_dump())
         return response
+    except ClientOverQuota as e:
+        raise over_quota(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@app.post("/generate-pipeline", response_model=PipelineResponse)
-async def create_pipeline(request: PipelineRequest) -> PipelineResponse:
-    try:
-        # Load component catalog
-        catalog = load_component_catalog()
-        
-        # Generate pipeline
+async def run_generate_pipeline(request: PipelineRequest) -> PipelineResponse:
+    """Generate a pipeline for a request; shared by the synchronous and job endpoints."""
+    # Load component catalog
+    catalog = get_component_catalog()
+    response = None
+    session = await get_session_store().load(request.session_id) if request.session_id else None
+    if session and not request.use_cache:
+        # An explicit regeneration gets a fresh selection, but keeps the search context
+        await session.discard("selection")
+    
+    # Reuse the pipeline of a near-duplicate request if there is one
+    semantic_cache = get_semantic_cache() if get_settings().SEMANTIC_CACHE_ENABLED else None
+    text = request_text(request.prompt, request.clarification_answers)
+    if semantic_cache is not None and request.use_cache:
+        cached_id = semantic_cache.lookup(request.mode, text)
+        stored = get_pipeline_store().get(cached_id) if cached_id else None
+        if stored is not None:
+            response = await adapt_cached_pipeline(stored["pipeline"], request.prompt, catalog, get_openai_client())
+    
+    # Generate pipeline
+    if response is None:
         response = await generate_pipeline(
             user_prompt=request.prompt,
             component_catalog=catalog,
-            client=client,
+            client=get_openai_client(),
             mode=request.mode,
-            clarification_answers=request.clarification_answers
+            clarification_answers=request.clarification_answers,
+            session=session
         )
-        
-        return response
+    
+    # Keep the result so it can be reopened or shared without regenerating
+    response.id = save_generated_pipeline(request, response.model_dump(exclude={"assets"}))
+    # Hashed asset URLs depend on the build, so they are attached after storing
+    response.assets = get_asset_bundle().manifest(c.get("id") for c in response.components)
+    if semantic_cache is not None:
+        semantic_cache.add(request.mode, text, response.id)
+    if session:
+        await session.add_pipeline(response.id)
+    return response
+
+def save_generated_pipeline(request: PipelineRequest, pipeline: Dict[str, Any]) -> str:
+    """Store a generated pipeline along with the prompt and answers that produced it."""
+    pid = get_pipeline_store().save(pipeline, source={
+        "prompt": request.prompt,
+        "mode": request.mode,
+        "clarification_answers": request.clarification_answers
+    })
+    component_ids = [c.get("id") for c in pipeline["components"]]
+    get_recommender().observe(component_ids, [request.prompt])
+    get_transition_index().observe(component_ids)
+    return pid
+
+@app.post("/generate-pipeline", response_model=PipelineResponse)
+async def create_pipeline(request: PipelineRequest, http_request: Request) -> PipelineResponse:
+    try:
+        # Agentic generation queues behind quick-mode and clarification calls
+        with scheduling(lane="background" if request.mode == 'agentic' else None):
+            response = await cancel_on_disconnect(
+                http_request, run_generate_pipeline(request), get_settings().DISCONNECT_POLL_INTERVAL
+            )
+        return JSONBytesResponse(get_catalog_fragments().encode_pipeline(response))
+    except ClientDisconnected:
+        raise client_closed()
+    except ClientOverQuota as e:
+        raise over_quota(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/generate-pipeline/batch")
+async def create_pipeline_batch(request: BatchPipelineRequest):
+    """
+    Generate pipelines for many prompts at once, streaming newline-delimited JSON.
+
+    Each line is ``{"index": i, "status": "ok", "pipeline": {...}}`` or
+    ``{"index": i, "status": "error", "error": "..."}`` in completion order, followed
+    by a final ``{"summary": {...}}`` line.
+    """
+    settings = get_settings()
+    if not request.requests:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one request")
+    if len(request.requests) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.BATCH_MAX_ITEMS} requests")
+
+    results = generate_pipeline_batch(
+        request.requests,
+        get_component_catalog(),
+        get_openai_client(),
+        concurrency=settings.BATCH_CONCURRENCY
+    )
+
+    async def lines():
+        async for result in results:
+            # Duplicate requests in a batch share one pipeline dict, so store it once
+            if result.get("status") == "ok" and result["pipeline"].get("id") is None:
+                item_request = request.requests[result["index"]]
+                result["pipeline"]["id"] = save_generated_pipeline(item_request, result["pipeline"])
+                result["pipeline"]["assets"] = get_asset_bundle().manifest(
+                    c.get("id") for c in result["pipeline"]["components"]
+                )
+            yield dumps(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/jobs/generate-pipeline", response_model=JobResponse, status_code=202)
+async def submit_pipeline_job(request: PipelineRequest):
+    """
+    Queue pipeline generation and return a job id immediately.
+
+    Poll GET /jobs/{job_id} or subscribe to GET /jobs/{job_id}/events for the result.
+    Answers 503 with Retry-After when the job queue is full.
+    """
+    client_id = current_client_id()
+
+    async def run():
+        # Runs on a job worker, outside the request's context
+        with scheduling(lane="background", client_id=client_id, wait_for_quota=True):
+            response = await run_generate_pipeline(request)
+        return response.model_dump()
+
+    try:
+        job = await get_job_manager().submit("generate_pipeline", run)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many pipeline jobs queued, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return job
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status of a background job, including its result once it has finished."""
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events for a job: one event per status change, ending with the final state."""
+    job_manager = get_job_manager()
+    if await job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def events():
+        last_status = None
+        while True:
+            job = await job_manager.get(job_id)
+            if job is None:
+                yield 'event: error\ndata: {"detail": "Job expired"}\n\n'
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps(job)}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/pipelines", response_model=StoredPipeline)
+async def save_pipeline(request: SavePipelineRequest):
+    """
+    Store an edited pipeline as a new version of ``parent_id``.
+
+    Pipelines are content-addressed: saving content that is already stored returns
+    the existing version instead of creating a duplicate.
+    """
+    store = get_pipeline_store()
+    is_new = store.get(pipeline_content_id(request.pipeline)) is None
+    try:
+        pid = store.save(request.pipeline, parent_id=request.parent_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if is_new:
+        # User edits are the best signal of which components belong together
+        component_ids = [c.get("id") for c in request.pipeline.get("components", []) if isinstance(c, dict)]
+        get_recommender().observe(component_ids)
+        get_transition_index().observe(component_ids)
+        if request.parent_id:
+            parent = store.get(request.parent_id)
+            get_transition_index().observe_edit(
+                [c.get("id") for c in parent["pipeline"].get("components", [])], component_ids
+            )
+    return store.get(pid)
+
+@app.get("/pipelines", response_model=list[PipelineSummary])
+async def list_pipelines(limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
+    """List stored pipelines, newest first."""
+    return get_pipeline_store().list_recent(limit=limit, offset=offset)
+
+@app.get("/pipelines/{pipeline_id}", response_model=StoredPipeline)
+async def get_pipeline(pipeline_id: str):
+    """Get a stored pipeline with the prompts and answers that produced it."""
+    stored = get_pipeline_store().get(pipeline_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return stored
+
+@app.get("/pipelines/{pipeline_id}/history", response_model=PipelineHistory)
+async def get_pipeline_history(pipeline_id: str):
+    """Get the version chain of a stored pipeline and the versions derived from it."""
+    history = get_pipeline_store().history(pipeline_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return history
+
 @app.get("/components", response_model=list[Component])
 async def get_components():
     """Get all available components in the catalog."""
     try:
-        catalog = load_component_catalog()
-        return catalog
+        return JSONBytesResponse(get_catalog_fragments().catalog)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load component catalog: {str(e)}")
 
+@app.get("/analyze-file/{content_hash}")
+async def get_cached_file_analysis(
+    content_hash: str,
+    name: Optional[str] = None,
+    file_type: Optional[str] = None
+):
+    """
+    Look up a file analysis by SHA-256 content hash and file type.
+
+    Clients hash the file locally and call this first; on a hit the upload can be
+    skipped entirely. A miss returns 404 and the client falls back to POST /analyze-file.
+    The file type is taken from ``file_type`` if given, else from the extension of ``name``.
+    """
+    if not is_valid_content_hash(content_hash):
+        raise HTTPException(status_code=400, detail="content_hash must be a lowercase SHA-256 hex digest")
+    file_type = file_type.lstrip(".").lower() if file_type else file_type_of(name)
+    if not file_type:
+        raise HTTPException(status_code=400, detail="Pass file_type, or a name with an extension")
+
+    try:
+        analysis = get_analysis_cache().get(content_hash, file_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="No cached analysis for this content hash")
+
+    if name:
+        analysis["name"] = name
+    return {"content_hash": content_hash, "cached": True, "analysis": analysis}
+
+@app.post("/analyze-file")
+async def analyze_file_endpoint(file: UploadFile = File(...)):
+    """Analyze an uploaded file, reusing a cached result when the content was seen before."""
+    try:
+        content_hash = await run_in_threadpool(hash_stream, file.file)
+        file_type = file_type_of(file.filename, file.content_type)
+
+        analysis = get_analysis_cache().get(content_hash, file_type)
+        if analysis is not None:
+            analysis["name"] = file.filename
+            return {"content_hash": content_hash, "cached": True, "analysis": analysis}
+
+        file.file.seek(0)
+        analysis = await run_in_threadpool(analyze_file_stream, file.filename, file_type, file.file)
+
+        # Don't cache failures, they may be transient
+        if "error" not in analysis:
+            get_analysis_cache().set(content_hash, file_type, analysis)
+        return {"content_hash": content_hash, "cached": False, "analysis": analysis}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/generate-code")
-async def generate_code_endpoint(request: GenerateCodeRequest):
+async def generate_code_endpoint(request: GenerateCodeRequest, http_request: Request):
     try:
-        code = await generate_code(request.pipeline, request.language, request.framework)
+        code = await cancel_on_disconnect(
+            http_request,
+            generate_code(request.pipeline, request.language, request.framework),
+            get_settings().DISCONNECT_POLL_INTERVAL
+        )
         return {"code": code}
+    except ClientDisconnected:
+        raise client_closed()
+    except ClientOverQuota as e:
+        raise over_quota(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/refactor-code")
-async def refactor_code_endpoint(request: RefactorCodeRequest):
+async def refactor_code_endpoint(request: RefactorCodeRequest, http_request: Request):
     try:
-        refactored_code = await refactor_code(request.code, request.prompt)
+        refactored_code = await cancel_on_disconnect(
+            http_request,
+            refactor_code(request.code, request.prompt),
+            get_settings().DISCONNECT_POLL_INTERVAL
+        )
         return {"refactored_code": refactored_code}
+    except ClientDisconnected:
+        raise client_closed()
+    except ClientOverQuota as e:
+        raise over_quota(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,270 @@
+"""
+Minimal Prometheus metrics registry and instrumentation helpers.
+
+Metrics are kept per process; with several uvicorn workers each worker exposes
+its own series and Prometheus aggregates them across scrape targets.
+"""
+from typing import Dict, List, Optional, Tuple, Iterator
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+from starlette.routing import Match
+
+from .tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """Monotonically increasing value, e.g. requests or tokens."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. requests currently in flight."""
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, e.g. latencies."""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint", ("method", "endpoint", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("endpoint",)
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "pipeline_stage_duration_seconds", "Latency of individual stages inside request handlers", ("stage",)
+))
+LLM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "Upstream LLM call latency", ("model", "operation", "outcome")
+))
+LLM_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "llm_requests_in_flight", "Upstream LLM calls currently awaiting a response", ("model",)
+))
+LLM_PROMPT_TOKENS = REGISTRY.register(Counter(
+    "llm_prompt_tokens_total", "Prompt tokens sent to upstream LLMs", ("model", "operation")
+))
+LLM_COMPLETION_TOKENS = REGISTRY.register(Counter(
+    "llm_completion_tokens_total", "Completion tokens received from upstream LLMs", ("model", "operation")
+))
+LLM_PARSE_FAILURES = REGISTRY.register(Counter(
+    "llm_parse_failures_total", "LLM responses that could not be parsed", ("operation",)
+))
+SEARCH_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "search_requests_in_flight", "Upstream search calls currently awaiting a response"
+))
+SEARCH_ERRORS = REGISTRY.register(Counter(
+    "search_errors_total", "Upstream search calls that failed"
+))
+REQUESTS_CANCELLED = REGISTRY.register(Counter(
+    "requests_cancelled_total", "Requests whose client disconnected before the response was ready", ("endpoint",)
+))
+UPSTREAM_CALLS_CANCELLED = REGISTRY.register(Counter(
+    "upstream_calls_cancelled_total", "Upstream calls cancelled because no request needed the result", ("upstream", "phase")
+))
+LLM_TOKENS_SAVED = REGISTRY.register(Counter(
+    "llm_tokens_saved_total", "Estimated LLM tokens not spent because calls were cancelled", ("model", "operation")
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by result", ("cache", "result")
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "cache_hit_ratio", "Fraction of cache lookups served from the cache since startup", ("cache",)
+))
+
+@contextmanager
+def stage(name: str, **attributes: str) -> Iterator[None]:
+    """
+    Time a stage of request handling, e.g. ``with stage("component_selection"):``.
+
+    The stage is also recorded as a span in the current request's trace, with any
+    keyword arguments attached as span attributes.
+    """
+    with STAGE_DURATION.time(stage=name), span(name, **attributes):
+        yield
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache lookup and refresh the cache's hit ratio."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.get(cache=cache, result="hit")
+    misses = CACHE_REQUESTS.get(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / (hits + misses), cache=cache)
+
+def record_llm_usage(model: str, operation: str, usage: Optional[object]) -> None:
+    """Add token usage reported by an OpenAI response to the token counters."""
+    if usage is None:
+        return
+    LLM_PROMPT_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, operation=operation)
+    LLM_COMPLETION_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, operation=operation)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight requests per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _endpoint(self, scope) -> str:
+        # Label by route template (e.g. /analyze-file/{content_hash}) to keep cardinality bounded
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with HTTP_REQUESTS_IN_FLIGHT.track_inprogress(endpoint=endpoint):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                HTTP_REQUEST_DURATION.observe(
+                    time.perf_counter() - start,
+                    method=scope["method"],
+                    endpoint=endpoint,
+                    status=str(status["code"])
+                )
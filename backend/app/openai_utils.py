@@ -1,14 +1,108 @@
-from openai import AsyncOpenAI
-import os
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING
+from functools import lru_cache
+import asyncio
+import hashlib
+import json
+import time
+from .core.config import get_settings
+from .metrics import (
+    LLM_REQUEST_DURATION,
+    LLM_REQUESTS_IN_FLIGHT,
+    LLM_TOKENS_SAVED,
+    UPSTREAM_CALLS_CANCELLED,
+    record_llm_usage
+)
+from .tracing import span
+from .scheduler import estimate_tokens, get_scheduler
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-def get_openai_client() -> AsyncOpenAI:
-    """Get an instance of the OpenAI client with API key from environment variables."""
-    api_key = os.getenv("OPENAI_API_KEY")
+@lru_cache()
+def get_openai_client() -> "AsyncOpenAI":
+    """
+    Get the shared OpenAI client, creating it on first use.
+
+    The openai and httpx packages are imported here rather than at module level
+    so that importing the app stays cheap until a client is actually needed.
+    """
+    settings = get_settings()
+    api_key = settings.OPENAI_API_KEY
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is not set")
-    
-    return AsyncOpenAI(api_key=api_key) 
\ No newline at end of file
+
+    from openai import AsyncOpenAI
+    import httpx
+
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=settings.OPENAI_BASE_URL,
+        http_client=httpx.AsyncClient()  # Initialize without proxies
+    )
+
+async def create_chat_completion(client: "AsyncOpenAI", operation: str, **kwargs):
+    """
+    Call the chat completions API and record latency, in-flight calls and token usage.
+
+    The call waits for a slot from the LLM scheduler first, so it is subject to the
+    global concurrency and token limits and the calling client's quota.
+
+    ``operation`` names the calling code path (e.g. "select_components") and is used
+    as a metrics label alongside the model.
+    """
+    model = kwargs.get("model", "unknown")
+    outcome = "error"
+    tokens = estimate_tokens(kwargs)
+    phase = "queued"
+    try:
+        async with get_scheduler("llm").slot(tokens) as grant:
+            phase = "in_flight"
+            start = time.perf_counter()
+            with span(f"llm.{operation}", model=model), LLM_REQUESTS_IN_FLIGHT.track_inprogress(model=model):
+                try:
+                    response = await client.chat.completions.create(**kwargs)
+                    outcome = "success"
+                except asyncio.CancelledError:
+                    outcome = "cancelled"
+                    raise
+                finally:
+                    LLM_REQUEST_DURATION.observe(
+                        time.perf_counter() - start, model=model, operation=operation, outcome=outcome
+                    )
+            phase = "done"
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                grant.tokens_used = getattr(usage, "total_tokens", None) or (
+                    (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+                )
+    except asyncio.CancelledError:
+        if phase != "done":
+            _record_cancelled_call(model, operation, phase, kwargs, tokens)
+        raise
+    record_llm_usage(model, operation, usage)
+    return response
+
+def _record_cancelled_call(model: str, operation: str, phase: str, request_params: dict, tokens: int) -> None:
+    """
+    Count a cancelled LLM call and the tokens it is estimated to have saved.
+
+    A call cancelled while queued saves its whole estimate. One cancelled in flight has
+    already sent its prompt, so only the completion budget (``max_tokens``) is counted.
+    """
+    UPSTREAM_CALLS_CANCELLED.inc(upstream="llm", phase=phase)
+    saved = tokens if phase == "queued" else int(request_params.get("max_tokens") or 0)
+    LLM_TOKENS_SAVED.inc(saved, model=model, operation=operation)
+
+def strip_code_fences(code: str) -> str:
+    """Remove a surrounding markdown code fence from an LLM response, if present."""
+    if code.startswith("```"):
+        lines = code.split("\n")
+        start_idx = 1 if lines[0].strip() == "```python" else 0
+        end_idx = -1 if lines[-1].strip() == "```" else None
+        code = "\n".join(lines[start_idx:end_idx])
+    return code
+
+def completion_cache_key(operation: str, **kwargs) -> str:
+    """Stable cache key for a chat completion request, derived from all its parameters."""
+    payload = json.dumps(kwargs, sort_keys=True, separators=(",", ":"))
+    return f"{operation}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
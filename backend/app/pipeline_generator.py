@@ -1,20 +1,42 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from dataclasses import dataclass
+from functools import lru_cache
 import json
-from openai import AsyncOpenAI
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 import time
 import asyncio
-from tavily import TavilyClient
+import hashlib
+import logging
 from .api.models import SearchStep
-import os
-from dotenv import load_dotenv
+from .core.config import get_settings
+from .openai_utils import create_chat_completion, completion_cache_key
+from .cache import get_cache
+from .singleflight import SingleFlight
+from .scheduler import ClientOverQuota, get_scheduler
+from .pipeline_graph import pipeline_graph
+from .sessions import fingerprint
+from .metrics import LLM_PARSE_FAILURES, SEARCH_ERRORS, SEARCH_REQUESTS_IN_FLIGHT, UPSTREAM_CALLS_CANCELLED, stage
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Initialize Tavily client once
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+# Concurrent identical searches (e.g. across a batch) share one upstream call
+_search_flights = SingleFlight()
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+    from .sessions import Session
+
+@lru_cache()
+def get_search_client() -> "httpx.AsyncClient":
+    """
+    Get the shared HTTP client for the Tavily search API, creating it on first use.
+
+    Searches are plain async requests rather than the synchronous Tavily SDK in a
+    thread, so a search nobody is waiting for any more can be cancelled mid-flight.
+    """
+    import httpx
+    return httpx.AsyncClient(timeout=100)
 
 class ComponentRequirements(BaseModel):
     dependencies: List[str]
@@ -44,6 +66,9 @@ class ClarificationResponse(BaseModel):
     context: str
 
 class Component(BaseModel):
+    # "model_asset" is a catalog field, not a pydantic attribute
+    model_config = ConfigDict(protected_namespaces=())
+
     id: str
     name: str
     type: str
@@ -51,15 +76,23 @@ class Component(BaseModel):
     code_snippet: str
     requirements: ComponentRequirements
     agent: Dict[str, str]
+    model_asset: Optional[str] = None
+    icon: Optional[str] = None
+    suggested_alternatives: Optional[List[str]] = None
+    inputs: Optional[List[str]] = None  # data types consumed, see pipeline_graph
+    outputs: Optional[List[str]] = None  # data types produced
 
 class PipelineResponse(BaseModel):
+    id: Optional[str] = None
     components: List[Dict[str, Any]]
     connections: List[Dict[str, Any]]
     name: str
     description: str
     search_steps: Optional[List[Dict[str, Any]]] = None
+    layout: Optional[Dict[str, Any]] = None
+    assets: Optional[List[Dict[str, Any]]] = None  # preload manifest with hashed URLs, not stored
 
-async def select_components(prompt: str, catalog: List[Component], client: AsyncOpenAI) -> List[Component]:
+async def select_components(prompt: str, catalog: List[Component], client: "AsyncOpenAI") -> List[Component]:
     """
     Use GPT-4 to select appropriate components from the catalog based on the user prompt.
     """
@@ -96,7 +129,9 @@ async def select_components(prompt: str, catalog: List[Component], client: Async
         """}
     ]
     
-    response = await client.chat.completions.create(
+    response = await create_chat_completion(
+        client,
+        "select_components",
         model="gpt-4",
         messages=messages,
         temperature=0.7,
@@ -110,6 +145,7 @@ async def select_components(prompt: str, catalog: List[Component], client: Async
         selected_components = [c for c in catalog if c.id in selected_ids]
         return selected_components
     except json.JSONDecodeError:
+        LLM_PARSE_FAILURES.inc(operation="select_components")
         raise ValueError("Failed to parse GPT-4 response")
 
 def validate_pipeline(components: List[Component]) -> List[str]:
@@ -154,7 +190,7 @@ def generate_pipeline_explanation(components: List[Component]) -> str:
 async def generate_clarification_questions(
     prompt: str,
     domain: str,
-    client: AsyncOpenAI
+    client: "AsyncOpenAI"
 ) -> ClarificationResponse:
     """
     Use GPT to generate contextual clarification questions based on the user's prompt and domain.
@@ -193,20 +229,27 @@ async def generate_clarification_questions(
         """}
     ]
     
-    response = await client.chat.completions.create(
-        model="gpt-4",
-        messages=messages,
-        temperature=0.7,
-        max_tokens=1000
-    )
+    request_params = dict(model="gpt-4", messages=messages, temperature=0.7, max_tokens=1000)
+    
+    # Repeated prompts (e.g. a user going back and forth) reuse earlier questions
+    cache = get_cache("completions", default_ttl=get_settings().COMPLETION_CACHE_TTL)
+    cache_key = completion_cache_key("clarification_questions", **request_params)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return ClarificationResponse(**cached)
+    
+    response = await create_chat_completion(client, "clarification_questions", **request_params)
     
     try:
         result = json.loads(response.choices[0].message.content)
-        return ClarificationResponse(**result)
+        clarification = ClarificationResponse(**result)
+        await cache.set(cache_key, clarification.model_dump())
+        return clarification
     except json.JSONDecodeError:
+        LLM_PARSE_FAILURES.inc(operation="clarification_questions")
         raise ValueError("Failed to parse GPT-4 response for clarification questions")
 
-async def generate_search_queries(prompt: str, client: AsyncOpenAI) -> List[str]:
+async def generate_search_queries(prompt: str, client: "AsyncOpenAI") -> List[str]:
     """Generate contextual search queries based on the user prompt."""
     system_prompt = """You are an AI research assistant. Generate 3 specific search queries to gather information about the given topic.
     The queries should:
@@ -221,17 +264,22 @@ async def generate_search_queries(prompt: str, client: AsyncOpenAI) -> List[str]
         {"role": "user", "content": f"Generate search queries for: {prompt}"}
     ]
 
-    response = await client.chat.completions.create(
-        model="gpt-4",
-        messages=messages,
-        temperature=0.7,
-        max_tokens=200
-    )
+    request_params = dict(model="gpt-4", messages=messages, temperature=0.7, max_tokens=200)
+
+    cache = get_cache("completions", default_ttl=get_settings().COMPLETION_CACHE_TTL)
+    cache_key = completion_cache_key("search_queries", **request_params)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await create_chat_completion(client, "search_queries", **request_params)
 
     try:
         queries = json.loads(response.choices[0].message.content)
+        await cache.set(cache_key, queries)
         return queries
     except json.JSONDecodeError:
+        LLM_PARSE_FAILURES.inc(operation="search_queries")
         return [
             f"{prompt} overview and techniques",
             f"latest approaches for {prompt}",
@@ -239,78 +287,107 @@ async def generate_search_queries(prompt: str, client: AsyncOpenAI) -> List[str]
         ]
 
 async def perform_tavily_search(query: str) -> Dict[str, Any]:
-    """Perform a search using Tavily API."""
-    try:
-        # Use synchronous search in a thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, 
-            lambda: tavily_client.search(
-                query,
-                search_depth="advanced",
-                max_results=5
-            )
-        )
+    """Perform a search using Tavily API, reusing cached results for repeated queries."""
+    search_params = {"query": query, "search_depth": "advanced", "max_results": 5}
+    cache = get_cache("search", default_ttl=get_settings().SEARCH_CACHE_TTL)
+    cache_key = hashlib.sha256(json.dumps(search_params, sort_keys=True).encode("utf-8")).hexdigest()
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    async def search() -> Dict[str, Any]:
+        settings = get_settings()
+        phase = "queued"
+        try:
+            async with get_scheduler("search").slot():
+                phase = "in_flight"
+                with stage("tavily_search", query=query), SEARCH_REQUESTS_IN_FLIGHT.track_inprogress():
+                    response = await get_search_client().post(
+                        settings.TAVILY_SEARCH_URL,
+                        json={**search_params, "api_key": settings.TAVILY_API_KEY}
+                    )
+                    response.raise_for_status()
+                    result = response.json()
+        except asyncio.CancelledError:
+            UPSTREAM_CALLS_CANCELLED.inc(upstream="search", phase=phase)
+            raise
+        await cache.set(cache_key, result)
         return result
+
+    try:
+        return await _search_flights.do(cache_key, search)
+    except ClientOverQuota:
+        # Let the endpoint answer 429 with Retry-After
+        raise
     except Exception as e:
-        print(f"Tavily search error: {e}")
+        SEARCH_ERRORS.inc()
+        logger.warning("Tavily search error for query %r: %s", query, e)
         return {"error": str(e)}
 
-async def generate_pipeline(
-    user_prompt: str,
-    component_catalog: List[Component],
-    client: AsyncOpenAI,
-    mode: str = 'quick',
-    clarification_answers: Optional[Dict[str, str]] = None
-) -> PipelineResponse:
+async def gather_search_context(user_prompt: str, client: "AsyncOpenAI") -> Tuple[List[str], List[Dict[str, Any]]]:
     """
-    Main pipeline generation function that orchestrates the entire process.
+    Agentic context gathering: generate search queries for the prompt and run them in parallel.
     """
-    search_steps = []
-    current_timestamp = int(time.time() * 1000)
-
-    if mode == 'agentic':
-        # Generate contextual search queries
+    # Generate contextual search queries
+    with stage("query_generation"):
         search_queries = await generate_search_queries(user_prompt, client)
-        
-        # Create initial search steps
-        search_steps = [
-            SearchStep(
-                query=query,
-                status='loading',
-                timestamp=current_timestamp + (i * 1000),
-                type='web'
-            ).dict()
-            for i, query in enumerate(search_queries)
-        ]
 
-        # Add analysis and generation steps
-        search_steps.extend([
-            SearchStep(
-                query='Analyzing search results and planning approach',
-                status='loading',
-                timestamp=current_timestamp + (len(search_queries) * 1000),
-                type='think'
-            ).dict(),
-            SearchStep(
-                query='Generating solution architecture',
-                status='loading',
-                timestamp=current_timestamp + ((len(search_queries) + 1) * 1000),
-                type='generate'
-            ).dict()
-        ])
-
-        # Perform searches in parallel using asyncio.gather with synchronous function
-        search_tasks = [
-            perform_tavily_search(query)
-            for query in search_queries
-        ]
+    # Perform searches in parallel; cancelling this coroutine cancels every search
+    search_tasks = [
+        perform_tavily_search(query)
+        for query in search_queries
+    ]
+    with stage("search"):
         search_results = await asyncio.gather(*search_tasks)
 
-        # Update search steps with completion status
-        for i in range(len(search_queries)):
-            search_steps[i]['status'] = 'complete'
+    return search_queries, list(search_results)
+
+def build_search_steps(search_queries: List[str], started_at: int) -> List[Dict[str, Any]]:
+    """
+    Describe the completed agentic steps for the frontend's reasoning view.
+    """
+    search_steps = [
+        SearchStep(
+            query=query,
+            status='complete',
+            timestamp=started_at + (i * 1000),
+            type='web'
+        ).dict()
+        for i, query in enumerate(search_queries)
+    ]
+
+    # Add analysis and generation steps
+    search_steps.extend([
+        SearchStep(
+            query='Analyzing search results and planning approach',
+            status='complete',
+            timestamp=started_at + (len(search_queries) * 1000),
+            type='think'
+        ).dict(),
+        SearchStep(
+            query='Generating solution architecture',
+            status='complete',
+            timestamp=started_at + ((len(search_queries) + 1) * 1000),
+            type='generate'
+        ).dict()
+    ])
+    return search_steps
+
+async def build_pipeline(
+    user_prompt: str,
+    component_catalog: List[Component],
+    client: "AsyncOpenAI",
+    clarification_answers: Optional[Dict[str, str]] = None,
+    search_results: Optional[List[Dict[str, Any]]] = None,
+    search_steps: Optional[List[Dict[str, Any]]] = None,
+    session: Optional["Session"] = None
+) -> PipelineResponse:
+    """
+    Select, validate and explain the pipeline components, given any gathered search context.
 
+    With a session, the selection is checkpointed and reused while the prompt, answers
+    and search results stay the same.
+    """
     # Include clarification answers in the component selection process
     prompt_with_context = user_prompt
     if clarification_answers:
@@ -319,7 +396,7 @@ async def generate_pipeline(
             prompt_with_context += f"- {q_id}: {answer}\n"
     
     # Add search results to context if available
-    if mode == 'agentic' and 'search_results' in locals():
+    if search_results is not None:
         prompt_with_context += "\n\nSearch Results:\n"
         for i, result in enumerate(search_results):
             if 'error' not in result:
@@ -328,39 +405,169 @@ async def generate_pipeline(
                     prompt_with_context += f"- {item.get('title')}: {item.get('snippet')}\n"
     
     # 1. Select components using GPT-4
-    selected_components = await select_components(prompt_with_context, component_catalog, client)
+    selection_key = fingerprint(prompt_with_context)
+    selected_ids = session.get("selection", selection_key) if session else None
+    catalog_by_id = {c.id: c for c in component_catalog}
+    if selected_ids is not None and all(c in catalog_by_id for c in selected_ids):
+        selected_components = [catalog_by_id[c] for c in selected_ids]
+    else:
+        with stage("component_selection"):
+            selected_components = await select_components(prompt_with_context, component_catalog, client)
+        if session:
+            await session.put("selection", selection_key, [c.id for c in selected_components])
     
     # 2. Validate the pipeline
-    issues = validate_pipeline(selected_components)
+    with stage("validation"):
+        issues = validate_pipeline(selected_components)
     if any("Error:" in issue for issue in issues):
         raise ValueError("Pipeline validation failed:\n" + "\n".join(issues))
     
     # 3. Generate explanation
-    explanation = generate_pipeline_explanation(selected_components)
+    with stage("explanation"):
+        explanation = generate_pipeline_explanation(selected_components)
     
     # 4. Convert components to response format
-    component_dicts = [
-        {
-            "id": c.id,
-            "name": c.name,
-            "type": c.type,
-            "description": c.description,
-            "requirements": c.requirements.dict(),
-            "agent": c.agent,
-            "code_snippet": c.code_snippet
-        }
-        for c in selected_components
-    ]
-
-    # Mark remaining steps as complete
-    if mode == 'agentic':
-        for step in search_steps:
-            step['status'] = 'complete'
+    component_dicts = [component_to_dict(c) for c in selected_components]
+    
+    # 5. Connect components and lay them out
+    with stage("layout"):
+        graph = pipeline_graph(component_dicts)
     
-    return PipelineResponse(
+    # Every field is built here from validated catalog components, so skip re-validation
+    return PipelineResponse.model_construct(
         components=component_dicts,
-        connections=[],  # Add connection logic here
-        name=f"ML Pipeline for {user_prompt[:50]}...",
+        connections=graph["connections"],
+        name=pipeline_name(user_prompt),
         description=explanation,
-        search_steps=search_steps if mode == 'agentic' else None
-    ) 
\ No newline at end of file
+        search_steps=search_steps,
+        layout=graph["layout"]
+    )
+
+def component_to_dict(component: Component) -> Dict[str, Any]:
+    """Response format of a selected component."""
+    return {
+        "id": component.id,
+        "name": component.name,
+        "type": component.type,
+        "description": component.description,
+        "requirements": component.requirements.model_dump(),
+        "agent": component.agent,
+        "code_snippet": component.code_snippet,
+        "inputs": component.inputs,
+        "outputs": component.outputs
+    }
+
+def set_pipeline_graph(pipeline: PipelineResponse) -> None:
+    """Recompute a pipeline's connections and layout from its components."""
+    graph = pipeline_graph(pipeline.components)
+    pipeline.connections = graph["connections"]
+    pipeline.layout = graph["layout"]
+
+def pipeline_name(user_prompt: str) -> str:
+    return f"ML Pipeline for {user_prompt[:50]}..."
+
+async def adapt_cached_pipeline(
+    cached: Dict[str, Any],
+    user_prompt: str,
+    component_catalog: List[Component],
+    client: "AsyncOpenAI"
+) -> PipelineResponse:
+    """
+    Reuse a pipeline generated for a similar request.
+
+    When ``SEMANTIC_CACHE_ADAPT_MODEL`` is set, a cheap model is asked which of the
+    cached components apply to the new request; this only sends the cached components,
+    not the whole catalog. If the answer can't be parsed or the pruned pipeline fails
+    validation, the cached components are kept as is.
+
+    A pipeline whose components are kept is returned unchanged, name included, so it
+    is stored under the same content id. Only a pruned pipeline is renamed for the new
+    prompt.
+    """
+    pipeline = PipelineResponse(**{k: v for k, v in cached.items() if k != "id"})
+    if pipeline.layout is None:
+        # Stored before connections were inferred
+        set_pipeline_graph(pipeline)
+    model = get_settings().SEMANTIC_CACHE_ADAPT_MODEL
+    if not model:
+        return pipeline
+    
+    messages = [
+        {"role": "system", "content": """This ML pipeline was built for a similar request.
+        Return the ids of the components that still apply to the new request, in order, dropping
+        only components that clearly don't. Format: {"keep": ["component_id", ...]}
+        """},
+        {"role": "user", "content": f"""
+        New Request: {user_prompt}
+        
+        Components:
+        {json.dumps([{"id": c["id"], "name": c["name"], "type": c["type"]} for c in pipeline.components])}
+        """}
+    ]
+    with stage("semantic_cache_adaptation"):
+        response = await create_chat_completion(
+            client,
+            "adapt_cached_pipeline",
+            model=model,
+            messages=messages,
+            temperature=0,
+            max_tokens=200,
+            response_format={"type": "json_object"}
+        )
+    try:
+        keep = set(json.loads(response.choices[0].message.content)["keep"])
+    except (json.JSONDecodeError, KeyError, TypeError):
+        LLM_PARSE_FAILURES.inc(operation="adapt_cached_pipeline")
+        return pipeline
+    
+    catalog_by_id = {c.id: c for c in component_catalog}
+    kept = [catalog_by_id[c["id"]] for c in pipeline.components if c["id"] in keep and c["id"] in catalog_by_id]
+    if not kept or len(kept) == len(pipeline.components):
+        return pipeline
+    if any("Error:" in issue for issue in validate_pipeline(kept)):
+        return pipeline
+    pipeline.components = [component_to_dict(c) for c in kept]
+    pipeline.name = pipeline_name(user_prompt)
+    pipeline.description = generate_pipeline_explanation(kept)
+    set_pipeline_graph(pipeline)
+    return pipeline
+
+async def generate_pipeline(
+    user_prompt: str,
+    component_catalog: List[Component],
+    client: "AsyncOpenAI",
+    mode: str = 'quick',
+    clarification_answers: Optional[Dict[str, str]] = None,
+    session: Optional["Session"] = None
+) -> PipelineResponse:
+    """
+    Main pipeline generation function that orchestrates the entire process.
+
+    With a session, search context and component selection resume from its checkpoints.
+    """
+    current_timestamp = int(time.time() * 1000)
+    search_results = None
+    search_steps = None
+
+    if mode == 'agentic':
+        # Search queries only depend on the prompt, so answers can change without a new search
+        search_key = fingerprint(user_prompt)
+        checkpoint = session.get("search", search_key) if session else None
+        if checkpoint is not None:
+            search_queries, search_results = checkpoint["queries"], checkpoint["results"]
+        else:
+            search_queries, search_results = await gather_search_context(user_prompt, client)
+            # Failed searches are retried on the next call rather than checkpointed
+            if session and not any('error' in result for result in search_results):
+                await session.put("search", search_key, {"queries": search_queries, "results": search_results})
+        search_steps = build_search_steps(search_queries, current_timestamp)
+
+    return await build_pipeline(
+        user_prompt,
+        component_catalog,
+        client,
+        clarification_answers=clarification_answers,
+        search_results=search_results,
+        search_steps=search_steps,
+        session=session
+    )
@@ -0,0 +1,249 @@
+"""
+Connection inference and layout for pipeline graphs.
+
+Each component declares the data it consumes and produces (``inputs`` and ``outputs``
+in the catalog; components without a contract get a default one for their type):
+
+- ``table``: rows of raw or cleaned data
+- ``features``: a numeric feature matrix
+- ``predictions``: model outputs
+- ``report``: metrics, explanations or alerts about predictions
+
+A component is connected from the nearest upstream producers of data it accepts, so a
+pipeline can branch (two models reading the same features, or a drift detector and an
+explainer both reading predictions) and merge (an exporter reading predictions from
+two models). The resulting DAG is laid out in layers, with the order within each layer
+chosen to reduce edge crossings, and positioned in 2D (React Flow) and 3D (Three.js)
+coordinates.
+
+Connections and layout only depend on the components' ids and contracts, so results
+are cached per pipeline hash.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+import bisect
+import hashlib
+import json
+import threading
+
+from .metrics import record_cache_lookup
+
+# Order of data types through a pipeline
+DATA_TYPES = ("table", "features", "predictions", "report")
+_RANK = {t: i for i, t in enumerate(DATA_TYPES)}
+
+# Contract of components that don't declare one: (inputs, outputs)
+DEFAULT_CONTRACTS = {
+    "preprocessing": (["table"], ["table"]),
+    "transformation": (["table"], ["table"]),
+    "feature": (["features", "table"], ["features"]),
+    "model": (["features", "table"], ["predictions"]),
+    "postprocessing": (["predictions", "report"], ["report"]),
+    "monitoring": (["predictions"], ["report"]),
+    "explainability": (["predictions"], ["report"]),
+}
+
+# Spacing between layers and between nodes within a layer
+LAYER_SPACING_2D = 400
+NODE_SPACING_2D = 180
+LAYER_SPACING_3D = 6.0
+NODE_SPACING_3D = 4.0
+# Barycenter sweeps used to reduce crossings
+ORDERING_SWEEPS = 4
+
+def contract(component: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Data types a component dict consumes and produces."""
+    default_inputs, default_outputs = DEFAULT_CONTRACTS.get(component.get("type"), (["table"], ["table"]))
+    inputs = component.get("inputs")
+    outputs = component.get("outputs")
+    return (
+        list(inputs) if inputs is not None else default_inputs,
+        list(outputs) if outputs is not None else default_outputs,
+    )
+
+def _flow_key(inputs: List[str], outputs: List[str], index: int) -> Tuple[int, int, int]:
+    """Position in data flow: earliest data consumed, then latest data produced."""
+    start = min((_RANK.get(t, 0) for t in inputs), default=0)
+    end = max((_RANK.get(t, 0) for t in outputs), default=max(start, len(DATA_TYPES) - 1))
+    return start, end, index
+
+def _connect(contracts: List[Tuple[List[str], List[str]]]) -> List[Tuple[int, int, str]]:
+    """
+    Typed edges (source index, target index, data type) between components.
+
+    Components are visited in data-flow order. Each one is connected from the producers
+    of data it accepts that aren't upstream of another such producer, so it reads from
+    the end of every branch it can use. Components with no producer read the input data.
+    """
+    order = sorted(range(len(contracts)), key=lambda i: _flow_key(*contracts[i], i))
+    ancestors: Dict[int, set] = {}
+    edges = []
+    visited: List[int] = []
+    for v in order:
+        inputs, _ = contracts[v]
+        producers = {}
+        for u in visited:
+            accepted = [t for t in inputs if t in contracts[u][1]]
+            if accepted:
+                producers[u] = accepted[0]
+        # Keep the ends of branches: drop producers upstream of another producer
+        upstream = set().union(*(ancestors[u] for u in producers)) if producers else set()
+        ancestors[v] = set()
+        for u in visited:
+            if u in producers and u not in upstream:
+                edges.append((u, v, producers[u]))
+                ancestors[v] |= ancestors[u] | {u}
+        visited.append(v)
+    return edges
+
+def _crossings(upper: List[int], lower: List[int], edges: List[Tuple[int, int]]) -> int:
+    """Crossings between two adjacent layers, counted as inversions in O(E log E)."""
+    upper_pos = {v: i for i, v in enumerate(upper)}
+    lower_pos = {v: i for i, v in enumerate(lower)}
+    pairs = sorted((upper_pos[u], lower_pos[v]) for u, v in edges)
+    # Two edges cross when their lower ends are in the opposite order of their upper ends
+    crossings = 0
+    seen: List[int] = []
+    for _, b in pairs:
+        crossings += len(seen) - bisect.bisect_right(seen, b)
+        bisect.insort(seen, b)
+    return crossings
+
+def _order_layers(layers: List[List[int]], edges: List[Tuple[int, int]]) -> List[List[int]]:
+    """Reorder nodes within layers by the barycenter of their neighbours, keeping the best order."""
+    layer_of = {v: i for i, layer in enumerate(layers) for v in layer}
+    predecessors: Dict[int, List[int]] = {}
+    successors: Dict[int, List[int]] = {}
+    # Edges between adjacent layers, by upper layer; longer edges don't count as crossings
+    between: List[List[Tuple[int, int]]] = [[] for _ in layers]
+    for u, v in edges:
+        predecessors.setdefault(v, []).append(u)
+        successors.setdefault(u, []).append(v)
+        if layer_of[v] == layer_of[u] + 1:
+            between[layer_of[u]].append((u, v))
+
+    def total_crossings(current: List[List[int]]) -> int:
+        return sum(_crossings(current[i], current[i + 1], between[i]) for i in range(len(current) - 1))
+
+    # Position within the layer scaled to [0, 1], so layers of different sizes compare
+    positions: Dict[int, float] = {}
+    def place(layer: List[int]) -> None:
+        for i, v in enumerate(layer):
+            positions[v] = (i + 0.5) / len(layer)
+
+    def barycenter(v: int, neighbours: Dict[int, List[int]]) -> float:
+        linked = neighbours.get(v)
+        if not linked:
+            return positions[v]
+        return sum(positions[u] for u in linked) / len(linked)
+
+    current = [list(layer) for layer in layers]
+    for layer in current:
+        place(layer)
+    best = [list(layer) for layer in current]
+    best_crossings = total_crossings(best)
+    for sweep in range(ORDERING_SWEEPS):
+        if best_crossings == 0:
+            break
+        downward = sweep % 2 == 0
+        neighbours = predecessors if downward else successors
+        indices = range(1, len(current)) if downward else range(len(current) - 2, -1, -1)
+        for i in indices:
+            current[i].sort(key=lambda v: barycenter(v, neighbours))
+            place(current[i])
+        crossings = total_crossings(current)
+        if crossings < best_crossings:
+            best, best_crossings = [list(layer) for layer in current], crossings
+    return best
+
+def _layout(ids: List[str], edges: List[Tuple[int, int]]) -> Dict[str, Any]:
+    # Longest path from a source. _connect emits a node's incoming edges before its
+    # outgoing ones, so one pass in edge order settles every layer
+    layer_of = [0] * len(ids)
+    for u, v in edges:
+        layer_of[v] = max(layer_of[v], layer_of[u] + 1)
+
+    layers: List[List[int]] = [[] for _ in range(max(layer_of, default=-1) + 1)]
+    for v in range(len(ids)):
+        layers[layer_of[v]].append(v)
+    layers = _order_layers(layers, edges)
+
+    nodes = {}
+    for layer_index, layer in enumerate(layers):
+        for order, v in enumerate(layer):
+            offset = order - (len(layer) - 1) / 2
+            nodes[ids[v]] = {
+                "layer": layer_index,
+                "order": order,
+                "position": {"x": layer_index * LAYER_SPACING_2D, "y": offset * NODE_SPACING_2D},
+                "position3D": {
+                    "x": (layer_index - (len(layers) - 1) / 2) * LAYER_SPACING_3D,
+                    "y": 0.0,
+                    "z": offset * NODE_SPACING_3D,
+                },
+            }
+    return {"layers": [[ids[v] for v in layer] for layer in layers], "nodes": nodes}
+
+def pipeline_graph_key(components: Sequence[Dict[str, Any]]) -> str:
+    """Hash of everything connections and layout depend on."""
+    material = [[c.get("id"), *contract(c)] for c in components]
+    return hashlib.sha256(json.dumps(material, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class GraphCache:
+    """Bounded LRU of computed connections and layouts by pipeline hash."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache_lookup("pipeline_graph", entry is not None)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_cache = GraphCache()
+
+def pipeline_graph(components: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Connections and layout of a pipeline's components.
+
+    ``connections`` are typed edges in React Flow's edge format. ``layout`` has
+    ``layers`` (component ids per layer, in display order) and ``nodes`` (per component
+    id: ``layer``, ``order``, ``position`` and ``position3D``). Results are shared
+    between callers and must not be modified.
+    """
+    key = pipeline_graph_key(components)
+    entry = _cache.get(key)
+    if entry is not None:
+        return entry
+
+    ids = [c.get("id") for c in components]
+    typed_edges = _connect([contract(c) for c in components])
+    connections = [
+        {
+            "id": f"e{ids[u]}-{ids[v]}",
+            "source": ids[u],
+            "target": ids[v],
+            "sourceHandle": data_type,
+            "targetHandle": data_type,
+            "dataType": data_type,
+        }
+        for u, v, data_type in typed_edges
+    ]
+    entry = {
+        "connections": connections,
+        "layout": _layout(ids, [(u, v) for u, v, _ in typed_edges]),
+    }
+    _cache.put(key, entry)
+    return entry
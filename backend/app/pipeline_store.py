@@ -0,0 +1,221 @@
+"""
+Persistent, content-addressed store of generated and edited pipelines.
+
+A pipeline's id is the SHA-256 of its canonical content (components, connections,
+name and description), so regenerating or re-saving the same pipeline never creates
+a duplicate. Saving an edited pipeline with a ``parent_id`` links the new version to
+the one it was derived from. Every prompt and set of clarification answers that
+produced a pipeline is recorded as one of its sources.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Fields that define a pipeline's identity; search steps carry timestamps and are excluded
+CONTENT_FIELDS = ("components", "connections", "name", "description")
+
+def pipeline_id(pipeline: Dict[str, Any]) -> str:
+    """Content hash of a pipeline."""
+    content = {field: pipeline.get(field) for field in CONTENT_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class PipelineStore:
+    """SQLite-backed pipeline store, safe to share between worker processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across fork(), so open one per process
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pipelines (
+                    id TEXT PRIMARY KEY,
+                    parent_id TEXT REFERENCES pipelines (id),
+                    created_at REAL NOT NULL,
+                    body TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pipelines_parent_id ON pipelines (parent_id);
+                CREATE INDEX IF NOT EXISTS pipelines_created_at ON pipelines (created_at);
+                CREATE TABLE IF NOT EXISTS pipeline_sources (
+                    pipeline_id TEXT NOT NULL REFERENCES pipelines (id),
+                    prompt TEXT NOT NULL,
+                    mode TEXT,
+                    clarification_answers TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pipeline_sources_pipeline_id ON pipeline_sources (pipeline_id);
+            """)
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def save(
+        self,
+        pipeline: Dict[str, Any],
+        parent_id: Optional[str] = None,
+        source: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Store a pipeline and return its id. Saving content that already exists keeps
+        the original version links and only records the additional source.
+        """
+        pipeline = {k: v for k, v in pipeline.items() if k != "id"}
+        pid = pipeline_id(pipeline)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if parent_id is not None and parent_id != pid:
+                exists = conn.execute("SELECT 1 FROM pipelines WHERE id = ?", (parent_id,)).fetchone()
+                if exists is None:
+                    raise KeyError(f"Unknown parent pipeline: {parent_id}")
+            else:
+                parent_id = None
+            conn.execute(
+                "INSERT OR IGNORE INTO pipelines (id, parent_id, created_at, body) VALUES (?, ?, ?, ?)",
+                (pid, parent_id, now, json.dumps(pipeline))
+            )
+            if source is not None:
+                conn.execute(
+                    "INSERT INTO pipeline_sources (pipeline_id, prompt, mode, clarification_answers, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (pid, source["prompt"], source.get("mode"),
+                     json.dumps(source.get("clarification_answers")), now)
+                )
+        return pid
+
+    def get(self, pid: str) -> Optional[Dict[str, Any]]:
+        """Return a stored pipeline with its version link and sources, or None."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM pipelines WHERE id = ?", (pid,)).fetchone()
+            if row is None:
+                return None
+            sources = conn.execute(
+                "SELECT prompt, mode, clarification_answers, created_at FROM pipeline_sources "
+                "WHERE pipeline_id = ? ORDER BY created_at", (pid,)
+            ).fetchall()
+        return {
+            "id": row["id"],
+            "parent_id": row["parent_id"],
+            "created_at": row["created_at"],
+            "pipeline": {**json.loads(row["body"]), "id": row["id"]},
+            "sources": [
+                {
+                    "prompt": s["prompt"],
+                    "mode": s["mode"],
+                    "clarification_answers": json.loads(s["clarification_answers"]) if s["clarification_answers"] else None,
+                    "created_at": s["created_at"],
+                }
+                for s in sources
+            ],
+        }
+
+    def _summary(self, row: sqlite3.Row) -> Dict[str, Any]:
+        body = json.loads(row["body"])
+        return {
+            "id": row["id"],
+            "parent_id": row["parent_id"],
+            "created_at": row["created_at"],
+            "name": body.get("name"),
+            "component_ids": [c.get("id") for c in body.get("components", [])],
+        }
+
+    def history(self, pid: str) -> Optional[Dict[str, Any]]:
+        """Return the ancestor chain (oldest first) and direct children of a pipeline."""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("""
+                WITH RECURSIVE ancestors (id, parent_id, created_at, body, depth) AS (
+                    SELECT id, parent_id, created_at, body, 0 FROM pipelines WHERE id = ?
+                    UNION ALL
+                    SELECT p.id, p.parent_id, p.created_at, p.body, a.depth + 1
+                    FROM pipelines p JOIN ancestors a ON p.id = a.parent_id
+                )
+                SELECT * FROM ancestors ORDER BY depth DESC
+            """, (pid,)).fetchall()
+            if not rows:
+                return None
+            children = conn.execute(
+                "SELECT * FROM pipelines WHERE parent_id = ? ORDER BY created_at", (pid,)
+            ).fetchall()
+        return {
+            "id": pid,
+            "versions": [self._summary(r) for r in rows],
+            "children": [self._summary(r) for r in children],
+        }
+
+    def list_recent(self, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Most recently created pipelines, newest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM pipelines ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [self._summary(r) for r in rows]
+
+    def recent_sources(self, limit: int) -> List[Dict[str, Any]]:
+        """The ``limit`` most recent sources with their pipeline ids, oldest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM (SELECT pipeline_id, prompt, mode, clarification_answers, created_at "
+                "FROM pipeline_sources ORDER BY created_at DESC LIMIT ?) ORDER BY created_at", (limit,)
+            ).fetchall()
+        return [
+            {
+                "pipeline_id": r["pipeline_id"],
+                "prompt": r["prompt"],
+                "mode": r["mode"],
+                "clarification_answers": json.loads(r["clarification_answers"]) if r["clarification_answers"] else None,
+            }
+            for r in rows
+        ]
+
+    def component_history(self, limit: int) -> List[Tuple[List[str], List[str]]]:
+        """Component ids and source prompts of the ``limit`` most recent pipelines, oldest first."""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT * FROM (SELECT id, body, created_at FROM pipelines ORDER BY created_at DESC LIMIT ?) "
+                "ORDER BY created_at", (limit,)
+            ).fetchall()
+            prompts: Dict[str, List[str]] = {}
+            for pid, prompt in conn.execute(
+                "SELECT pipeline_id, prompt FROM pipeline_sources WHERE pipeline_id IN "
+                "(SELECT id FROM pipelines ORDER BY created_at DESC LIMIT ?)", (limit,)
+            ):
+                prompts.setdefault(pid, []).append(prompt)
+        return [
+            ([c.get("id") for c in json.loads(r["body"]).get("components", [])], prompts.get(r["id"], []))
+            for r in rows
+        ]
+
+    def edits(self, limit: int) -> List[Tuple[List[str], List[str]]]:
+        """Component ids of (parent, child) version pairs for the ``limit`` most recent edits, oldest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM (SELECT parent.body AS parent_body, child.body AS child_body, child.created_at "
+                "FROM pipelines child JOIN pipelines parent ON parent.id = child.parent_id "
+                "ORDER BY child.created_at DESC LIMIT ?) ORDER BY created_at", (limit,)
+            ).fetchall()
+        return [
+            tuple([c.get("id") for c in json.loads(r[body]).get("components", [])] for body in ("parent_body", "child_body"))
+            for r in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
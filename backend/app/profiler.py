@@ -0,0 +1,379 @@
+"""
+Dry-run profiling of pipeline components on this host.
+
+Each component is run on synthetic data at several sizes, each in its own process
+that is killed if it runs past the timeout, and the fit/transform/predict latency,
+peak RSS and how latency scales with the number of rows are measured. The synthetic
+data matches the shape and per-column mean and standard deviation of an uploaded
+dataset's profile when one is given. Results are cached in the shared cache by
+component configuration, data shape and host, so repeated requests don't re-run the
+workloads.
+
+Generated code is never executed. Catalog components are profiled with a fixed
+workload per component, and code is only parsed: scikit-learn estimators it imports
+are profiled with the constructor arguments written as literals in the code.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+import ast
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import time
+
+from .cache import get_cache
+from .sessions import fingerprint
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+    from .pipeline_generator import Component
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever workloads or measurements change so cached profiles are re-measured
+PROFILER_VERSION = "1"
+PHASES = ("fit", "transform", "predict")
+# Fast phases are repeated until this much time is spent, keeping the fastest run
+MIN_TIMED_SECONDS = 0.05
+MAX_REPEATS = 5
+
+# Workloads for catalog components whose snippet isn't a scikit-learn estimator
+CATALOG_RECIPES = {
+    "outlier_filter": {"kind": "zscore_filter"},
+    "time_alignment": {"kind": "resample"},
+    "json_exporter": {"kind": "json_export"},
+    "data_validator": {"kind": "jsonschema_validate"},
+    "transformer_model": {"kind": "torch_transformer"},
+}
+# Only estimators from these packages are profiled from code
+ESTIMATOR_PACKAGES = ("sklearn",)
+# What ast.parse and ast.literal_eval raise on code they can't handle: bad syntax or null
+# bytes, unhashable dict keys and set members, and nesting too deep for the parser
+_UNPARSEABLE = (ValueError, TypeError, SyntaxError, RecursionError, MemoryError)
+
+def estimator_recipes(code: str) -> List[Dict[str, Any]]:
+    """
+    scikit-learn estimators imported by ``code``, with literal constructor arguments.
+
+    The code is parsed, not executed; arguments that aren't literals are left at their
+    defaults.
+    """
+    try:
+        tree = ast.parse(code)
+    except _UNPARSEABLE:
+        return []
+    imported: Dict[str, Tuple[str, str]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] in ESTIMATOR_PACKAGES:
+            for alias in node.names:
+                if alias.name[:1].isupper():
+                    imported[alias.asname or alias.name] = (node.module, alias.name)
+    recipes: Dict[str, Dict[str, Any]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in imported:
+            kwargs = {}
+            for keyword in node.keywords:
+                try:
+                    kwargs[keyword.arg] = ast.literal_eval(keyword.value)
+                except _UNPARSEABLE:
+                    continue
+            module, name = imported[node.func.id]
+            recipes.setdefault(node.func.id, {"kind": "sklearn", "module": module, "name": name, "kwargs": kwargs})
+    for local_name, (module, name) in imported.items():
+        recipes.setdefault(local_name, {"kind": "sklearn", "module": module, "name": name, "kwargs": {}})
+    return list(recipes.values())
+
+def component_recipe(component: "Component") -> Optional[Dict[str, Any]]:
+    """Workload used to profile a catalog component, or None if there is none."""
+    if component.id in CATALOG_RECIPES:
+        return CATALOG_RECIPES[component.id]
+    recipes = estimator_recipes(component.code_snippet)
+    return recipes[0] if recipes else None
+
+def host_id() -> str:
+    """Identifies the hardware and interpreter measurements were taken on."""
+    return f"{platform.machine()}-{os.cpu_count()}cpu-{platform.python_implementation()}{platform.python_version()}"
+
+# Workloads, run in the profiling processes
+
+def _synthetic_data(rows: int, columns: int, column_stats: Optional[List[Dict[str, float]]], seed: int):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((rows, columns))
+    if column_stats:
+        means = np.array([s["mean"] for s in column_stats[:columns]])
+        stds = np.array([s["std"] or 1.0 for s in column_stats[:columns]])
+        X = X * stds + means
+    return X
+
+def _sklearn_workload(recipe: Dict[str, Any], X) -> Dict[str, Any]:
+    import importlib
+    import numpy as np
+    from sklearn.base import is_classifier
+
+    estimator_class = getattr(importlib.import_module(recipe["module"]), recipe["name"])
+    kwargs = dict(recipe["kwargs"])
+    # Keep component counts valid for narrow data
+    if isinstance(kwargs.get("n_components"), int):
+        kwargs["n_components"] = min(kwargs["n_components"], X.shape[1])
+    estimator = estimator_class(**kwargs)
+    if is_classifier(estimator):
+        y = (X[:, 0] > np.median(X[:, 0])).astype(int)
+    else:
+        y = X @ np.linspace(1.0, 0.1, X.shape[1])
+    phases = {"fit": lambda: estimator.fit(X, y)}
+    if hasattr(estimator, "transform"):
+        phases["transform"] = lambda: estimator.transform(X)
+    if hasattr(estimator, "predict"):
+        phases["predict"] = lambda: estimator.predict(X)
+    return phases
+
+def _zscore_filter_workload(recipe: Dict[str, Any], X) -> Dict[str, Any]:
+    import pandas as pd
+    df = pd.DataFrame(X)
+    stats = {}
+    def fit():
+        stats["mean"], stats["std"] = df.mean(), df.std()
+    def transform():
+        z_scores = ((df - stats["mean"]) / stats["std"]).abs()
+        return df[(z_scores < 3).all(axis=1)]
+    return {"fit": fit, "transform": transform}
+
+def _resample_workload(recipe: Dict[str, Any], X) -> Dict[str, Any]:
+    import pandas as pd
+    df = pd.DataFrame(X, index=pd.date_range("2024-01-01", periods=len(X), freq="min"))
+    return {"transform": lambda: df.resample("1h").mean()}
+
+def _json_export_workload(recipe: Dict[str, Any], X) -> Dict[str, Any]:
+    predictions = X[:, 0].tolist()
+    return {"transform": lambda: json.dumps(predictions)}
+
+def _jsonschema_validate_workload(recipe: Dict[str, Any], X) -> Dict[str, Any]:
+    import jsonschema
+    columns = [f"f{i}" for i in range(min(8, X.shape[1]))]
+    records = [dict(zip(columns, row)) for row in X[:, :len(columns)].tolist()]
+    validator = jsonschema.Draft7Validator({
+        "type": "object",
+        "properties": {c: {"type": "number"} for c in columns},
+        "required": columns,
+    })
+    def transform():
+        for record in records:
+            validator.validate(record)
+    return {"transform": transform}
+
+def _torch_transformer_workload(recipe: Dict[str, Any], X) -> Dict[str, Any]:
+    import torch
+    inputs = torch.as_tensor(X, dtype=torch.float32)
+    projection = torch.nn.Linear(X.shape[1], 32)
+    encoder = torch.nn.TransformerEncoderLayer(d_model=32, nhead=4, batch_first=True)
+    encoder.eval()
+    def predict():
+        with torch.no_grad():
+            for start in range(0, len(inputs), 1024):
+                encoder(projection(inputs[start:start + 1024]).unsqueeze(1))
+    return {"predict": predict}
+
+_WORKLOADS = {
+    "sklearn": _sklearn_workload,
+    "zscore_filter": _zscore_filter_workload,
+    "resample": _resample_workload,
+    "json_export": _json_export_workload,
+    "jsonschema_validate": _jsonschema_validate_workload,
+    "torch_transformer": _torch_transformer_workload,
+}
+
+def _peak_rss_bytes() -> int:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _time_phase(fn) -> float:
+    best = math.inf
+    spent = 0.0
+    for _ in range(MAX_REPEATS):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent >= MIN_TIMED_SECONDS:
+            break
+    return best
+
+def run_workload(
+    recipe: Dict[str, Any],
+    rows: int,
+    columns: int,
+    column_stats: Optional[List[Dict[str, float]]] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Measure one workload at one data size; runs in a fresh profiling process."""
+    measurement: Dict[str, Any] = {"rows": rows, "columns": columns}
+    try:
+        X = _synthetic_data(rows, columns, column_stats, seed)
+        phases = _WORKLOADS[recipe["kind"]](recipe, X)
+    except ImportError as e:
+        return {**measurement, "status": "unavailable", "reason": f"{e.name or e} is not installed"}
+    except Exception as e:
+        return {**measurement, "status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+    baseline = _peak_rss_bytes()
+    try:
+        for phase in PHASES:
+            if phase in phases:
+                measurement[f"{phase}_ms"] = round(_time_phase(phases[phase]) * 1000, 3)
+    except Exception as e:
+        return {**measurement, "status": "error", "reason": f"{type(e).__name__}: {e}"}
+    peak = _peak_rss_bytes()
+    measurement.update(
+        status="ok",
+        peak_rss_mb=round(peak / 2**20, 1),
+        rss_increase_mb=round(max(0, peak - baseline) / 2**20, 1),
+    )
+    return measurement
+
+def _run_in_process(connection, args: tuple) -> None:
+    """Entry point of a profiling process: send the measurement back to the server."""
+    try:
+        connection.send(run_workload(*args))
+    finally:
+        connection.close()
+
+# Service
+
+def scaling_exponent(measurements: Sequence[Dict[str, Any]]) -> Optional[float]:
+    """Slope of total latency against rows on a log-log scale (1.0 is linear)."""
+    points = [
+        (math.log(m["rows"]), math.log(total))
+        for m in measurements
+        if m.get("status") == "ok" and (total := sum(m.get(f"{p}_ms", 0.0) for p in PHASES)) > 0
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / variance, 2)
+
+def performance_impact(measurements: Sequence[Dict[str, Any]], exponent: Optional[float]) -> Dict[str, str]:
+    """Human-readable summary in the shape of ``AgentReasoning.performance_impact``."""
+    ok = [m for m in measurements if m.get("status") == "ok"]
+    if not ok:
+        return {}
+    largest = max(ok, key=lambda m: m["rows"])
+    latency = ", ".join(f"{p} {largest[f'{p}_ms']:.1f} ms" for p in PHASES if f"{p}_ms" in largest)
+    impact = {
+        "latency": f"{latency} on {largest['rows']:,} rows x {largest['columns']} columns",
+        "memory": f"+{largest['rss_increase_mb']:.1f} MB peak RSS on {largest['rows']:,} rows",
+    }
+    if exponent is not None:
+        impact["scaling"] = f"latency grows as rows^{exponent:.2f}"
+    return impact
+
+class PipelineProfiler:
+    """Runs component workloads in isolated, killable processes and caches the results."""
+
+    def __init__(self, max_workers: int, timeout: float, cache_ttl: float):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._slots = asyncio.Semaphore(max(1, max_workers))
+        self._processes: Set["BaseProcess"] = set()
+
+    @property
+    def cache(self):
+        return get_cache("profiles", default_ttl=self.cache_ttl)
+
+    async def _measure(self, recipe: Dict[str, Any], rows: int, columns: int, column_stats, seed: int) -> Dict[str, Any]:
+        # Waiting for a slot doesn't count against the timeout
+        async with self._slots:
+            try:
+                return await self._run(recipe, rows, columns, column_stats, seed)
+            except asyncio.TimeoutError:
+                return {"rows": rows, "columns": columns, "status": "timeout", "reason": f"took longer than {self.timeout:g}s"}
+            except Exception as e:
+                return {"rows": rows, "columns": columns, "status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+    async def _run(self, recipe: Dict[str, Any], rows: int, columns: int, column_stats, seed: int) -> Dict[str, Any]:
+        """Run one measurement in a fresh process, killing it if it outlives the timeout."""
+        import multiprocessing
+
+        # A fresh process per measurement keeps peak RSS and imports from leaking
+        # between workloads, and contains crashes in native code
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_run_in_process, args=(sender, (recipe, rows, columns, column_stats, seed)), daemon=True
+        )
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        try:
+            process.start()
+            self._processes.add(process)
+            sender.close()
+            # Readable once the measurement arrives, or at EOF if the process dies
+            loop.add_reader(receiver.fileno(), lambda: ready.done() or ready.set_result(None))
+            try:
+                await asyncio.wait_for(ready, self.timeout)
+            finally:
+                loop.remove_reader(receiver.fileno())
+            try:
+                return receiver.recv()
+            except EOFError:
+                # e.g. killed by the OOM killer
+                process.join(1)
+                raise RuntimeError(f"profiling process exited with code {process.exitcode}") from None
+        finally:
+            if process.is_alive():
+                process.kill()
+            self._processes.discard(process)
+            sender.close()
+            receiver.close()
+            if process.pid is not None and not loop.is_closed():
+                # Reap the child off the event loop; a killed child exits at once
+                loop.run_in_executor(None, process.join)
+
+    async def profile(
+        self,
+        recipe: Dict[str, Any],
+        sizes: Sequence[int],
+        columns: int,
+        column_stats: Optional[List[Dict[str, float]]] = None,
+        seed: int = 0
+    ) -> Dict[str, Any]:
+        """Measurements of one workload at every size, with its scaling and a summary."""
+        key = fingerprint(PROFILER_VERSION, host_id(), recipe, sorted(sizes), columns, column_stats, seed)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        measurements = await asyncio.gather(*(
+            self._measure(recipe, rows, columns, column_stats, seed) for rows in sorted(sizes)
+        ))
+        statuses = {m["status"] for m in measurements}
+        exponent = scaling_exponent(measurements)
+        result = {
+            "status": statuses.pop() if len(statuses) == 1 else "partial",
+            "reason": next((m["reason"] for m in measurements if m.get("reason")), None),
+            "measurements": list(measurements),
+            "scaling_exponent": exponent,
+            "performance_impact": performance_impact(measurements, exponent),
+        }
+        # Timeouts and errors may be transient, so only complete results are kept
+        if result["status"] in ("ok", "unavailable"):
+            await self.cache.set(key, result)
+        return {**result, "cached": False}
+
+    def close(self) -> None:
+        """Kill measurements still running, e.g. on shutdown."""
+        for process in list(self._processes):
+            if process.is_alive():
+                process.kill()
+        self._processes.clear()
@@ -0,0 +1,380 @@
+"""
+Local, LLM-free component recommendations for the component browser.
+
+Each catalog component gets four features for a query:
+
+- ``lexical``: BM25 relevance of the query to the component's name, type, description
+  and agent notes. The last word is prefix-matched, so results update as the user types
+- ``association``: how often past pipelines whose prompts shared the query's words
+  included the component
+- ``co_occurrence``: how often past pipelines containing the components already on
+  the canvas also included this one
+- ``popularity``: the share of past pipelines that include the component
+
+A logistic model over the features gives ``confidence``, the estimated probability that
+the component belongs in the user's pipeline, and components are ranked by it. The model
+is fitted on stored pipelines, leave-one-out so a pipeline never vouches for itself, with
+feature weights kept non-negative so more evidence never lowers a score. The lexical
+weight is held at ``LEXICAL_MIN_WEIGHT`` or more: stored prompts rarely name components,
+but in the browser what the user types has to steer the results. Each training example
+scores its pipeline's components and ``NEGATIVE_SAMPLES`` others drawn from the rest of
+the catalog, weighted up to stand for all of them, so fitting cost doesn't grow with the
+catalog. The model is refitted in a background thread as new pipelines are saved, and the
+new weights replace the old ones once fitted; until enough pipelines exist, default
+weights are used.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+from bisect import bisect_left
+from collections import Counter, deque
+import copy
+import math
+import threading
+
+from .semantic_cache import tokenize
+
+if TYPE_CHECKING:
+    import numpy as np
+    from .pipeline_generator import Component
+
+FEATURES = ("lexical", "association", "co_occurrence", "popularity")
+# Feature weights followed by the intercept, used until there is enough history to fit them
+DEFAULT_WEIGHTS = (6.0, 6.0, 5.0, 1.0, -3.0)
+# Lower bound of each fitted feature weight
+MIN_WEIGHTS = (2.0, 0.0, 0.0, 0.0)
+LEXICAL_MIN_WEIGHT = MIN_WEIGHTS[0]
+
+# BM25 parameters and the score at which the lexical feature reaches 0.5
+BM25_K1 = 1.2
+BM25_B = 0.75
+LEXICAL_SATURATION = 2.0
+# Pseudo-count pulling sparse association statistics towards the component's popularity
+SMOOTHING = 2.0
+# Prefix expansions considered for the word being typed
+MAX_PREFIX_EXPANSIONS = 8
+# Components outside the pipeline scored per training example
+NEGATIVE_SAMPLES = 32
+
+def _component_text(component: "Component") -> Tuple[str, str]:
+    """Heavily weighted (name, id) text and the rest of a component's searchable text."""
+    agent = component.agent or {}
+    title = f"{component.name} {component.id.replace('_', ' ')}"
+    body = " ".join([component.type, component.description, agent.get("role", ""), agent.get("why_chosen", "")])
+    return title, body
+
+class ComponentRecommender:
+    """Ranks catalog components for a prompt and the components already chosen."""
+
+    def __init__(self, catalog: List["Component"], min_training_pipelines: int = 20,
+                 refit_interval: int = 50, history_limit: int = 2000):
+        import numpy as np
+
+        self.catalog = catalog
+        self.min_training_pipelines = min_training_pipelines
+        self.refit_interval = refit_interval
+        self._index = {c.id: i for i, c in enumerate(catalog)}
+        self.weights = np.array(DEFAULT_WEIGHTS)
+        self.fitted = False
+
+        # BM25 postings: term -> [(component index, term weight)]
+        documents = []
+        for component in catalog:
+            title, body = _component_text(component)
+            documents.append(Counter(tokenize(title) * 3 + tokenize(body)))
+        average_length = sum(sum(d.values()) for d in documents) / max(1, len(documents))
+        document_frequency = Counter(term for d in documents for term in d)
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        for i, document in enumerate(documents):
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(document.values()) / max(average_length, 1e-9))
+            for term, tf in document.items():
+                idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                self._postings.setdefault(term, []).append((i, idf * tf * (BM25_K1 + 1) / (tf + length_norm)))
+        self._vocabulary = sorted(self._postings)
+
+        # Statistics over past pipelines
+        self._pipelines = 0
+        self._component_counts = np.zeros(len(catalog))
+        self._pair_counts: Dict[int, Counter] = {}
+        self._term_counts: Dict[str, Counter] = {}
+        self._term_totals: Counter = Counter()
+        self._history: "deque[Tuple[Set[str], List[int]]]" = deque(maxlen=history_limit)
+        self._since_fit = 0
+        self._refit_thread: Optional[threading.Thread] = None
+
+    # History
+
+    def observe(self, component_ids: Iterable[str], prompts: Sequence[str] = (), refit: bool = True) -> None:
+        """Add a stored pipeline's components and the prompts that produced it to the statistics."""
+        components = list(dict.fromkeys(self._index[c] for c in component_ids if c in self._index))
+        if not components:
+            return
+        terms = {t for prompt in prompts for t in tokenize(prompt)}
+        self._pipelines += 1
+        for c in components:
+            self._component_counts[c] += 1
+            pairs = self._pair_counts.setdefault(c, Counter())
+            pairs.update(other for other in components if other != c)
+        for term in terms:
+            self._term_totals[term] += 1
+            self._term_counts.setdefault(term, Counter()).update(components)
+        self._history.append((terms, components))
+        self._since_fit += 1
+        if refit and self._since_fit >= self.refit_interval:
+            self._refit_in_background()
+
+    def load(self, history: List[Tuple[List[str], List[str]]]) -> None:
+        """Replay stored pipelines, e.g. from ``PipelineStore.component_history``, then fit."""
+        for component_ids, prompts in history:
+            self.observe(component_ids, prompts, refit=False)
+        self.fit()
+
+    # Features
+
+    def _lexical(self, terms: List[str], candidates: Optional["np.ndarray"] = None) -> "np.ndarray":
+        import numpy as np
+
+        scores = np.zeros(len(self.catalog))
+        for term in terms:
+            for i, weight in self._postings.get(term, ()):
+                scores[i] += weight
+        if candidates is not None:
+            scores = scores[candidates]
+        return scores / (scores + LEXICAL_SATURATION)
+
+    def _counts(self, counts: Dict[int, int], candidates: Optional["np.ndarray"]) -> "np.ndarray":
+        """A sparse per-component count as a vector over the catalog, or over ``candidates``."""
+        import numpy as np
+
+        if candidates is not None:
+            return np.array([counts.get(int(c), 0) for c in candidates], dtype=float)
+        vector = np.zeros(len(self.catalog))
+        for c, n in counts.items():
+            vector[c] = n
+        return vector
+
+    def _query_terms(self, prompt: str) -> List[str]:
+        """Prompt terms, with the word still being typed expanded to vocabulary words it prefixes."""
+        terms = tokenize(prompt)
+        if not terms or prompt[-1:].isspace() or terms[-1] in self._postings:
+            return terms
+        partial = terms.pop()
+        start = bisect_left(self._vocabulary, partial)
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(partial):
+                break
+            terms.append(term)
+        return terms
+
+    def _features(
+        self,
+        query_terms: List[str],
+        current: Sequence[int],
+        exclude: Optional[Tuple[Set[str], List[int]]] = None,
+        candidates: Optional["np.ndarray"] = None
+    ) -> "np.ndarray":
+        """
+        Feature matrix (components x FEATURES), for the whole catalog or only ``candidates``.
+        ``exclude`` removes one past pipeline's own counts.
+        """
+        import numpy as np
+
+        own_terms, own_components = exclude or (set(), [])
+        indices = np.arange(len(self.catalog)) if candidates is None else candidates
+        own = np.isin(indices, own_components).astype(float)
+        pipelines = self._pipelines - (1 if exclude else 0)
+        popularity = (self._component_counts[indices] - own + 1) / (pipelines + 2)
+
+        association = np.zeros(len(indices))
+        known_terms = 0
+        for term in set(query_terms):
+            total = self._term_totals.get(term, 0) - (1 if term in own_terms else 0)
+            if total <= 0:
+                continue
+            counts = self._counts(self._term_counts[term], candidates)
+            if term in own_terms:
+                counts -= own
+            association += (counts + SMOOTHING * popularity) / (total + SMOOTHING)
+            known_terms += 1
+        # Without evidence the feature is 0 and popularity alone carries the base rate
+        association = association / known_terms if known_terms else association
+
+        co_occurrence = np.zeros(len(indices))
+        for c in current:
+            in_own = c in own_components
+            total = self._component_counts[c] - in_own
+            counts = self._counts(self._pair_counts.get(c, {}), candidates)
+            if in_own:
+                counts -= own
+                counts[indices == c] = 0
+            co_occurrence += (counts + SMOOTHING * popularity) / (total + SMOOTHING)
+        co_occurrence = co_occurrence / len(current) if current else co_occurrence
+
+        return np.column_stack([self._lexical(query_terms, candidates), association, co_occurrence, popularity])
+
+    # Calibration
+
+    def fit(self, l2: float = 1.0, iterations: int = 25) -> None:
+        """Fit the logistic weights on stored pipelines and use them from now on."""
+        self._since_fit = 0
+        weights = self._fit_weights(l2, iterations)
+        if weights is not None:
+            self.weights = weights
+            self.fitted = True
+
+    def _refit_in_background(self) -> None:
+        """Fit on a snapshot of the statistics in a thread, then swap the new weights in."""
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            # The count since the last fit stays over the interval, so the next pipeline retries
+            return
+        self._since_fit = 0
+        snapshot = self._snapshot()
+
+        def refit() -> None:
+            weights = snapshot._fit_weights()
+            if weights is not None:
+                self.weights = weights
+                self.fitted = True
+
+        self._refit_thread = threading.Thread(target=refit, name="recommender-refit", daemon=True)
+        self._refit_thread.start()
+
+    def _snapshot(self) -> "ComponentRecommender":
+        """A copy whose statistics later observations don't change; the catalog and postings are shared."""
+        snapshot = copy.copy(self)
+        snapshot._component_counts = self._component_counts.copy()
+        snapshot._pair_counts = {c: Counter(pairs) for c, pairs in self._pair_counts.items()}
+        snapshot._term_counts = {t: Counter(counts) for t, counts in self._term_counts.items()}
+        snapshot._term_totals = Counter(self._term_totals)
+        snapshot._history = deque(self._history, maxlen=self._history.maxlen)
+        snapshot._refit_thread = None
+        return snapshot
+
+    def _fit_weights(self, l2: float = 1.0, iterations: int = 25) -> Optional["np.ndarray"]:
+        """Logistic weights fitted on stored pipelines by projected Newton's method, if there's enough data."""
+        import numpy as np
+
+        if len(self._history) < self.min_training_pipelines:
+            return None
+        rng = np.random.default_rng(0)
+        rows, labels, sample_weights = [], [], []
+        for terms, components in self._history:
+            query = sorted(terms)
+            outside = len(self.catalog) - len(components)
+            # The pipeline's components plus a sample of the rest, each standing in for `stand_in` components
+            pool = rng.choice(len(self.catalog), size=min(len(self.catalog), NEGATIVE_SAMPLES + len(components)), replace=False)
+            negatives = pool[~np.isin(pool, components)][:NEGATIVE_SAMPLES]
+            stand_in = outside / len(negatives) if len(negatives) else 0.0
+            # The prompt alone, the first component alone, and both together
+            views = [(query, [])]
+            if len(components) > 1:
+                views += [([], components[:1]), (query, components[:1])]
+            for view_query, current in views:
+                positives = np.array([c for c in components if c not in current], dtype=int)
+                candidates = np.concatenate([positives, negatives])
+                rows.append(self._features(view_query, current, exclude=(terms, components), candidates=candidates))
+                labels.append(np.concatenate([np.ones(len(positives)), np.zeros(len(negatives))]))
+                sample_weights.append(np.concatenate([np.ones(len(positives)), np.full(len(negatives), stand_in)]))
+        X = np.vstack(rows)
+        X = np.column_stack([X, np.ones(len(X))])
+        y = np.concatenate(labels)
+        s = np.concatenate(sample_weights)
+        if y.min() == y.max():
+            return None
+        penalty = l2 * np.eye(X.shape[1])
+        penalty[-1, -1] = 0  # don't shrink the intercept
+
+        def loss(w: "np.ndarray") -> float:
+            z = X @ w
+            return float(np.sum(s * (np.logaddexp(0, z) - y * z)) + 0.5 * w @ penalty @ w)
+
+        # Start from the base rate and take damped Newton steps, halving any step that doesn't help
+        base_rate = float(np.sum(s * y) / np.sum(s))
+        w = self._project(np.zeros(X.shape[1]))
+        w[-1] = math.log(base_rate / (1 - base_rate))
+        current = loss(w)
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-np.clip(X @ w, -30, 30)))
+            gradient = X.T @ (s * (p - y)) + penalty @ w
+            hessian = (X * (s * p * (1 - p))[:, None]).T @ X + penalty
+            try:
+                step = np.linalg.lstsq(hessian, gradient, rcond=None)[0]
+            except np.linalg.LinAlgError:
+                return None
+            scale = 1.0
+            while scale > 1e-3 and loss(self._project(w - scale * step)) > current:
+                scale /= 2
+            w = self._project(w - scale * step)
+            previous, current = current, loss(w)
+            if previous - current < 1e-8:
+                break
+        if not np.all(np.isfinite(w)):
+            return None
+        return w
+
+    @staticmethod
+    def _project(w: "np.ndarray") -> "np.ndarray":
+        """Clamp feature weights (not the intercept) to their lower bounds."""
+        w = w.copy()
+        w[:-1] = w[:-1].clip(min=MIN_WEIGHTS)
+        return w
+
+    # Ranking
+
+    def _confidence(self, features: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        weights = self.weights  # read once; a background refit may swap it
+        return 1 / (1 + np.exp(-np.clip(features @ weights[:-1] + weights[-1], -30, 30)))
+
+    def recommend(self, prompt: str, current_ids: Sequence[str] = (), limit: int = 5) -> List[Dict[str, Any]]:
+        """Top components for a prompt, excluding those already chosen, as ComponentRecommendation dicts."""
+        import numpy as np
+
+        current = [self._index[c] for c in dict.fromkeys(current_ids) if c in self._index]
+        query_terms = self._query_terms(prompt)
+        features = self._features(query_terms, current)
+        confidence = self._confidence(features)
+        confidence[current] = -1
+        ranked = np.argsort(-confidence, kind="stable")[:limit]
+        return [
+            {
+                "id": self.catalog[i].id,
+                "name": self.catalog[i].name,
+                "description": self.catalog[i].description,
+                "confidence": round(float(confidence[i]), 4),
+                "reason": self._reason(int(i), features[i], query_terms, current),
+            }
+            for i in ranked if confidence[i] >= 0
+        ]
+
+    def score(self, prompt: str, component_ids: Sequence[str]) -> Dict[str, float]:
+        """Confidence for specific components, e.g. ones picked by the LLM in agentic mode."""
+        import numpy as np
+
+        features = self._features(self._query_terms(prompt), [])
+        confidence = self._confidence(features)
+        return {c: round(float(confidence[self._index[c]]), 4) for c in component_ids if c in self._index}
+
+    def _reason(self, i: int, features: "np.ndarray", query_terms: List[str], current: List[int]) -> str:
+        """Explain a recommendation by the feature contributing most to its score."""
+        contributions = features * self.weights[:-1]
+        feature = FEATURES[int(contributions.argmax())]
+        if feature == "lexical":
+            matched = [t for t in dict.fromkeys(query_terms) if any(c == i for c, _ in self._postings.get(t, ()))]
+            if matched:
+                return "Matches " + ", ".join(f"'{t}'" for t in matched[:3])
+        if feature == "association":
+            best = max(
+                (t for t in set(query_terms) if self._term_totals.get(t)),
+                key=lambda t: self._term_counts[t][i] / self._term_totals[t],
+                default=None
+            )
+            if best is not None and self._term_counts[best][i]:
+                return f"In {self._term_counts[best][i]} of {self._term_totals[best]} past pipelines for prompts mentioning '{best}'"
+        if feature == "co_occurrence" and current:
+            partner = max(current, key=lambda c: self._pair_counts.get(c, {}).get(i, 0))
+            if self._pair_counts.get(partner, {}).get(i):
+                return f"Often used with {self.catalog[partner].name}"
+        count = int(self._component_counts[i])
+        if count:
+            return f"Used in {count} of {self._pipelines} past pipelines"
+        return f"{self.catalog[i].type.capitalize()} component"
@@ -0,0 +1,372 @@
+"""
+Fair-share scheduling of outbound LLM and search calls.
+
+Every upstream call waits for a slot from its upstream's ``UpstreamScheduler``:
+
+- at most ``max_concurrency`` calls run at once, and LLM calls also draw their
+  estimated tokens from a tokens-per-minute bucket
+- waiting calls are served from two lanes: ``interactive`` (quick-mode generation,
+  clarification, code generation) always goes ahead of ``background`` (agentic
+  generation, batches, jobs)
+- within a lane, clients are served round-robin, so one client with many queued
+  calls can't starve the others
+- a client over its own tokens-per-minute quota, or with too many calls queued, is
+  rejected immediately with ``ClientOverQuota`` (429 with Retry-After in the API),
+  unless the work was started with ``wait_for_quota=True``: batches and jobs have no
+  caller waiting on a 429, so they wait until the client's quota frees up instead
+
+The lane and client are taken from context variables: ``SchedulerContextMiddleware``
+sets the client to the peer address, or to the ``X-Client-Id`` header for requests
+relayed by a trusted proxy, and endpoints mark background work with
+``scheduling(lane="background")``. Clients can't pick their own id, since a fresh id
+would mean a fresh quota. Limits apply per worker
+process, so divide upstream budgets by the number of uvicorn workers.
+"""
+from typing import Any, Deque, Dict, Iterator, Optional, Sequence, Tuple
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+import asyncio
+import ipaddress
+import math
+import time
+
+from .core.config import get_settings
+from .metrics import REGISTRY, Counter, Gauge, Histogram
+
+LANES = ("interactive", "background")
+QUOTA_WINDOW = 60.0
+# How often calls waiting for quota recheck a client's full queue
+QUEUE_RECHECK_INTERVAL = 0.1
+
+SCHEDULER_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "upstream_queue_wait_seconds", "Time upstream calls wait for a scheduler slot", ("upstream", "lane")
+))
+SCHEDULER_QUEUED = REGISTRY.register(Gauge(
+    "upstream_calls_queued", "Upstream calls waiting for a scheduler slot", ("upstream", "lane")
+))
+SCHEDULER_ACTIVE = REGISTRY.register(Gauge(
+    "upstream_calls_active", "Upstream calls holding a scheduler slot", ("upstream",)
+))
+SCHEDULER_REJECTED = REGISTRY.register(Counter(
+    "upstream_calls_rejected_total", "Upstream calls rejected because the client was over quota", ("upstream", "reason")
+))
+SCHEDULER_TOKENS_AVAILABLE = REGISTRY.register(Gauge(
+    "upstream_tokens_available", "Tokens left in the upstream's per-minute budget", ("upstream",)
+))
+
+_lane: ContextVar[str] = ContextVar("scheduler_lane", default="interactive")
+_client_id: ContextVar[str] = ContextVar("scheduler_client_id", default="anonymous")
+_wait_for_quota: ContextVar[bool] = ContextVar("scheduler_wait_for_quota", default=False)
+
+def current_lane() -> str:
+    return _lane.get()
+
+def current_client_id() -> str:
+    return _client_id.get()
+
+@contextmanager
+def scheduling(
+    lane: Optional[str] = None,
+    client_id: Optional[str] = None,
+    wait_for_quota: Optional[bool] = None
+) -> Iterator[None]:
+    """
+    Run the enclosed upstream calls in ``lane`` and/or on behalf of ``client_id``.
+
+    With ``wait_for_quota`` the calls wait while the client is over quota instead of
+    raising ``ClientOverQuota``.
+    """
+    if lane is not None and lane not in LANES:
+        raise ValueError(f"Unknown scheduler lane: {lane}")
+    lane_token = _lane.set(lane) if lane is not None else None
+    client_token = _client_id.set(client_id) if client_id is not None else None
+    wait_token = _wait_for_quota.set(wait_for_quota) if wait_for_quota is not None else None
+    try:
+        yield
+    finally:
+        if wait_token is not None:
+            _wait_for_quota.reset(wait_token)
+        if client_token is not None:
+            _client_id.reset(client_token)
+        if lane_token is not None:
+            _lane.reset(lane_token)
+
+def estimate_tokens(request_params: Dict[str, Any]) -> int:
+    """Rough token cost of a chat completion: ~4 characters per prompt token plus max_tokens."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in request_params.get("messages", []))
+    return prompt_chars // 4 + int(request_params.get("max_tokens") or 0)
+
+class ClientOverQuota(Exception):
+    """Raised when a client's upstream call is rejected instead of queued."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"Client over upstream quota ({reason})")
+        self.retry_after = retry_after
+        self.reason = reason
+
+class _Waiter:
+    __slots__ = ("future", "client_id", "lane", "tokens")
+
+    def __init__(self, future: "asyncio.Future[None]", client_id: str, lane: str, tokens: int):
+        self.future = future
+        self.client_id = client_id
+        self.lane = lane
+        self.tokens = tokens
+
+class Grant:
+    """A held scheduler slot; set ``tokens_used`` once the real usage is known."""
+
+    def __init__(self, client_id: str, tokens: int):
+        self.client_id = client_id
+        self.tokens = tokens
+        self.tokens_used: Optional[int] = None
+
+class UpstreamScheduler:
+    """Concurrency, token budget, priority lanes and per-client fairness for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        tokens_per_minute: int = 0,
+        client_tokens_per_minute: int = 0,
+        client_max_queued: int = 0
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.client_tokens_per_minute = client_tokens_per_minute
+        self.client_max_queued = client_max_queued
+        self._active = 0
+        # Per lane: client id -> that client's waiters, in round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {lane: OrderedDict() for lane in LANES}
+        self._queued_by_client: Dict[str, int] = {}
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        # Per client: (time, tokens) charges within the last QUOTA_WINDOW seconds
+        self._usage: Dict[str, Deque[Tuple[float, int]]] = {}
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """Wait for a slot for a call expected to use ``tokens`` tokens."""
+        client_id = current_client_id()
+        lane = current_lane()
+        start = time.perf_counter()
+        if _wait_for_quota.get():
+            await self._wait_for_quota(client_id, tokens)
+        else:
+            self._check_quota(client_id, tokens)
+
+        await self._acquire(client_id, lane, tokens)
+        SCHEDULER_QUEUE_WAIT.observe(time.perf_counter() - start, upstream=self.name, lane=lane)
+
+        grant = Grant(client_id, tokens)
+        try:
+            yield grant
+        finally:
+            self._release(grant)
+
+    def _check_quota(self, client_id: str, tokens: int) -> None:
+        over_quota = self._over_quota(client_id, tokens)
+        if over_quota is None:
+            return
+        delay, reason = over_quota
+        SCHEDULER_REJECTED.inc(upstream=self.name, reason=reason)
+        if reason == "queue":
+            raise ClientOverQuota(retry_after=1, reason="too many queued calls")
+        raise ClientOverQuota(retry_after=max(1, math.ceil(delay)), reason="token quota")
+
+    async def _wait_for_quota(self, client_id: str, tokens: int) -> None:
+        while True:
+            over_quota = self._over_quota(client_id, tokens)
+            if over_quota is None:
+                return
+            await asyncio.sleep(over_quota[0])
+
+    def _over_quota(self, client_id: str, tokens: int) -> Optional[Tuple[float, str]]:
+        """Seconds until the client's call would be accepted and why, or None if it is now."""
+        if self.client_max_queued and self._queued_by_client.get(client_id, 0) >= self.client_max_queued:
+            return QUEUE_RECHECK_INTERVAL, "queue"
+        if not self.client_tokens_per_minute:
+            return None
+        now = time.monotonic()
+        usage = self._client_usage(client_id, now)
+        used = sum(t for _, t in usage)
+        if used + tokens <= self.client_tokens_per_minute or not usage:
+            return None
+        # Wait until enough of the window's charges have expired to fit this call
+        excess = used + tokens - self.client_tokens_per_minute
+        retry_at = now + QUOTA_WINDOW
+        for charged_at, charged in usage:
+            excess -= charged
+            if excess <= 0:
+                retry_at = charged_at + QUOTA_WINDOW
+                break
+        return retry_at - now, "tokens"
+
+    def _client_usage(self, client_id: str, now: float) -> Deque[Tuple[float, int]]:
+        usage = self._usage.setdefault(client_id, deque())
+        while usage and usage[0][0] <= now - QUOTA_WINDOW:
+            usage.popleft()
+        if not usage:
+            del self._usage[client_id]
+            return deque()
+        return usage
+
+    def _charge(self, client_id: str, tokens: int) -> None:
+        if tokens and self.client_tokens_per_minute:
+            self._usage.setdefault(client_id, deque()).append((time.monotonic(), tokens))
+
+    async def _acquire(self, client_id: str, lane: str, tokens: int) -> None:
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), client_id, lane, tokens)
+        self._queues[lane].setdefault(client_id, deque()).append(waiter)
+        self._queued_by_client[client_id] = self._queued_by_client.get(client_id, 0) + 1
+        SCHEDULER_QUEUED.inc(upstream=self.name, lane=lane)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we were cancelled: hand the slot back
+                self._release(Grant(client_id, tokens))
+            else:
+                self._dequeue(waiter)
+            raise
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        clients = self._queues[waiter.lane]
+        waiters = clients.get(waiter.client_id)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del clients[waiter.client_id]
+        self._unqueued(waiter)
+
+    def _unqueued(self, waiter: _Waiter) -> None:
+        remaining = self._queued_by_client[waiter.client_id] - 1
+        if remaining:
+            self._queued_by_client[waiter.client_id] = remaining
+        else:
+            del self._queued_by_client[waiter.client_id]
+        SCHEDULER_QUEUED.dec(upstream=self.name, lane=waiter.lane)
+
+    def _release(self, grant: Grant) -> None:
+        self._active -= 1
+        SCHEDULER_ACTIVE.set(self._active, upstream=self.name)
+        if grant.tokens_used is not None:
+            # Settle the difference between the estimate and the real usage
+            delta = grant.tokens_used - grant.tokens
+            if self.tokens_per_minute:
+                self._refill()
+                self._tokens -= delta
+            self._charge(grant.client_id, delta)
+        self._dispatch()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        rate = self.tokens_per_minute / 60.0
+        self._tokens = min(float(self.tokens_per_minute), self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+        SCHEDULER_TOKENS_AVAILABLE.set(self._tokens, upstream=self.name)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for lane in LANES:
+            clients = self._queues[lane]
+            if clients:
+                return next(iter(clients.values()))[0]
+        return None
+
+    def _dispatch(self) -> None:
+        while not self.max_concurrency or self._active < self.max_concurrency:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if self.tokens_per_minute:
+                self._refill()
+                # A call bigger than the whole budget goes through once the bucket is full
+                needed = min(waiter.tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    self._schedule_wakeup((needed - self._tokens) / (self.tokens_per_minute / 60.0))
+                    return
+                self._tokens -= waiter.tokens
+
+            # Serve the client's oldest call, then move the client to the back of its lane
+            clients = self._queues[waiter.lane]
+            waiters = clients.pop(waiter.client_id)
+            waiters.popleft()
+            if waiters:
+                clients[waiter.client_id] = waiters
+            self._unqueued(waiter)
+            self._charge(waiter.client_id, waiter.tokens)
+            self._active += 1
+            SCHEDULER_ACTIVE.set(self._active, upstream=self.name)
+            waiter.future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        if self._wakeup is not None and not self._wakeup.cancelled():
+            return
+
+        def wakeup():
+            self._wakeup = None
+            self._dispatch()
+
+        self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.01), wakeup)
+
+@lru_cache()
+def get_scheduler(upstream: str) -> UpstreamScheduler:
+    """Get this worker's scheduler for ``"llm"`` or ``"search"`` calls."""
+    settings = get_settings()
+    if upstream == "llm":
+        return UpstreamScheduler(
+            "llm",
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            client_tokens_per_minute=settings.CLIENT_TOKENS_PER_MINUTE,
+            client_max_queued=settings.CLIENT_MAX_QUEUED
+        )
+    if upstream == "search":
+        return UpstreamScheduler(
+            "search",
+            max_concurrency=settings.SEARCH_MAX_CONCURRENCY,
+            client_max_queued=settings.CLIENT_MAX_QUEUED
+        )
+    raise ValueError(f"Unknown upstream: {upstream}")
+
+class SchedulerContextMiddleware:
+    """
+    Pure ASGI middleware identifying the client that upstream calls are made for.
+
+    Clients are identified by peer address. ``X-Client-Id`` is only honoured from
+    ``trusted_proxies`` (addresses or CIDR ranges), which relay it for the end user.
+    """
+
+    def __init__(self, app, trusted_proxies: Sequence[str] = ()):
+        self.app = app
+        self.trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in trusted_proxies]
+
+    def _trusted(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def client_id(self, scope) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else "anonymous"
+        if client and self._trusted(peer):
+            relayed = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-client-id"), None)
+            if relayed:
+                return relayed[:128]
+        return peer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with scheduling(client_id=self.client_id(scope)):
+            await self.app(scope, receive, send)
@@ -0,0 +1,182 @@
+"""
+Semantic cache in front of pipeline generation.
+
+Exact-match caching misses prompts that differ only in wording ("predict customer
+churn from CSV" / "churn prediction on a csv of customers"). Here each request (prompt
+plus clarification answers) is embedded as a hashed bag of stemmed words and character
+trigrams, and a generated pipeline is reused when a previous request of the same mode
+is at least ``SEMANTIC_CACHE_THRESHOLD`` cosine-similar.
+
+The index lives in each worker process and maps vectors to pipeline store ids, so the
+pipelines themselves stay in the shared store; it is rebuilt from the store's recent
+sources at startup. Small indexes are searched by brute force with NumPy; beyond
+``SEMANTIC_CACHE_HNSW_MIN_ENTRIES`` an HNSW index is used if hnswlib is installed
+(``pip install hnswlib``). At most ``SEMANTIC_CACHE_MAX_ENTRIES`` requests are indexed,
+least recently used first out.
+"""
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from collections import OrderedDict
+import re
+import zlib
+
+from .metrics import REGISTRY, Gauge, Histogram, record_cache_lookup
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SEMANTIC_CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "semantic_cache_entries", "Requests held in the semantic cache index"
+))
+SEMANTIC_CACHE_SIMILARITY = REGISTRY.register(Histogram(
+    "semantic_cache_similarity", "Similarity of the nearest cached request on lookup", ("result",),
+    buckets=(0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0)
+))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Words that carry no meaning about which pipeline to build
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "build", "create", "for", "from", "i", "in", "is", "me",
+    "my", "of", "on", "or", "our", "pipeline", "the", "to", "using", "want", "we", "with"
+}
+_SUFFIXES = ("ation", "ions", "ing", "ion", "ers", "er", "es", "s")
+
+def _stem(token: str) -> str:
+    """Strip a common suffix so "prediction"/"predict" and "customers"/"customer" match."""
+    for suffix in _SUFFIXES:
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Stemmed content words of a text."""
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+def request_text(prompt: str, clarification_answers: Optional[Dict[str, str]] = None) -> str:
+    """
+    Text embedded for a request: the prompt followed by ``question: answer`` pairs,
+    so the same answer to different questions doesn't read as the same request.
+
+    PipelineRequest has no separate domain field; a domain only reaches the cache
+    through the prompt or a clarification answer.
+    """
+    answers = [f"{k}: {v}" for k, v in sorted((clarification_answers or {}).items())]
+    return " ".join([prompt, *answers])
+
+def embed(text: str, dim: int) -> "np.ndarray":
+    """
+    L2-normalized hashed feature vector of a text.
+
+    Features are stemmed content words plus their character trigrams (which absorb
+    typos and inflections the stemmer misses), hashed with CRC32 so vectors are stable
+    across processes, with a hash-derived sign to keep collisions unbiased.
+    """
+    import numpy as np
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in tokenize(text):
+        features = [(f"w:{word}", 1.0)]
+        padded = f"<{word}>"
+        trigrams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        features.extend((f"c:{t}", 1.5 / len(trigrams)) for t in trigrams)
+        for feature, weight in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticCache:
+    """Nearest-neighbour index from request embeddings to pipeline store ids."""
+
+    # Neighbours fetched from HNSW before filtering by mode
+    HNSW_CANDIDATES = 10
+
+    def __init__(self, dim: int, max_entries: int, threshold: float, hnsw_min_entries: int):
+        import numpy as np
+
+        self.dim = dim
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hnsw_min_entries = hnsw_min_entries
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        # Slot -> (request key, pipeline id), and request key -> slot in least recently used order
+        self._slots: List[Optional[Tuple[Tuple[str, str], str]]] = [None] * max_entries
+        self._lru: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._hnsw = None
+        self._hnsw_unavailable = False
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def add(self, mode: str, text: str, pipeline_id: str) -> None:
+        """Index a request and the id of the pipeline generated for it."""
+        key = (mode, text)
+        slot = self._lru.get(key)
+        if slot is None:
+            if len(self._lru) < self.max_entries:
+                slot = len(self._lru)
+            else:
+                _, slot = self._lru.popitem(last=False)
+        self._lru[key] = slot
+        self._lru.move_to_end(key)
+        self._slots[slot] = (key, pipeline_id)
+        self._vectors[slot] = embed(text, self.dim)
+        if self._hnsw is not None:
+            # Re-adding an existing label overwrites the evicted vector in place
+            self._hnsw.add_items(self._vectors[slot:slot + 1], [slot])
+        SEMANTIC_CACHE_ENTRIES.set(len(self._lru))
+
+    def lookup(self, mode: str, text: str) -> Optional[str]:
+        """Return the pipeline id of the most similar cached request, if above the threshold."""
+        best_slot, best_similarity = self._nearest(mode, embed(text, self.dim))
+        hit = best_slot is not None and best_similarity >= self.threshold
+        record_cache_lookup("semantic", hit=hit)
+        if best_slot is not None:
+            SEMANTIC_CACHE_SIMILARITY.observe(best_similarity, result="hit" if hit else "miss")
+        if not hit:
+            return None
+        key, pipeline_id = self._slots[best_slot]
+        self._lru.move_to_end(key)
+        return pipeline_id
+
+    def _nearest(self, mode: str, query: "np.ndarray") -> Tuple[Optional[int], float]:
+        import numpy as np
+
+        count = len(self._lru)
+        if count == 0:
+            return None, 0.0
+        index = self._hnsw_index(count)
+        if index is not None:
+            labels, distances = index.knn_query(query, k=min(self.HNSW_CANDIDATES, count))
+            for slot, distance in zip(labels[0], distances[0]):
+                if self._slots[slot][0][0] == mode:
+                    return int(slot), 1.0 - float(distance)
+            return None, 0.0
+        similarities = self._vectors[:count] @ query
+        modes = np.array([self._slots[i][0][0] == mode for i in range(count)])
+        if not modes.any():
+            return None, 0.0
+        similarities[~modes] = -1.0
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def _hnsw_index(self, count: int):
+        """Build the HNSW index once the cache outgrows brute force, if hnswlib is available."""
+        if self._hnsw is not None or self._hnsw_unavailable or count < self.hnsw_min_entries:
+            return self._hnsw
+        try:
+            import hnswlib
+        except ImportError:
+            self._hnsw_unavailable = True
+            return None
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(max_elements=self.max_entries, ef_construction=200, M=16)
+        index.set_ef(50)
+        index.add_items(self._vectors[:count], list(range(count)))
+        self._hnsw = index
+        return index
+
+    def load(self, sources: List[Dict[str, Any]]) -> None:
+        """Index stored pipeline sources, oldest first, e.g. from ``PipelineStore.recent_sources``."""
+        for source in sources:
+            text = request_text(source["prompt"], source.get("clarification_answers"))
+            self.add(source.get("mode") or "quick", text, source["pipeline_id"])
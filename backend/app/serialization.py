@@ -0,0 +1,56 @@
+"""
+Fast JSON encoding for the hot response paths.
+
+Catalog components never change after startup, so each one is encoded to JSON bytes
+once when the catalog loads (``CatalogFragments``). ``/components`` then returns a
+single pre-encoded body and pipeline responses are assembled by concatenating the
+fragments of their components, instead of re-validating and re-encoding the same
+component dicts on every request. Encoding uses orjson when it is installed and falls
+back to the standard library otherwise.
+"""
+from typing import Any, Dict, List
+
+from starlette.responses import Response
+
+from .pipeline_generator import Component, PipelineResponse, component_to_dict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt but optional
+    orjson = None
+    import json
+
+def dumps(value: Any) -> bytes:
+    """Encode a JSON-compatible value to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class JSONBytesResponse(Response):
+    """Response whose body is already-encoded JSON; FastAPI returns it without re-validation."""
+    media_type = "application/json"
+
+class CatalogFragments:
+    """Pre-encoded JSON for every catalog component."""
+
+    def __init__(self, catalog: List[Component]):
+        # Shape used inside pipeline responses, and the dicts each fragment was encoded from
+        self.sources: Dict[str, Dict[str, Any]] = {c.id: component_to_dict(c) for c in catalog}
+        self.components: Dict[str, bytes] = {id: dumps(source) for id, source in self.sources.items()}
+        # Shape returned by /components (response_model=list[Component])
+        self.catalog: bytes = b"[" + b",".join(dumps(c.model_dump()) for c in catalog) + b"]"
+
+    def encode_pipeline(self, pipeline: PipelineResponse) -> bytes:
+        """
+        Encode a pipeline response, splicing in pre-encoded fragments for catalog components.
+
+        Components of generated pipelines are catalog entries, so they are looked up by id.
+        A fragment is only used when the component still equals the catalog entry it was
+        encoded from; edited components and anything not in the catalog are encoded normally.
+        """
+        components = b",".join(
+            self.components[c["id"]] if self.sources.get(c.get("id")) == c else dumps(c)
+            for c in pipeline.components
+        )
+        rest = dumps(pipeline.model_dump(exclude={"components"}))
+        return b'{"components":[' + components + b"]," + rest[1:]
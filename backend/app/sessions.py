@@ -0,0 +1,129 @@
+"""
+Resumable generation sessions.
+
+A client sends the same ``session_id`` to ``/generate-clarification`` and to every
+``/generate-pipeline`` call (including regenerations). Intermediate artifacts are
+checkpointed under that id in the shared cache, each with a fingerprint of the inputs
+it was computed from:
+
+- ``clarification``: the questions, valid for the same prompt and domain
+- ``search``: search queries and results, valid for the same prompt
+- ``selection``: the selected component ids, valid for the same prompt, answers and
+  search results
+
+Later calls resume from every checkpoint whose fingerprint still matches. So
+regenerating after changing one clarification answer skips query generation and web
+search, and only reruns component selection. Checkpoints live in the shared cache, so
+any worker can resume a session. A session expires after ``SESSION_IDLE_TTL`` seconds
+without use.
+"""
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import re
+import time
+
+from .cache import get_cache
+from .metrics import record_cache_lookup
+
+STAGES = ("clarification", "search", "selection")
+# Most recent pipeline ids kept per session
+MAX_SESSION_PIPELINES = 20
+
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{8,64}")
+
+def fingerprint(*inputs: Any) -> str:
+    """Stable hash of the inputs a checkpoint was computed from."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class Session:
+    """Checkpointed state of one session; changes are written through to the shared cache."""
+
+    def __init__(self, store: "SessionStore", session_id: str, state: Dict[str, Any]):
+        self.store = store
+        self.session_id = session_id
+        self.state = state
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """The checkpointed value of a stage, if it was computed from the same inputs."""
+        checkpoint = self.state["checkpoints"].get(stage)
+        valid = checkpoint is not None and checkpoint["key"] == key
+        record_cache_lookup(f"session_{stage}", valid)
+        return checkpoint["value"] if valid else None
+
+    async def put(self, stage: str, key: str, value: Any) -> None:
+        """Checkpoint a stage's result, replacing any earlier one."""
+        self.state["checkpoints"][stage] = {"key": key, "value": value, "created_at": time.time()}
+        await self.save()
+
+    async def discard(self, stage: str) -> None:
+        """Drop a stage's checkpoint so the next call recomputes it."""
+        if self.state["checkpoints"].pop(stage, None) is not None:
+            await self.save()
+
+    async def add_pipeline(self, pipeline_id: str) -> None:
+        """Record a pipeline generated in this session."""
+        pipelines = [p for p in self.state["pipeline_ids"] if p != pipeline_id] + [pipeline_id]
+        self.state["pipeline_ids"] = pipelines[-MAX_SESSION_PIPELINES:]
+        await self.save()
+
+    async def save(self) -> None:
+        self.state["updated_at"] = time.time()
+        await self.store.cache.set(self.session_id, self.state)
+
+    def summary(self) -> Dict[str, Any]:
+        """Session state without the bulky search results."""
+        checkpoints = self.state["checkpoints"]
+        search = checkpoints.get("search", {}).get("value")
+        selection = checkpoints.get("selection", {}).get("value")
+        clarification = checkpoints.get("clarification", {}).get("value")
+        return {
+            "session_id": self.session_id,
+            "created_at": self.state["created_at"],
+            "updated_at": self.state["updated_at"],
+            "checkpoints": {stage: checkpoints[stage]["created_at"] for stage in STAGES if stage in checkpoints},
+            "clarification_questions": clarification["questions"] if clarification else None,
+            "search_queries": search["queries"] if search else None,
+            "selected_components": selection,
+            "pipeline_ids": self.state["pipeline_ids"],
+        }
+
+class SessionStore:
+    """Sessions in the shared cache, expiring after ``idle_ttl`` seconds without use."""
+
+    def __init__(self, idle_ttl: float):
+        self.idle_ttl = idle_ttl
+
+    @property
+    def cache(self):
+        return get_cache("sessions", default_ttl=self.idle_ttl)
+
+    @staticmethod
+    def validate_id(session_id: str) -> None:
+        if not _SESSION_ID_RE.fullmatch(session_id):
+            raise ValueError("session_id must be 8-64 letters, digits, '-' or '_'")
+
+    async def load(self, session_id: str, create: bool = True) -> Optional[Session]:
+        """
+        Load a session, creating it if ``create`` is set and it doesn't exist.
+
+        Loading counts as use: the session's idle timeout starts over.
+        """
+        self.validate_id(session_id)
+        state = await self.cache.get(session_id)
+        if state is None:
+            if not create:
+                return None
+            now = time.time()
+            state = {"created_at": now, "updated_at": now, "checkpoints": {}, "pipeline_ids": []}
+        session = Session(self, session_id, state)
+        await session.save()
+        return session
+
+    async def delete(self, session_id: str) -> bool:
+        """Delete a session; False if it didn't exist."""
+        self.validate_id(session_id)
+        if await self.cache.get(session_id) is None:
+            return False
+        await self.cache.delete(session_id)
+        return True
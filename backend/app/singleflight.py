@@ -0,0 +1,43 @@
+"""Collapse concurrent identical upstream calls into one."""
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers with the same key
+    await the in-flight call instead of starting their own.
+
+    The shared call is shielded, so one caller being cancelled does not cancel the
+    work other callers are still waiting for. Once every caller has been cancelled
+    nobody will read the result, so the call itself is cancelled too.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Callers arriving from now on start a new call instead of joining this one
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
@@ -0,0 +1,269 @@
+"""
+Per-request tracing with span trees, Server-Timing headers and an opt-in sampling profiler.
+
+Each HTTP request gets a trace id and a root span. Code inside the request opens child
+spans with ``span()``; the current span is tracked in a context variable so spans
+opened inside tasks started by ``asyncio.gather`` are attached to the right parent.
+Finished traces are written as one JSON line each to a rotating local log.
+"""
+from typing import Dict, Any, List, Optional, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from collections import Counter as FrameCounter
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+
+from .core.config import get_settings
+
+TRACE_ID_HEADER = "x-trace-id"
+PROFILE_HEADER = "x-profile"
+
+_TRACE_ID_RE = re.compile(r"[0-9a-zA-Z-]{8,64}")
+_SERVER_TIMING_NAME_RE = re.compile(r"[^0-9a-zA-Z_.-]")
+
+@dataclass
+class Span:
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+@dataclass
+class Trace:
+    trace_id: str
+    start: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    _ids: Iterator[int] = field(default_factory=itertools.count)
+
+    def new_span(self, name: str, parent_id: Optional[int], attributes: Dict[str, Any]) -> Span:
+        span = Span(next(self._ids), parent_id, name, time.perf_counter(), attributes=attributes)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "spans": [
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "start_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": round(s.duration_ms, 3),
+                    "attributes": s.attributes,
+                }
+                for s in self.spans
+            ],
+        }
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_trace_id() -> Optional[str]:
+    """Return the trace id of the request being handled, if any."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open a child span of the current span. Does nothing outside a traced request."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = trace.new_span(name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+def server_timing_header(trace: Trace) -> str:
+    """Render finished spans as a Server-Timing header shown by browser devtools."""
+    entries = []
+    for s in trace.spans:
+        if s.end is None:
+            continue
+        name = _SERVER_TIMING_NAME_RE.sub("_", s.name)
+        entries.append(f"{name};dur={s.duration_ms:.1f}")
+    return ", ".join(entries)
+
+_trace_listener: Optional[QueueListener] = None
+
+@lru_cache()
+def get_trace_logger() -> logging.Logger:
+    """
+    Get the logger that writes finished traces to the rotating JSONL trace log.
+
+    Records go through a queue so file writes and rotation happen on a background
+    thread rather than on the event loop.
+    """
+    global _trace_listener
+    settings = get_settings()
+    os.makedirs(os.path.dirname(settings.TRACE_LOG_PATH) or ".", exist_ok=True)
+
+    handler = RotatingFileHandler(
+        settings.TRACE_LOG_PATH,
+        maxBytes=settings.TRACE_LOG_MAX_BYTES,
+        backupCount=settings.TRACE_LOG_BACKUP_COUNT
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    _trace_listener = QueueListener(log_queue, handler)
+    _trace_listener.start()
+
+    logger = logging.getLogger("app.traces")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(QueueHandler(log_queue))
+    return logger
+
+def shutdown_tracing() -> None:
+    """Flush pending trace records and stop the background writer."""
+    global _trace_listener
+    if _trace_listener is not None:
+        _trace_listener.stop()
+        _trace_listener = None
+        logger = get_trace_logger()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        get_trace_logger.cache_clear()
+
+class SamplingProfiler:
+    """
+    Sample the call stack of one thread at a fixed interval from a background thread.
+
+    Stacks are aggregated in the folded format understood by flamegraph.pl, speedscope
+    and similar tools. Since the event loop is shared, samples taken while a profiled
+    request is awaiting I/O can include frames from other concurrent requests.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: FrameCounter = FrameCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def profile_path(trace_id: str) -> str:
+    """Location of the folded-stack profile captured for a trace."""
+    if not _TRACE_ID_RE.fullmatch(trace_id):
+        raise ValueError(f"Invalid trace id: {trace_id}")
+    return os.path.join(get_settings().PROFILE_DIR, f"{trace_id}.folded")
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces each HTTP request.
+
+    Adds ``X-Trace-Id`` and ``Server-Timing`` response headers and logs the finished
+    span tree. When profiling is enabled in settings, sending ``X-Profile: 1`` samples
+    the request and stores a folded-stack profile at ``GET /debug/profiles/{trace_id}``.
+    Profiled requests always get a server-generated trace id, so clients can neither
+    overwrite nor guess each other's profiles; the client's id is kept in the trace log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        settings = get_settings()
+        profiler = None
+        if settings.PROFILING_ENABLED and headers.get(PROFILE_HEADER) == "1":
+            profiler = SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+
+        incoming_id = headers.get(TRACE_ID_HEADER, "")
+        client_id = incoming_id if _TRACE_ID_RE.fullmatch(incoming_id) else None
+        # The trace id names the profile file, so a profiled request never uses the client's
+        trace = Trace(trace_id=client_id if client_id and profiler is None else uuid.uuid4().hex)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                response_headers = list(message.get("headers", []))
+                response_headers.append((b"x-trace-id", trace.trace_id.encode("latin-1")))
+                timing = server_timing_header(trace)
+                if timing:
+                    response_headers.append((b"server-timing", timing.encode("latin-1")))
+                if profiler is not None:
+                    profile_url = f"/debug/profiles/{trace.trace_id}"
+                    response_headers.append((b"x-profile-url", profile_url.encode("latin-1")))
+                message = {**message, "headers": response_headers}
+            await send(message)
+
+        trace_token = _current_trace.set(trace)
+        if profiler is not None:
+            profiler.start()
+        try:
+            with span("request", method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(trace_token)
+            record = trace.to_dict()
+            record["status"] = status["code"]
+            if profiler is not None:
+                profiler.stop()
+                self._write_profile(trace.trace_id, profiler)
+                record["profiled"] = True
+                if client_id:
+                    record["client_trace_id"] = client_id
+            get_trace_logger().info(json.dumps(record, default=str))
+
+    def _write_profile(self, trace_id: str, profiler: SamplingProfiler) -> None:
+        path = profile_path(trace_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(profiler.folded())
@@ -0,0 +1,257 @@
+"""
+Edit-time guidance for building pipelines step by step, without an LLM round trip.
+
+``TransitionIndex`` answers two questions in constant time, independent of catalog and
+history size:
+
+- which components most likely come next after the current pipeline prefix: counts of
+  what followed the last one or two components in stored pipelines (backing off to
+  shorter contexts and finally to the catalog's stage order), kept as a pre-ranked
+  top-k list per context
+- which components can replace a selected node: a pre-ranked list per component built
+  from catalog ``suggested_alternatives``, swaps users made when editing stored
+  pipelines, and the same-type components with the most similar dependencies
+
+Both are updated incrementally: only the contexts and components touched by a newly
+stored pipeline or edit are re-ranked.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+from collections import Counter
+import math
+
+if TYPE_CHECKING:
+    from .pipeline_generator import Component
+
+START = "^"
+# Typical position of each component type in a pipeline
+STAGE_ORDER = {
+    "preprocessing": 0,
+    "transformation": 1,
+    "feature": 1,
+    "model": 2,
+    "postprocessing": 3,
+    "monitoring": 3,
+    "explainability": 3,
+}
+# Weight of a suggestion from each shorter context relative to the one above it
+BACKOFF = 0.4
+# Observations a context needs before its statistics are trusted on their own
+MIN_SUPPORT = 3
+
+def _stage(component: "Component") -> int:
+    return STAGE_ORDER.get(component.type, 1)
+
+class TransitionIndex:
+    """Pre-ranked next-component and alternative-swap lists."""
+
+    def __init__(self, catalog: List["Component"], max_order: int = 2, top_k: int = 10):
+        self.catalog = {c.id: c for c in catalog}
+        self.max_order = max_order
+        # Ranked lists are kept longer than top_k so filtering out components already
+        # in the pipeline still leaves enough suggestions
+        self.list_size = top_k * 2
+
+        self._transitions: Dict[Tuple[str, ...], Counter] = {}
+        self._next: Dict[Tuple[str, ...], List[Tuple[str, float]]] = {}
+        self._swaps: Dict[str, Counter] = {}
+        self._alternatives: Dict[str, List[Tuple[str, float, str]]] = {}
+
+        # Cold-start ranking from stage order: next stage first, then later stages, then the same stage
+        self._stage_prior: Dict[Optional[int], List[Tuple[str, float]]] = {}
+        for stage in [None, *sorted(set(STAGE_ORDER.values()))]:
+            scored = []
+            for c in catalog:
+                gap = _stage(c) - (-1 if stage is None else stage)
+                if gap > 0:
+                    scored.append((c.id, 1.0 / gap))
+                elif gap == 0:
+                    scored.append((c.id, 0.1))
+            scored.sort(key=lambda item: -item[1])
+            total = sum(score for _, score in scored) or 1.0
+            self._stage_prior[stage] = [(cid, score / total) for cid, score in scored[:self.list_size]]
+
+        # Catalog metadata is symmetric: if A suggests B, B can be swapped for A too
+        self._suggested: Dict[str, Set[str]] = {c.id: set() for c in catalog}
+        for c in catalog:
+            for alternative in c.suggested_alternatives or []:
+                if alternative in self.catalog and alternative != c.id:
+                    self._suggested[c.id].add(alternative)
+                    self._suggested[alternative].add(c.id)
+        self._dependencies = {c.id: set(c.requirements.dependencies) for c in catalog}
+        self._similar = self._similar_by_type(catalog)
+        for cid in self.catalog:
+            self._rank_alternatives(cid)
+
+    # Next components
+
+    def _contexts(self, sequence: Sequence[str], position: int) -> Iterable[Tuple[str, ...]]:
+        """Contexts of every order (longest first) preceding ``position``."""
+        padded = [START] * self.max_order + list(sequence[:position])
+        for order in range(self.max_order, 0, -1):
+            yield tuple(padded[len(padded) - order:])
+
+    def observe(self, component_ids: Sequence[str]) -> None:
+        """Add the transitions of a stored pipeline."""
+        sequence = [c for c in component_ids if c in self.catalog]
+        touched = set()
+        for position, component_id in enumerate(sequence):
+            for context in self._contexts(sequence, position):
+                self._transitions.setdefault(context, Counter())[component_id] += 1
+                touched.add(context)
+        for context in touched:
+            counts = self._transitions[context]
+            total = sum(counts.values())
+            self._next[context] = [(cid, n / total) for cid, n in counts.most_common(self.list_size)]
+
+    def next_components(self, component_ids: Sequence[str], limit: int = 5) -> List[Dict[str, Any]]:
+        """Most likely next components after a pipeline prefix, excluding ones already in it."""
+        present = set(component_ids)
+        sequence = [c for c in component_ids if c in self.catalog]
+        scores: Dict[str, float] = {}
+        reasons: Dict[str, str] = {}
+        weight = 1.0
+        for context in self._contexts(sequence, len(sequence)):
+            ranked = self._next.get(context)
+            if ranked:
+                support = sum(self._transitions[context].values())
+                for cid, p in ranked:
+                    if cid not in present and cid not in scores:
+                        scores[cid] = weight * p
+                        reasons[cid] = self._transition_reason(context, cid, support)
+                if support >= MIN_SUPPORT and len(scores) >= limit:
+                    break
+            weight *= BACKOFF
+        if len(scores) < limit:
+            last_stage = _stage(self.catalog[sequence[-1]]) if sequence else None
+            for cid, p in self._stage_prior[last_stage]:
+                if cid not in present and cid not in scores:
+                    scores[cid] = weight * p
+                    reasons[cid] = "Typical next step for this stage of the pipeline"
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [self._suggestion(cid, score, reasons[cid]) for cid, score in ranked]
+
+    def _transition_reason(self, context: Tuple[str, ...], cid: str, support: int) -> str:
+        count = self._transitions[context][cid]
+        previous = [self.catalog[c].name for c in context if c != START]
+        if not previous:
+            return f"Starts {count} of {support} stored pipelines"
+        return f"Follows {' → '.join(previous)} in {count} of {support} stored pipelines"
+
+    # Alternatives
+
+    def observe_edit(self, before: Sequence[str], after: Sequence[str]) -> None:
+        """Record a swap if an edit replaced exactly one component with another in place."""
+        if len(before) != len(after):
+            return
+        changed = [(b, a) for b, a in zip(before, after) if b != a]
+        if len(changed) != 1:
+            return
+        old, new = changed[0]
+        if old not in self.catalog or new not in self.catalog:
+            return
+        self._swaps.setdefault(old, Counter())[new] += 1
+        self._swaps.setdefault(new, Counter())[old] += 1
+        self._rank_alternatives(old)
+        self._rank_alternatives(new)
+
+    def _similar_by_type(self, catalog: List["Component"]) -> Dict[str, List[str]]:
+        """
+        Same-type components with the most similar dependencies (Jaccard), per component.
+
+        Computed with blocked matrix products over a component x dependency incidence
+        matrix, so a large catalog costs one pass per type instead of a Python loop over
+        every pair.
+        """
+        import numpy as np
+
+        by_type: Dict[str, List[str]] = {}
+        for c in catalog:
+            by_type.setdefault(c.type, []).append(c.id)
+        similar: Dict[str, List[str]] = {}
+        for ids in by_type.values():
+            vocabulary = {d: i for i, d in enumerate(sorted(set().union(*(self._dependencies[c] for c in ids))))}
+            incidence = np.zeros((len(ids), max(1, len(vocabulary))), dtype=np.float32)
+            for row, cid in enumerate(ids):
+                for dependency in self._dependencies[cid]:
+                    incidence[row, vocabulary[dependency]] = 1.0
+            sizes = incidence.sum(axis=1)
+            k = min(self.list_size, len(ids) - 1)
+            for start in range(0, len(ids), 512):
+                block = incidence[start:start + 512]
+                intersection = block @ incidence.T
+                union = sizes[start:start + 512, None] + sizes[None, :] - intersection
+                jaccard = intersection / np.maximum(union, 1.0)
+                for offset in range(len(block)):
+                    jaccard[offset, start + offset] = -1.0  # never its own alternative
+                if k <= 0:
+                    top = np.zeros((len(block), 0), dtype=int)
+                else:
+                    top = np.argpartition(-jaccard, k - 1, axis=1)[:, :k]
+                for offset, row in enumerate(top):
+                    similar[ids[start + offset]] = [ids[j] for j in row]
+        return similar
+
+    def _rank_alternatives(self, cid: str) -> None:
+        component = self.catalog[cid]
+        dependencies = self._dependencies[cid]
+        swaps = self._swaps.get(cid, Counter())
+        candidates = self._suggested[cid] | set(self._similar[cid]) | set(swaps)
+        ranked = []
+        for other_id in candidates - {cid}:
+            other = self.catalog[other_id]
+            other_dependencies = self._dependencies[other_id]
+            overlap = len(dependencies & other_dependencies) / max(1, len(dependencies | other_dependencies))
+            score = (
+                3.0 * (other_id in self._suggested[cid])
+                + 2.0 * math.log1p(swaps[other_id])
+                + 1.0 * (other.type == component.type)
+                + 0.5 * overlap
+            )
+            if other_id in self._suggested[cid]:
+                reason = "Suggested alternative in the catalog"
+            elif swaps[other_id]:
+                reason = f"Swapped in for {component.name} in {swaps[other_id]} stored edits"
+            else:
+                reason = f"Another {component.type} component"
+            ranked.append((other_id, score, reason))
+        ranked.sort(key=lambda item: -item[1])
+        self._alternatives[cid] = ranked[:self.list_size]
+
+    def alternatives(self, component_id: str, component_ids: Sequence[str] = (), limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Ranked swaps for a node, skipping components already in the pipeline and ones with
+        no environment in common with the rest of it. None if the component is unknown.
+        """
+        ranked = self._alternatives.get(component_id)
+        if ranked is None:
+            return None
+        present = set(component_ids)
+        others = [self.catalog[c] for c in component_ids if c in self.catalog and c != component_id]
+        environments = set.intersection(*(set(c.requirements.environments) for c in others)) if others else None
+        results = []
+        for cid, score, reason in ranked:
+            if cid in present:
+                continue
+            if environments is not None and not environments & set(self.catalog[cid].requirements.environments):
+                continue
+            results.append(self._suggestion(cid, score, reason))
+            if len(results) == limit:
+                break
+        return results
+
+    def _suggestion(self, cid: str, score: float, reason: str) -> Dict[str, Any]:
+        component = self.catalog[cid]
+        return {
+            "id": cid,
+            "name": component.name,
+            "type": component.type,
+            "score": round(score, 4),
+            "reason": reason,
+        }
+
+    def load(self, pipelines: Iterable[Sequence[str]], edits: Iterable[Tuple[Sequence[str], Sequence[str]]]) -> None:
+        """Build from stored pipelines and edits, e.g. from ``PipelineStore.component_history`` and ``edits``."""
+        for component_ids in pipelines:
+            self.observe(component_ids)
+        for before, after in edits:
+            self.observe_edit(before, after)
@@ -0,0 +1,65 @@
+"""Deterministic synthetic inputs for the benchmark suite."""
+from typing import Any, Dict, List
+import base64
+import json
+import random
+
+COMPONENT_TYPES = ["preprocessing", "feature", "transformation", "model", "postprocessing", "monitoring", "explainability"]
+
+# Sizes used for catalogs and pipelines
+SIZES = [10, 1_000, 10_000]
+
+# Row counts for generated CSV files
+CSV_ROWS = [1_000, 10_000, 100_000]
+
+def make_catalog(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build a catalog of ``size`` raw component entries shaped like component_catalog.json."""
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(size):
+        component_type = COMPONENT_TYPES[i % len(COMPONENT_TYPES)]
+        catalog.append({
+            "id": f"component_{i}",
+            "name": f"Component {i}",
+            "type": component_type,
+            "description": f"Synthetic {component_type} component number {i} for benchmarking.",
+            "code_snippet": f"from synthetic import Component{i}",
+            "model_asset": f"/models/component_{i}.glb",
+            "icon": "🧪",
+            "suggested_alternatives": [f"component_{rng.randrange(size)}" for _ in range(2)],
+            "requirements": {
+                "dependencies": [f"package-{rng.randrange(50)}>=1.0.0"],
+                "environments": ["Python 3.7+"]
+            },
+            "agent": {
+                "name": f"Agent{i}GPT",
+                "role": f"{component_type.title()} Expert",
+                "quote": "Synthetic components are my specialty!",
+                "why_chosen": "Chosen by the benchmark fixture generator."
+            }
+        })
+    return catalog
+
+def make_selection_response(catalog: List[Dict[str, Any]]) -> str:
+    """Build a GPT-style component selection response selecting every catalog entry."""
+    return json.dumps([{"id": c["id"], "reason": f"Needed for step {c['id']}"} for c in catalog], indent=2)
+
+def make_fenced_code(lines: int) -> str:
+    """Build a code-generation response wrapped in a markdown fence."""
+    body = "\n".join(f"step_{i} = transform(step_{i - 1})" for i in range(1, lines + 1))
+    return f"```python\n{body}\n```"
+
+def make_csv_file(rows: int, columns: int = 8, seed: int = 0) -> Dict[str, Any]:
+    """Build an uploaded-file dict (base64 content) holding a numeric CSV."""
+    rng = random.Random(seed)
+    header = ",".join(f"col_{c}" for c in range(columns))
+    body = "\n".join(
+        ",".join(f"{rng.random():.6f}" for _ in range(columns))
+        for _ in range(rows)
+    )
+    content = f"{header}\n{body}\n".encode("utf-8")
+    return {
+        "name": f"synthetic_{rows}.csv",
+        "type": "text/csv",
+        "content": base64.b64encode(content).decode("ascii"),
+    }
@@ -0,0 +1,303 @@
+"""
+Microbenchmarks for the non-LLM hot paths of the backend.
+
+Run from the backend directory; no API keys or network access are needed:
+
+    python -m benchmarks.run                      # run everything
+    python -m benchmarks.run -k validate          # only benchmarks whose name contains "validate"
+    python -m benchmarks.run --save main          # store results as baselines/main.json
+    python -m benchmarks.run --compare main       # compare against a stored baseline
+
+Each benchmark is a setup function that builds its inputs once and returns the
+callable to time, so fixture generation is never part of the measurement. Setups that
+create files or event loops yield the callable instead, and clean up once it has been
+timed.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from . import fixtures
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Cold `import app.main` must stay under this many seconds; heavy libraries load lazily
+IMPORT_TIME_BUDGET = 1.5
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+def benchmark(name: str, params: Optional[List[Any]] = None):
+    """Register a setup function, once per parameter value if ``params`` is given."""
+    def decorator(setup):
+        for param in params or [None]:
+            if param is None:
+                BENCHMARKS[name] = setup
+            else:
+                BENCHMARKS[f"{name}[{param}]"] = functools.partial(setup, param)
+        return setup
+    return decorator
+
+def _components(size: int):
+    from app.pipeline_generator import Component
+    return [Component(**c) for c in fixtures.make_catalog(size)]
+
+@benchmark("catalog_load", fixtures.SIZES)
+def bench_catalog_load(size: int):
+    from app.main import load_component_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "component_catalog.json")
+        with open(path, "w") as f:
+            json.dump(fixtures.make_catalog(size), f)
+        yield functools.partial(load_component_catalog, path)
+
+@benchmark("component_validation", fixtures.SIZES)
+def bench_component_validation(size: int):
+    from app.pipeline_generator import Component
+    raw = fixtures.make_catalog(size)
+    return lambda: [Component(**c) for c in raw]
+
+@benchmark("validate_pipeline", fixtures.SIZES)
+def bench_validate_pipeline(size: int):
+    from app.pipeline_generator import validate_pipeline
+    components = _components(size)
+    return lambda: validate_pipeline(components)
+
+@benchmark("validate_pipeline_endpoint", fixtures.SIZES)
+def bench_validate_pipeline_endpoint(size: int):
+    from app.main import ValidatePipelineRequest, validate_pipeline_endpoint
+    raw = fixtures.make_catalog(size)
+    half = size // 2
+    request = ValidatePipelineRequest(current_components=raw[:half], new_components=raw[half:])
+    # One loop for every timed call, closed once the benchmark is done
+    loop = asyncio.new_event_loop()
+    try:
+        yield lambda: loop.run_until_complete(validate_pipeline_endpoint(request))
+    finally:
+        loop.close()
+
+@benchmark("generate_pipeline_explanation", fixtures.SIZES)
+def bench_generate_pipeline_explanation(size: int):
+    from app.pipeline_generator import generate_pipeline_explanation
+    components = _components(size)
+    return lambda: generate_pipeline_explanation(components)
+
+@benchmark("response_serialization", fixtures.SIZES)
+def bench_response_serialization(size: int):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.pipeline_generator import PipelineResponse
+
+    component_dicts = [
+        {
+            "id": c.id,
+            "name": c.name,
+            "type": c.type,
+            "description": c.description,
+            "requirements": c.requirements.model_dump(),
+            "agent": c.agent,
+            "code_snippet": c.code_snippet
+        }
+        for c in _components(size)
+    ]
+
+    def run():
+        # Mirrors what FastAPI does with response_model=PipelineResponse
+        response = PipelineResponse(
+            components=component_dicts,
+            connections=[],
+            name="Benchmark pipeline",
+            description="Synthetic pipeline"
+        )
+        validated = PipelineResponse.model_validate(response.model_dump())
+        return JSONResponse(jsonable_encoder(validated)).body
+    return run
+
+@benchmark("fragment_serialization", fixtures.SIZES)
+def bench_fragment_serialization(size: int):
+    from app.pipeline_generator import PipelineResponse, component_to_dict
+    from app.serialization import CatalogFragments
+
+    components = _components(size)
+    fragments = CatalogFragments(components)
+    component_dicts = [component_to_dict(c) for c in components]
+
+    def run():
+        # What /generate-pipeline does now: no re-validation, fragments spliced by id
+        response = PipelineResponse.model_construct(
+            components=component_dicts,
+            connections=[],
+            name="Benchmark pipeline",
+            description="Synthetic pipeline"
+        )
+        return fragments.encode_pipeline(response)
+    return run
+
+@benchmark("recommend", fixtures.SIZES)
+def bench_recommend(size: int):
+    import random
+    from app.recommender import ComponentRecommender
+
+    components = _components(size)
+    rng = random.Random(0)
+    recommender = ComponentRecommender(components)
+    recommender.load([
+        ([c.id for c in rng.sample(components, min(5, size))], [f"synthetic prompt {rng.randrange(100)}"])
+        for _ in range(500)
+    ])
+    current = [components[0].id]
+    return lambda: recommender.recommend("synthetic preprocessing comp", current)
+
+@benchmark("pipeline_layout", [10, 50, 200])
+def bench_pipeline_layout(size: int):
+    from app import pipeline_graph
+    from app.pipeline_generator import component_to_dict
+
+    components = [component_to_dict(c) for c in _components(size)]
+    def run():
+        # Measure connection inference and layout, not the per-hash cache
+        pipeline_graph._cache._entries.clear()
+        return pipeline_graph.pipeline_graph(components)
+    return run
+
+@benchmark("selection_json_parsing", fixtures.SIZES)
+def bench_selection_json_parsing(size: int):
+    content = fixtures.make_selection_response(fixtures.make_catalog(size))
+    return lambda: [s["id"] for s in json.loads(content)]
+
+@benchmark("code_fence_stripping", fixtures.SIZES)
+def bench_code_fence_stripping(size: int):
+    from app.openai_utils import strip_code_fences
+    code = fixtures.make_fenced_code(size)
+    return lambda: strip_code_fences(code.strip())
+
+@benchmark("analyze_file_content", fixtures.CSV_ROWS)
+def bench_analyze_file_content(rows: int):
+    from app.file_analyzer import analyze_file_content
+    file = fixtures.make_csv_file(rows)
+    return lambda: analyze_file_content(file)
+
+def measure_import_time() -> float:
+    """Time a cold ``import app.main`` in a fresh interpreter."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import time; s = time.perf_counter(); import app.main; print(time.perf_counter() - s)"
+    timings = []
+    for _ in range(3):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True, check=True
+        )
+        timings.append(float(out.stdout.strip()))
+    return min(timings)
+
+@contextmanager
+def prepared(setup: Callable[[], Any]) -> Iterator[Callable[[], Any]]:
+    """The callable a setup returns or yields; a yielding setup is closed afterwards."""
+    fn = setup()
+    if not inspect.isgenerator(fn):
+        yield fn
+        return
+    try:
+        yield next(fn)
+    finally:
+        fn.close()
+
+def time_benchmark(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Time ``fn``, calibrating the loop count so each run lasts at least ~0.2s."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "number": number,
+        "repeat": repeat,
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filter", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (default: 5)")
+    parser.add_argument("--save", metavar="NAME", help="save results to baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare results with baselines/NAME.json")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit non-zero if any benchmark regressed or the import budget is exceeded")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)["results"]
+
+    results: Dict[str, Dict[str, float]] = {}
+    failed = False
+
+    if not args.filter or args.filter in "import_app_main":
+        import_time = measure_import_time()
+        results["import_app_main"] = {"median": import_time, "min": import_time, "number": 1, "repeat": 3}
+        if import_time > IMPORT_TIME_BUDGET:
+            print(f"import app.main took {import_time:.2f}s, over the {IMPORT_TIME_BUDGET:.2f}s budget")
+            failed = True
+
+    for name, setup in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        with prepared(setup) as fn:
+            results[name] = time_benchmark(fn, args.repeat)
+
+    for name, result in results.items():
+        line = f"{name:45s} {_format_seconds(result['median'])}"
+        if baseline and name in baseline:
+            ratio = result["median"] / baseline[name]["median"]
+            line += f"   x{ratio:5.2f} vs {args.compare}"
+            if ratio > 1 + args.threshold:
+                line += "  REGRESSION"
+                failed = True
+        print(line)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump({
+                "meta": {
+                    "commit": _git_commit(),
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved results to {path}")
+
+    return 1 if failed and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Replay realistic user sessions against the backend at a target concurrency.
+
+Each session mirrors the frontend flow: ``/generate-clarification``, then
+``/generate-pipeline`` with answers to the returned questions, then ``/generate-code``
+for the resulting pipeline. Run it against a backend wired to the stub server:
+
+    python -m loadtest.loadgen --target http://127.0.0.1:8000 --concurrency 50 --duration 60
+
+and it reports throughput, p50/p95/p99 latency per endpoint and an error breakdown.
+
+By default every session uses a unique prompt and sends ``"use_cache": false``, so
+requests miss the semantic, completion and search caches and exercise the stubbed
+LLM and search path; that is what capacity runs should measure. ``--use-cache``
+replays the handful of prompts below with caching on, to measure a warm cache
+instead. Either way the report includes each cache's hit ratio during the run, read
+from the backend's ``/metrics``. With several workers that is the ratio of the worker
+that answered the scrape.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter, defaultdict
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import httpx
+
+PROMPTS = [
+    ("Predict customer churn from a CSV of subscription data", "business"),
+    ("Detect anomalies in multi-sensor IoT time series", "iot"),
+    ("Forecast hourly energy demand for a building", "energy"),
+    ("Classify support tickets by urgency", "nlp"),
+    ("Score loan applications for default risk", "finance"),
+    ("Recommend products from clickstream data", "retail"),
+    ("Predict equipment failure from vibration sensors", "manufacturing"),
+    ("Analyze financial documents and extract key risk factors", "finance"),
+]
+
+_CACHE_METRIC_RE = re.compile(r'^cache_requests_total\{cache="([^"]*)",result="(hit|miss)"\} (\S+)$', re.MULTILINE)
+
+async def cache_lookups(client: httpx.AsyncClient) -> Dict[Tuple[str, str], float]:
+    """Cache lookups so far by (cache, result), from the backend's /metrics; empty if unavailable."""
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return {}
+    return {(cache, result): float(value) for cache, result, value in _CACHE_METRIC_RE.findall(response.text)}
+
+def cache_hit_ratios(
+    before: Dict[Tuple[str, str], float],
+    after: Dict[Tuple[str, str], float]
+) -> Dict[str, Dict[str, Any]]:
+    """Hits, lookups and hit ratio per cache between two /metrics scrapes."""
+    ratios = {}
+    for cache in sorted({cache for cache, _ in after}):
+        hits = after.get((cache, "hit"), 0.0) - before.get((cache, "hit"), 0.0)
+        misses = after.get((cache, "miss"), 0.0) - before.get((cache, "miss"), 0.0)
+        if hits + misses > 0:
+            ratios[cache] = {"hits": int(hits), "lookups": int(hits + misses), "hit_ratio": hits / (hits + misses)}
+    return ratios
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+class Recorder:
+    """Collects per-endpoint latencies and error outcomes."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.sessions_completed = 0
+        self.sessions_failed = 0
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None) -> None:
+        if error is None:
+            self.latencies[endpoint].append(seconds)
+        else:
+            self.errors[endpoint][error] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            latencies = self.latencies[endpoint]
+            errors = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {
+                "requests": len(latencies) + errors,
+                "throughput_rps": (len(latencies) + errors) / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "errors": dict(self.errors[endpoint]),
+            }
+        return {
+            "elapsed_s": elapsed,
+            "sessions_completed": self.sessions_completed,
+            "sessions_failed": self.sessions_failed,
+            "sessions_per_s": self.sessions_completed / elapsed,
+            "endpoints": endpoints,
+        }
+
+async def timed_post(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    endpoint: str,
+    payload: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None
+) -> Any:
+    """POST a JSON payload, recording its latency or the kind of failure."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload, headers=headers)
+    except httpx.HTTPError as e:
+        recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+        raise
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        recorder.record(endpoint, elapsed, f"HTTP {response.status_code}")
+        response.raise_for_status()
+    recorder.record(endpoint, elapsed)
+    return response.json()
+
+def answer_questions(questions: List[Dict[str, Any]], rng: random.Random) -> Dict[str, str]:
+    answers = {}
+    for question in questions:
+        if question.get("options"):
+            answers[question["id"]] = rng.choice(question["options"])
+        else:
+            answers[question["id"]] = question.get("placeholder") or "No preference"
+    return answers
+
+async def run_session(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    rng: random.Random,
+    agentic_ratio: float,
+    client_id: str,
+    use_cache: bool = False
+) -> None:
+    prompt, domain = rng.choice(PROMPTS)
+    if not use_cache:
+        # A prompt no earlier session used misses every prompt-keyed cache
+        prompt = f"{prompt} (session {uuid.uuid4().hex[:12]})"
+    # Each virtual user is a separate client for the backend's per-client quotas; the
+    # backend only honours this from TRUSTED_PROXIES, so trust the load generator's address
+    headers = {"X-Client-Id": client_id}
+    try:
+        clarification = await timed_post(client, recorder, "/generate-clarification", {
+            "prompt": prompt,
+            "domain": domain,
+        }, headers)
+        pipeline = await timed_post(client, recorder, "/generate-pipeline", {
+            "prompt": prompt,
+            "mode": "agentic" if rng.random() < agentic_ratio else "quick",
+            "clarification_answers": answer_questions(clarification.get("questions", []), rng),
+            "use_cache": use_cache,
+        }, headers)
+        await timed_post(client, recorder, "/generate-code", {
+            "pipeline": pipeline,
+            "language": "python",
+            "framework": rng.choice(["sklearn", "pytorch", "tensorflow"]),
+        }, headers)
+        recorder.sessions_completed += 1
+    except (httpx.HTTPError, ValueError):
+        recorder.sessions_failed += 1
+
+async def run_load(
+    target: str,
+    concurrency: int,
+    duration: Optional[float],
+    sessions: Optional[int],
+    agentic_ratio: float,
+    timeout: float,
+    seed: Optional[int],
+    use_cache: bool = False
+) -> Dict[str, Any]:
+    """Run sessions from ``concurrency`` virtual users until the duration or session count is reached."""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    remaining = [sessions] if sessions is not None else None
+
+    def should_continue() -> bool:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+        return time.perf_counter() - started < duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+        async def virtual_user(user: int):
+            while should_continue():
+                await run_session(client, recorder, rng, agentic_ratio, f"loadgen-{user}", use_cache)
+
+        lookups_before = await cache_lookups(client)
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        lookups_after = await cache_lookups(client)
+
+    report = recorder.report(elapsed)
+    report["use_cache"] = use_cache
+    report["caches"] = cache_hit_ratios(lookups_before, lookups_after)
+    return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Elapsed: {report['elapsed_s']:.1f}s  "
+          f"sessions: {report['sessions_completed']} ok / {report['sessions_failed']} failed  "
+          f"({report['sessions_per_s']:.2f} sessions/s)")
+    print(f"{'endpoint':26s} {'reqs':>6s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}  errors")
+    for endpoint, stats in report["endpoints"].items():
+        errors = ", ".join(f"{kind}: {count}" for kind, count in stats["errors"].items()) or "-"
+        print(f"{endpoint:26s} {stats['requests']:6d} {stats['throughput_rps']:8.2f} "
+              f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f}  {errors}")
+    print(f"Cache hit ratios ({'caching on' if report['use_cache'] else 'unique prompts, use_cache off'}):")
+    for cache, stats in report["caches"].items():
+        print(f"  {cache:24s} {stats['hit_ratio']:6.1%}  ({stats['hits']} of {stats['lookups']} lookups)")
+    if not report["caches"]:
+        print("  no cache lookups recorded (is /metrics reachable?)")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="backend base URL")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent virtual users")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--duration", type=float, default=None, help="run for this many seconds (default: 30)")
+    group.add_argument("--sessions", type=int, default=None, help="run exactly this many sessions")
+    parser.add_argument("--agentic-ratio", type=float, default=0.3, help="fraction of sessions using agentic mode")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--use-cache", action="store_true",
+                        help="replay a few fixed prompts with caching on, instead of unique uncached prompts")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    duration = args.duration if args.duration is not None or args.sessions is not None else 30.0
+    report = asyncio.run(run_load(
+        args.target, args.concurrency, duration, args.sessions, args.agentic_ratio, args.timeout, args.seed,
+        args.use_cache
+    ))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
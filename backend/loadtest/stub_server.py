@@ -0,0 +1,238 @@
+"""
+Local stand-in for the OpenAI chat completions and Tavily search APIs.
+
+Lets the backend be load tested without spending real API money. Latency, error
+rates and canned outputs are configurable per upstream:
+
+    python -m loadtest.stub_server --port 9000 --openai-median-ms 800 --openai-p99-ms 4000 \\
+        --openai-error-rate 0.02 --tavily-median-ms 600
+
+Then point the backend at it:
+
+    OPENAI_API_KEY=stub TAVILY_API_KEY=stub \\
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 TAVILY_SEARCH_URL=http://127.0.0.1:9000/search \\
+    TRUSTED_PROXIES='["127.0.0.1"]' WEB_CONCURRENCY=4 uvicorn app.main:app
+
+Canned outputs are chosen by looking for a marker in the system prompt; pass
+``--responses responses.json`` with a ``{"marker": "content"}`` object to override them.
+"""
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "data", "component_catalog.json")
+
+@dataclass
+class UpstreamProfile:
+    """Latency and failure behaviour of one stubbed upstream."""
+    median_ms: float = 500.0
+    p99_ms: float = 2000.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Delay between streamed chunks for streaming chat completions
+    chunk_interval_ms: float = 20.0
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Draw a latency in seconds from a log-normal fitted to the median and p99."""
+        if self.p99_ms <= self.median_ms:
+            return self.median_ms / 1000
+        mu = math.log(self.median_ms)
+        # 2.326 is the z-score of the 99th percentile
+        sigma = (math.log(self.p99_ms) - mu) / 2.326
+        return rng.lognormvariate(mu, sigma) / 1000
+
+@dataclass
+class StubConfig:
+    openai: UpstreamProfile = field(default_factory=UpstreamProfile)
+    tavily: UpstreamProfile = field(default_factory=lambda: UpstreamProfile(median_ms=400.0, p99_ms=1500.0))
+    responses: Dict[str, str] = field(default_factory=dict)
+    catalog_path: str = DEFAULT_CATALOG_PATH
+    seed: Optional[int] = None
+
+def default_responses(catalog_path: str, rng: random.Random) -> Dict[str, Any]:
+    """Canned outputs keyed by a marker found in the system prompt of each backend call."""
+    with open(catalog_path) as f:
+        catalog_ids = [c["id"] for c in json.load(f)]
+
+    def selection() -> str:
+        # Pick a plausible preprocessing -> model -> postprocessing pipeline
+        ids = [i for i in catalog_ids if "scaler" in i][:1] + [i for i in catalog_ids if "model" in i][:1]
+        ids += rng.sample(catalog_ids, k=min(2, len(catalog_ids)))
+        return json.dumps([{"id": i, "reason": "Selected by the stub server"} for i in dict.fromkeys(ids)])
+
+    return {
+        # A fresh token per call, so the backend's search cache only hits when its
+        # completion cache returned these same queries
+        "search queries": lambda: json.dumps([
+            f"{query} {uuid.uuid4().hex[:8]}" for query in (
+                "overview of machine learning approaches",
+                "state of the art techniques 2024",
+                "implementation best practices"
+            )
+        ]),
+        "clarification questions": lambda: json.dumps({
+            "questions": [
+                {"id": "data_size", "question": "How much data do you have?", "type": "select",
+                 "options": ["< 10k rows", "10k - 1M rows", "> 1M rows"]},
+                {"id": "latency", "question": "What prediction latency do you need?", "type": "text",
+                 "placeholder": "e.g. under 100ms"}
+            ],
+            "context": "These answers help size the pipeline."
+        }),
+        "pipeline architect": selection,
+        "refactoring": lambda: "def pipeline(df):\n    return df.dropna()\n",
+        "ML engineer": lambda: "```python\nfrom sklearn.pipeline import Pipeline\n\npipeline = Pipeline([])\n```",
+    }
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Upstream API stub")
+    rng = random.Random(config.seed)
+    responses = default_responses(config.catalog_path, rng)
+    responses.update({marker: (lambda content=content: content) for marker, content in config.responses.items()})
+    stats = {"chat_completions": 0, "searches": 0, "errors": 0}
+
+    def pick_content(messages: List[Dict[str, Any]]) -> str:
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        for marker, make in responses.items():
+            if marker in system:
+                return make()
+        return "OK"
+
+    def error_response(profile: UpstreamProfile) -> JSONResponse:
+        stats["errors"] += 1
+        return JSONResponse(
+            status_code=profile.error_status,
+            content={"error": {"message": "Injected failure from stub server", "type": "stub_error"}}
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["chat_completions"] += 1
+        await asyncio.sleep(config.openai.sample_latency(rng))
+        if rng.random() < config.openai.error_rate:
+            return error_response(config.openai)
+
+        content = pick_content(body.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        completion_tokens = max(1, len(content) // 4)
+
+        if body.get("stream"):
+            async def stream():
+                # Roughly one chunk per "token" of four characters
+                for i in range(0, len(content), 4):
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": content[i:i + 4]}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(config.openai.chunk_interval_ms / 1000)
+                final = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        stats["searches"] += 1
+        await asyncio.sleep(config.tavily.sample_latency(rng))
+        if rng.random() < config.tavily.error_rate:
+            return error_response(config.tavily)
+
+        query = body.get("query", "")
+        return {
+            "query": query,
+            "response_time": 0.0,
+            "results": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "url": f"https://example.com/{i + 1}",
+                    "content": f"Stub search result {i + 1} about {query}.",
+                    "snippet": f"Stub search result {i + 1} about {query}.",
+                    "score": round(1 - i * 0.1, 2)
+                }
+                for i in range(body.get("max_results", 5))
+            ]
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def _profile_args(parser: argparse.ArgumentParser, name: str, defaults: UpstreamProfile) -> None:
+    parser.add_argument(f"--{name}-median-ms", type=float, default=defaults.median_ms)
+    parser.add_argument(f"--{name}-p99-ms", type=float, default=defaults.p99_ms)
+    parser.add_argument(f"--{name}-error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument(f"--{name}-error-status", type=int, default=defaults.error_status)
+
+def _profile_from_args(args: argparse.Namespace, name: str) -> UpstreamProfile:
+    return UpstreamProfile(
+        median_ms=getattr(args, f"{name}_median_ms"),
+        p99_ms=getattr(args, f"{name}_p99_ms"),
+        error_rate=getattr(args, f"{name}_error_rate"),
+        error_status=getattr(args, f"{name}_error_status"),
+    )
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--seed", type=int, default=None, help="seed latency and error sampling")
+    parser.add_argument("--responses", help="JSON file mapping system-prompt markers to canned content")
+    parser.add_argument("--chunk-interval-ms", type=float, default=20.0, help="delay between streamed chunks")
+    default_config = StubConfig()
+    _profile_args(parser, "openai", default_config.openai)
+    _profile_args(parser, "tavily", default_config.tavily)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        openai=_profile_from_args(args, "openai"),
+        tavily=_profile_from_args(args, "tavily"),
+        seed=args.seed,
+    )
+    config.openai.chunk_interval_ms = args.chunk_interval_ms
+    if args.responses:
+        with open(args.responses) as f:
+            config.responses = json.load(f)
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
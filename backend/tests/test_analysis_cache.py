@@ -0,0 +1,72 @@
+import io
+import os
+import time
+
+import pytest
+
+from app.analysis_cache import AnalysisCache, hash_stream, is_valid_content_hash
+from app.file_analyzer import file_type_of
+
+CONTENT_HASH = "a" * 64
+OTHER_HASH = "b" * 64
+
+def test_hash_stream_matches_across_chunk_sizes():
+    data = os.urandom(10_000)
+    assert hash_stream(io.BytesIO(data), chunk_size=7) == hash_stream(io.BytesIO(data))
+    assert is_valid_content_hash(hash_stream(io.BytesIO(data)))
+
+def test_is_valid_content_hash_rejects_paths():
+    assert not is_valid_content_hash("../" + "a" * 61)
+    assert not is_valid_content_hash("A" * 64)
+
+def test_round_trip(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=1 << 20)
+    assert cache.get(CONTENT_HASH, "csv") is None
+    cache.set(CONTENT_HASH, "csv", {"file_type": "csv", "rows": 3})
+    assert cache.get(CONTENT_HASH, "csv") == {"file_type": "csv", "rows": 3}
+
+def test_same_bytes_as_another_file_type_is_a_miss(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=1 << 20)
+    cache.set(CONTENT_HASH, "csv", {"file_type": "csv"})
+    assert cache.get(CONTENT_HASH, "json") is None
+    assert cache.get(CONTENT_HASH, "txt") is None
+    cache.set(CONTENT_HASH, "json", {"file_type": "json"})
+    assert cache.get(CONTENT_HASH, "csv")["file_type"] == "csv"
+    assert cache.get(CONTENT_HASH, "json")["file_type"] == "json"
+
+def test_file_types_do_not_collide(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=1 << 20)
+    cache.set(CONTENT_HASH, "text/csv", {"file_type": "text/csv"})
+    assert cache.get(CONTENT_HASH, "text_2fcsv") is None
+    assert cache.get(CONTENT_HASH, "text-csv") is None
+
+def test_invalid_keys_raise(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=1 << 20)
+    with pytest.raises(ValueError):
+        cache.get("not-a-hash", "csv")
+    with pytest.raises(ValueError):
+        cache.get(CONTENT_HASH, "x" * 65)
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=250)
+    payload = {"data": "x" * 100}
+    cache.set(CONTENT_HASH, "csv", payload)
+    # Make the first entry clearly older, then touch it with a hit
+    old = time.time() - 100
+    for entry in os.scandir(tmp_path):
+        os.utime(entry.path, (old, old))
+    cache.set(OTHER_HASH, "csv", payload)
+    for entry in os.scandir(tmp_path):
+        if OTHER_HASH in entry.name:
+            os.utime(entry.path, (old - 10, old - 10))
+    assert cache.get(CONTENT_HASH, "csv") == payload
+
+    cache.set("c" * 64, "csv", payload)
+    assert cache.get(CONTENT_HASH, "csv") == payload
+    assert cache.get(OTHER_HASH, "csv") is None
+    assert cache.get("c" * 64, "csv") == payload
+
+def test_file_type_of_prefers_extension():
+    assert file_type_of("Sales.CSV", "application/octet-stream") == "csv"
+    assert file_type_of("notes", "text/plain") == "text/plain"
+    assert file_type_of(None) == ""
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from app.assets import AssetBundle, parse_range
+from app.core.config import BACKEND_DIR, Settings
+from app.pipeline_generator import Component, ComponentRequirements
+
+def test_parse_range_forms():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    # Suffixes longer than the asset and ends past it are clamped
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("BYTES = 1-2", 1000) == (1, 2)
+
+def test_parse_range_ignores_what_it_cannot_serve_as_one_range():
+    for header in ("items=0-1", "bytes=0-1,5-6", "bytes=abc", "bytes=1-x", "bytes=5-1", "bytes=-x", "bytes"):
+        assert parse_range(header, 1000) is None
+
+def test_parse_range_rejects_unsatisfiable_ranges():
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 1000)
+
+def _component(cid, asset):
+    return Component(
+        id=cid, name=cid, type="model", description="", code_snippet="",
+        requirements=ComponentRequirements(dependencies=[], environments=[]),
+        agent={}, model_asset=asset,
+    )
+
+def test_manifest_lists_hashed_urls_once(tmp_path):
+    source = tmp_path / "public"
+    (source / "models").mkdir(parents=True)
+    (source / "models" / "cube.glb").write_bytes(b"glTF" * 500)
+    bundle = AssetBundle(str(source), str(tmp_path / "build"), public_url="https://api.example.com/")
+    bundle.build([_component("a", "/models/cube.glb"), _component("b", "/models/cube.glb"),
+                  _component("c", "/models/missing.glb"), _component("d", "/../outside.glb")])
+
+    manifest = bundle.manifest(["a", "b", "c", "d"])
+    assert manifest[0]["url"].startswith("https://api.example.com/model-assets/cube.")
+    assert manifest[0]["components"] == ["a", "b"]
+    assert bundle.get(manifest[0]["url"].rsplit("/", 1)[1]).sizes["gzip"] < 2000
+    # Unbuilt assets fall back to their catalog path
+    assert [(e["url"], e["components"]) for e in manifest[1:]] == [("/models/missing.glb", ["c"]), ("/../outside.glb", ["d"])]
+
+def test_repo_paths_resolve_against_the_backend(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    settings = Settings()
+    assert settings.ASSETS_DIR == os.path.normpath(os.path.join(BACKEND_DIR, "..", "public"))
+    assert os.path.isfile(settings.COMPONENT_CATALOG_PATH)
+    monkeypatch.setenv("ASSETS_DIR", "/srv/public")
+    assert Settings().ASSETS_DIR == "/srv/public"
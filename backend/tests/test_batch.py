@@ -0,0 +1,27 @@
+import asyncio
+
+from app import batch, scheduler
+from app.api.models import PipelineRequest
+from app.scheduler import UpstreamScheduler, scheduling
+
+def test_batch_waits_for_client_quota_instead_of_failing_items(monkeypatch):
+    monkeypatch.setattr(scheduler, "QUOTA_WINDOW", 0.2)
+    llm = UpstreamScheduler("llm", max_concurrency=4, client_tokens_per_minute=300, client_max_queued=2)
+
+    async def build_pipeline(prompt, *args, **kwargs):
+        async with llm.slot(100):
+            return PipelineRequest(prompt=prompt, mode="quick")
+
+    monkeypatch.setattr(batch, "build_pipeline", build_pipeline)
+    requests = [PipelineRequest(prompt=f"pipeline {i}", mode="quick") for i in range(12)]
+
+    async def scenario():
+        with scheduling(client_id="batch-client"):
+            return [r async for r in batch.generate_pipeline_batch(requests, [], None, concurrency=8)]
+
+    results = asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+    items = [r for r in results if "index" in r]
+    # 12 calls of 100 tokens against a 300-token quota and a 2-call queue limit
+    assert sorted(r["index"] for r in items) == list(range(12))
+    assert all(r["status"] == "ok" for r in items), items
+    assert results[-1]["summary"]["unique_requests"] == 12
@@ -0,0 +1,154 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.cache import Cache, MemoryCacheBackend, RedisCacheBackend, SQLiteCacheBackend, create_cache_backend
+from app.core.config import get_settings
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=3)
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    # Evict on every write so the bound applies immediately
+    backend.EVICTION_INTERVAL = 1
+    return backend
+
+def test_lru_eviction_keeps_non_evictable_entries(backend):
+    jobs = Cache(backend, "jobs", default_ttl=60, evictable=False)
+    search = Cache(backend, "search", default_ttl=60)
+
+    async def scenario():
+        await jobs.set("job", {"status": "running"})
+        for i in range(10):
+            await search.set(str(i), i)
+        return await jobs.get("job"), await search.get("0"), await search.get("9")
+
+    job, oldest, newest = run(scenario())
+    assert job == {"status": "running"}
+    assert oldest is None
+    assert newest == 9
+
+def test_non_evictable_entries_still_expire(backend):
+    jobs = Cache(backend, "jobs", default_ttl=-1, evictable=False)
+
+    async def scenario():
+        await jobs.set("job", {"status": "succeeded"})
+        return await jobs.get("job")
+
+    assert run(scenario()) is None
+
+def test_sqlite_adds_column_to_existing_cache_file(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+    cache = Cache(SQLiteCacheBackend(path, max_entries=10), "jobs", evictable=False)
+
+    async def scenario():
+        await cache.set("job", 1)
+        return await cache.get("job")
+
+    assert run(scenario()) == 1
+
+def test_memory_backend_refused_with_several_workers(monkeypatch):
+    monkeypatch.setattr(get_settings(), "WEB_CONCURRENCY", 4)
+    with pytest.raises(RuntimeError):
+        create_cache_backend("memory")
+    monkeypatch.setattr(get_settings(), "WEB_CONCURRENCY", 1)
+    assert isinstance(create_cache_backend("memory"), MemoryCacheBackend)
+
+def test_sqlite_lock_waits_do_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    backend = SQLiteCacheBackend(path, max_entries=10)
+    cache = Cache(backend, "search", default_ttl=60)
+    run(cache.set("warm", 1))
+    # Another worker holding the write lock makes the next write wait
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        ticks = 0
+        write = asyncio.ensure_future(cache.set("key", 2))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.3, other.execute, "COMMIT")
+        while not write.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await write
+        return ticks, await cache.get("key")
+
+    ticks, value = run(scenario())
+    other.close()
+    run(backend.close())
+    assert ticks >= 10
+    assert value == 2
+
+def test_sqlite_reads_only_refresh_stale_access_times(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    backend = SQLiteCacheBackend(path, max_entries=10)
+    cache = Cache(backend, "search", default_ttl=60)
+
+    def accessed_at():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT accessed_at FROM cache").fetchone()[0]
+
+    run(cache.set("key", 1))
+    written = accessed_at()
+    run(cache.get("key"))
+    assert accessed_at() == written
+    backend.ACCESS_UPDATE_INTERVAL = 0
+    run(cache.get("key"))
+    assert accessed_at() > written
+    run(backend.close())
+
+class FakeRedis:
+    def __init__(self):
+        self.values, self.ttls, self.zset = {}, {}, {}
+
+    async def set(self, key, data, px=None):
+        self.values[key] = data
+        self.ttls[key] = px
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    async def zadd(self, name, mapping):
+        self.zset.update(mapping)
+
+    async def zrangebyscore(self, name, low, high):
+        return [k for k, score in self.zset.items() if low <= score <= high]
+
+    async def zrem(self, name, *keys):
+        for key in keys:
+            self.zset.pop(key, None)
+
+def test_redis_non_evictable_entries_have_no_native_ttl():
+    backend = RedisCacheBackend.__new__(RedisCacheBackend)
+    backend._client = FakeRedis()
+    backend._pinned_writes = 0
+    backend.PURGE_INTERVAL = 2
+
+    async def scenario():
+        await Cache(backend, "search", default_ttl=60).set("result", 1)
+        jobs = Cache(backend, "jobs", default_ttl=-1, evictable=False)
+        await jobs.set("old", {"status": "succeeded"})
+        await Cache(backend, "jobs", default_ttl=60, evictable=False).set("new", {"status": "running"})
+
+    run(scenario())
+    client = backend._client
+    assert client.ttls["search:result"] == 60_000
+    assert client.ttls["jobs:new"] is None
+    # The expired job was purged on the second pinned write
+    assert "jobs:old" not in client.values and set(client.zset) == {"jobs:new"}
@@ -0,0 +1,61 @@
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware, parse_accept_encoding
+
+BODY = b'{"components":[' + b",".join(b'{"id":"component"}' for _ in range(200)) + b"]}"
+
+def _client(**response_kwargs):
+    async def endpoint(request):
+        return Response(**{"content": BODY, "media_type": "application/json", **response_kwargs})
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+def _get(client):
+    return client.get("/", headers={"Accept-Encoding": "gzip"})
+
+def test_parse_accept_encoding_drops_refused_codings():
+    assert parse_accept_encoding("gzip, br;q=0, identity;q=0.5") == ["gzip", "identity"]
+
+def test_large_json_is_gzipped():
+    response = _get(_client())
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+def test_no_compression_without_accept_encoding():
+    response = _client().get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY
+
+def test_small_bodies_pass_through():
+    client = _client(content=b'{"ok":true}')
+    response = _get(client)
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"ok":true}'
+
+def test_event_streams_pass_through():
+    response = _get(_client(media_type="text/event-stream"))
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY
+
+def test_partial_content_passes_through():
+    response = _get(_client(status_code=206, headers={"Content-Range": f"bytes 0-{len(BODY) - 1}/{len(BODY) * 2}"}))
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY
+
+def test_no_transform_passes_through():
+    response = _get(_client(headers={"Cache-Control": "public, no-transform"}))
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY
+
+def test_already_encoded_bodies_pass_through():
+    response = _get(_client(headers={"Content-Encoding": "identity"}))
+    assert response.headers["content-encoding"] == "identity"
+    assert response.content == BODY
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.disconnect import ClientDisconnected, cancel_on_disconnect
+from app.singleflight import SingleFlight
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+class FakeRequest:
+    """Request that reports a disconnect once ``disconnected`` is set."""
+
+    def __init__(self, path="/generate-code"):
+        self.disconnected = asyncio.Event()
+        self.url = type("URL", (), {"path": path})()
+
+    async def is_disconnected(self):
+        return self.disconnected.is_set()
+
+def test_singleflight_shares_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(flights.do("k", fn), flights.do("k", fn), flights.do("other", fn))
+
+    assert run(scenario()) == ["result"] * 3
+    assert len(calls) == 2
+
+def test_singleflight_call_survives_one_waiter_cancelling():
+    flights = SingleFlight()
+    started = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def fn():
+            started.append(1)
+            await gate.wait()
+            return "result"
+
+        first = asyncio.create_task(flights.do("k", fn))
+        second = asyncio.create_task(flights.do("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        return first, await second
+
+    first, result = run(scenario())
+    assert first.cancelled()
+    assert result == "result"
+    assert len(started) == 1
+
+def test_singleflight_call_is_cancelled_with_its_last_waiter():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        waiters = [asyncio.create_task(flights.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        # The cancelled flight is forgotten, so the next caller starts afresh
+        return await flights.do("k", lambda: asyncio.sleep(0, "fresh"))
+
+    assert run(scenario()) == "fresh"
+    assert cancelled == [1]
+
+def test_cancel_on_disconnect_returns_the_result():
+    async def scenario():
+        return await cancel_on_disconnect(FakeRequest(), asyncio.sleep(0.02, "code"), poll_interval=0.005)
+
+    assert run(scenario()) == "code"
+
+def test_cancel_on_disconnect_cancels_the_work():
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        request = FakeRequest()
+        asyncio.get_running_loop().call_later(0.02, request.disconnected.set)
+        await cancel_on_disconnect(request, work(), poll_interval=0.005)
+
+    with pytest.raises(ClientDisconnected):
+        run(scenario())
+    assert cancelled == [1]
+
+def test_cancel_on_disconnect_propagates_errors():
+    async def work():
+        raise ValueError("bad pipeline")
+
+    with pytest.raises(ValueError):
+        run(cancel_on_disconnect(FakeRequest(), work(), poll_interval=0.005))
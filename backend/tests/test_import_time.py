@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.run import IMPORT_TIME_BUDGET
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use, never by importing the app
+LAZY_MODULES = ("openai", "pandas", "numpy")
+
+def _cold_import():
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps([elapsed, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def test_import_app_main_is_within_budget():
+    # Best of three, so one slow run on a busy machine doesn't fail the test
+    elapsed = min(_cold_import()[0] for _ in range(3))
+    assert elapsed < IMPORT_TIME_BUDGET, f"import app.main took {elapsed:.2f}s, budget {IMPORT_TIME_BUDGET}s"
+
+def test_import_app_main_defers_heavy_libraries():
+    _, loaded = _cold_import()
+    assert loaded == []
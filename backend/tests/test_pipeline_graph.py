@@ -0,0 +1,73 @@
+import itertools
+import random
+
+from app.pipeline_graph import DEFAULT_CONTRACTS, _connect, _crossings, _order_layers, pipeline_graph
+
+SCALER = DEFAULT_CONTRACTS["preprocessing"]
+PCA = DEFAULT_CONTRACTS["feature"]
+MODEL = DEFAULT_CONTRACTS["model"]
+EXPORTER = DEFAULT_CONTRACTS["postprocessing"]
+DRIFT = DEFAULT_CONTRACTS["monitoring"]
+
+def _brute_force_crossings(upper, lower, edges):
+    upper_pos = {v: i for i, v in enumerate(upper)}
+    lower_pos = {v: i for i, v in enumerate(lower)}
+    return sum(
+        1 for (a, b), (c, d) in itertools.combinations(edges, 2)
+        if (upper_pos[a] - upper_pos[c]) * (lower_pos[b] - lower_pos[d]) < 0
+    )
+
+def test_connect_chains_a_linear_pipeline():
+    assert _connect([SCALER, PCA, MODEL, EXPORTER]) == [(0, 1, "table"), (1, 2, "features"), (2, 3, "predictions")]
+
+def test_connect_follows_data_flow_not_list_order():
+    edges = _connect([EXPORTER, MODEL, SCALER])
+    assert sorted(edges) == [(1, 0, "predictions"), (2, 1, "table")]
+
+def test_connect_reads_from_the_end_of_each_branch():
+    # Two preprocessing steps chain; the model reads the last one, not both
+    assert _connect([SCALER, SCALER, MODEL]) == [(0, 1, "table"), (1, 2, "table")]
+
+def test_connect_branches_and_merges():
+    # Both models read the features and the exporter reads both models
+    assert sorted(_connect([PCA, MODEL, MODEL, EXPORTER])) == [
+        (0, 1, "features"), (0, 2, "features"), (1, 3, "predictions"), (2, 3, "predictions")
+    ]
+    # With a drift detector after the models, the exporter reads the end of that branch
+    edges = _connect([PCA, MODEL, MODEL, DRIFT, EXPORTER])
+    assert {(1, 3, "predictions"), (2, 3, "predictions")} <= set(edges)
+    assert [(u, t) for u, v, t in edges if v == 4] == [(3, "report")]
+
+def test_connect_without_producers_reads_the_input():
+    assert _connect([MODEL]) == []
+    assert _connect([]) == []
+
+def test_crossings_known_cases():
+    assert _crossings([0, 1], [2, 3], [(0, 2), (1, 3)]) == 0
+    assert _crossings([0, 1], [2, 3], [(0, 3), (1, 2)]) == 1
+    # Edges sharing an endpoint never cross
+    assert _crossings([0, 1], [2], [(0, 2), (1, 2)]) == 0
+    assert _crossings([0], [1, 2], [(0, 1), (0, 2)]) == 0
+
+def test_crossings_match_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        upper = list(range(rng.randint(1, 6)))
+        lower = list(range(10, 10 + rng.randint(1, 6)))
+        rng.shuffle(upper)
+        rng.shuffle(lower)
+        edges = list({(rng.choice(upper), rng.choice(lower)) for _ in range(rng.randint(0, 12))})
+        assert _crossings(upper, lower, edges) == _brute_force_crossings(upper, lower, edges)
+
+def test_order_layers_removes_avoidable_crossings():
+    layers = [[0, 1], [2, 3]]
+    edges = [(0, 3), (1, 2)]
+    ordered = _order_layers(layers, edges)
+    assert _crossings(ordered[0], ordered[1], edges) == 0
+
+def test_pipeline_graph_is_cached_by_contract():
+    components = [{"id": "a", "type": "preprocessing"}, {"id": "b", "type": "model"}]
+    first = pipeline_graph(components)
+    assert pipeline_graph([dict(c, name="renamed") for c in components]) is first
+    assert [c["source"] + c["target"] for c in first["connections"]] == ["ab"]
+    assert first["layout"]["layers"] == [["a"], ["b"]]
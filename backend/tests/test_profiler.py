@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.analysis_cache import AnalysisCache
+from app.api.models import ProfileRequest
+from app.api.profile import profile_pipeline
+from app.profiler import PipelineProfiler, estimator_recipes, scaling_exponent
+
+CODE = """
+raise SystemExit("never executed")
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.ensemble import RandomForestClassifier as RF
+from sklearn.preprocessing import StandardScaler
+from torch.nn import Linear
+
+n = 5
+pca = PCA(n_components=3, whiten=True, svd_solver=n)
+model = RF(n_estimators=100, max_depth=None, class_weight={"a": 1})
+layer = Linear(4, 2)
+"""
+
+def test_estimator_recipes_parse_without_executing():
+    recipes = {r["name"]: r for r in estimator_recipes(CODE)}
+    assert set(recipes) == {"PCA", "RandomForestClassifier", "StandardScaler"}
+    # Only literal arguments are kept
+    assert recipes["PCA"] == {"kind": "sklearn", "module": "sklearn.decomposition", "name": "PCA",
+                              "kwargs": {"n_components": 3, "whiten": True}}
+    assert recipes["RandomForestClassifier"]["kwargs"] == {"n_estimators": 100, "max_depth": None, "class_weight": {"a": 1}}
+    # Imported but never constructed: profiled with defaults
+    assert recipes["StandardScaler"]["kwargs"] == {}
+
+def test_estimator_recipes_of_invalid_code():
+    assert estimator_recipes("def broken(:") == []
+    assert estimator_recipes("import sklearn\nfrom sklearn.utils import check_array") == []
+    assert estimator_recipes("from sklearn.svm import SVC\n\0") == []
+    # Arguments literal_eval rejects with something other than ValueError are skipped too
+    recipes = estimator_recipes("from sklearn.svm import SVC\nSVC(class_weight={[]: 1}, tol={{1}}, C=2)")
+    assert recipes[0]["kwargs"] == {"C": 2}
+
+def test_scaling_exponent():
+    linear = [{"status": "ok", "rows": n, "fit_ms": n / 100} for n in (1_000, 10_000, 100_000)]
+    assert scaling_exponent(linear) == 1.0
+    assert scaling_exponent(linear[:1]) is None
+    assert scaling_exponent([*linear[:1], {"status": "timeout", "rows": 10_000}]) is None
+
+def _http_request(profiler=None):
+    component = SimpleNamespace(id="json_exporter", name="JSON Output Formatter", code_snippet="")
+    state = SimpleNamespace(catalog=[component], profiler=profiler, analysis_cache=None)
+    return SimpleNamespace(app=SimpleNamespace(state=state))
+
+@pytest.mark.parametrize("request_body", [
+    # About 4GB of synthetic data in one run
+    {"components": ["json_exporter"], "sizes": [1_000_000], "columns": 500},
+    # Each run is within the limit but the request isn't
+    {"code": "from sklearn.linear_model import LinearRegression, Ridge, Lasso, ElasticNet, LogisticRegression, Lars",
+     "sizes": [400_000, 200_000, 100_000], "columns": 20},
+])
+def test_profile_requests_are_capped(request_body):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(profile_pipeline(ProfileRequest(**request_body), _http_request()))
+    assert raised.value.status_code == 400
+    assert "cells" in raised.value.detail
+
+@pytest.mark.parametrize("file_type", ["csv", "text/csv"])
+def test_dataset_hash_finds_csv_analyses_by_extension_or_mime_type(tmp_path, file_type):
+    content_hash = "ab" * 32
+    analysis_cache = AnalysisCache(str(tmp_path), max_bytes=1 << 20)
+    analysis_cache.set(content_hash, file_type, {"profile": {"rows": 10, "columns": 1, "numeric_columns": []}})
+    http_request = _http_request()
+    http_request.app.state.analysis_cache = analysis_cache
+
+    request = ProfileRequest(components=["json_exporter"], dataset_hash=content_hash)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(profile_pipeline(request, http_request))
+    # Found (not 404), but has nothing to mimic
+    assert raised.value.status_code == 400
+    assert "numeric columns" in raised.value.detail
+
+def test_measurement_runs_in_its_own_process():
+    profiler = PipelineProfiler(max_workers=1, timeout=60, cache_ttl=60)
+    result = asyncio.run(profiler._measure({"kind": "json_export"}, 100, 4, None, 0))
+    assert result["status"] == "ok" and result["transform_ms"] >= 0
+    assert not profiler._processes
+
+def test_timeout_kills_the_run():
+    pytest.importorskip("sklearn")
+    profiler = PipelineProfiler(max_workers=1, timeout=3.0, cache_ttl=60)
+    recipe = {"kind": "sklearn", "module": "sklearn.ensemble", "name": "RandomForestRegressor",
+              "kwargs": {"n_estimators": 5000}}
+
+    async def scenario():
+        # The second run queues behind the first; its clock starts only once it runs
+        return await asyncio.gather(
+            profiler._measure(recipe, 50_000, 20, None, 0),
+            profiler._measure({"kind": "json_export"}, 100, 4, None, 0),
+        )
+
+    start = time.monotonic()
+    slow, queued = asyncio.run(scenario())
+    assert slow["status"] == "timeout"
+    assert queued["status"] == "ok"
+    assert time.monotonic() - start < 30
+    deadline = time.monotonic() + 5
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not multiprocessing.active_children()
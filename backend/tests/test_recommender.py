@@ -0,0 +1,67 @@
+import json
+import threading
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.pipeline_generator import Component
+from app.recommender import ComponentRecommender
+
+def _catalog():
+    with open(get_settings().COMPONENT_CATALOG_PATH) as f:
+        return [Component(**c) for c in json.load(f)]
+
+def _history(catalog, n):
+    ids = [c.id for c in catalog]
+    return [([ids[i % 5], ids[5 + i % 3], ids[10]], [f"predict churn from data {i % 4}"]) for i in range(n)]
+
+def test_candidate_features_match_full_catalog_rows():
+    recommender = ComponentRecommender(_catalog())
+    recommender.load(_history(recommender.catalog, 30))
+    terms, components = recommender._history[0]
+    candidates = np.array([components[1], 3, 9, components[2]])
+    full = recommender._features(sorted(terms), components[:1], exclude=(terms, components))
+    sampled = recommender._features(sorted(terms), components[:1], exclude=(terms, components), candidates=candidates)
+    assert np.allclose(sampled, full[candidates])
+
+def test_fit_learns_from_history():
+    recommender = ComponentRecommender(_catalog(), min_training_pipelines=20)
+    recommender.load(_history(recommender.catalog, 30))
+    assert recommender.fitted
+    assert np.all(np.isfinite(recommender.weights))
+
+def test_refit_runs_off_the_caller_and_swaps_weights_in(monkeypatch):
+    recommender = ComponentRecommender(_catalog(), min_training_pipelines=20, refit_interval=5)
+    history = _history(recommender.catalog, 30)
+    recommender.load(history[:25])
+    before = recommender.weights
+
+    release = threading.Event()
+    fit_weights = ComponentRecommender._fit_weights
+
+    def slow_fit(self, *args, **kwargs):
+        release.wait(5)
+        return fit_weights(self, *args, **kwargs) * 0 + 1
+
+    monkeypatch.setattr(ComponentRecommender, "_fit_weights", slow_fit)
+    for component_ids, prompts in history[25:]:
+        recommender.observe(component_ids, prompts)
+    # observe returned while the fit is still blocked; ranking keeps using the old weights
+    assert recommender.weights is before
+    assert recommender._refit_thread.is_alive()
+    recommender.recommend("churn")
+
+    release.set()
+    recommender._refit_thread.join(5)
+    assert np.all(recommender.weights == 1)
+
+def test_snapshot_is_not_changed_by_later_observations():
+    recommender = ComponentRecommender(_catalog())
+    history = _history(recommender.catalog, 10)
+    recommender.load(history[:5])
+    snapshot = recommender._snapshot()
+    for component_ids, prompts in history[5:]:
+        recommender.observe(component_ids, prompts, refit=False)
+    assert len(snapshot._history) == 5
+    assert snapshot._component_counts.sum() < recommender._component_counts.sum()
+    assert snapshot._term_totals != recommender._term_totals
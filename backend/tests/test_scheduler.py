@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import (
+    ClientOverQuota,
+    SchedulerContextMiddleware,
+    UpstreamScheduler,
+    current_client_id,
+    estimate_tokens,
+    scheduling,
+)
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+def test_zero_max_concurrency_is_unlimited():
+    scheduler = UpstreamScheduler("llm", max_concurrency=0)
+
+    async def scenario():
+        async with scheduler.slot(), scheduler.slot(), scheduler.slot():
+            return scheduler._active
+
+    assert run(scenario()) == 3
+
+def test_estimate_tokens():
+    params = {"messages": [{"content": "x" * 400}, {"content": "y" * 40}], "max_tokens": 100}
+    assert estimate_tokens(params) == 110 + 100
+
+def test_client_token_quota_retry_after():
+    scheduler = UpstreamScheduler("llm", max_concurrency=4, client_tokens_per_minute=1000)
+
+    async def scenario():
+        with scheduling(client_id="a"):
+            async with scheduler.slot(600):
+                pass
+            async with scheduler.slot(300):
+                pass
+            # 900 used; 200 more doesn't fit until the 600-token charge expires
+            with pytest.raises(ClientOverQuota) as excinfo:
+                async with scheduler.slot(200):
+                    pass
+            # Another client has its own quota
+        with scheduling(client_id="b"):
+            async with scheduler.slot(1000):
+                pass
+        return excinfo.value
+
+    error = run(scenario())
+    assert error.reason == "token quota"
+    assert 59 <= error.retry_after <= 60
+
+def test_call_larger_than_quota_is_allowed_when_idle():
+    scheduler = UpstreamScheduler("llm", max_concurrency=1, client_tokens_per_minute=100)
+
+    async def scenario():
+        async with scheduler.slot(500):
+            return True
+
+    assert run(scenario())
+
+def test_reported_usage_settles_the_estimate():
+    scheduler = UpstreamScheduler("llm", max_concurrency=1, client_tokens_per_minute=1000)
+
+    async def scenario():
+        with scheduling(client_id="a"):
+            async with scheduler.slot(900) as grant:
+                grant.tokens_used = 100
+            # Only 100 tokens were really used, so 800 more fit
+            async with scheduler.slot(800):
+                pass
+
+    run(scenario())
+
+def test_client_max_queued():
+    scheduler = UpstreamScheduler("llm", max_concurrency=1, client_max_queued=1)
+
+    async def scenario():
+        with scheduling(client_id="a"):
+            release = asyncio.Event()
+
+            async def hold():
+                async with scheduler.slot():
+                    await release.wait()
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            queued = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            with pytest.raises(ClientOverQuota) as excinfo:
+                async with scheduler.slot():
+                    pass
+            release.set()
+            await asyncio.gather(holder, queued)
+            return excinfo.value
+
+    assert run(scenario()).reason == "too many queued calls"
+
+def test_interactive_lane_first_then_round_robin():
+    scheduler = UpstreamScheduler("llm", max_concurrency=1)
+    order = []
+
+    async def call(client_id, lane, label):
+        with scheduling(lane=lane, client_id=client_id):
+            async with scheduler.slot():
+                order.append(label)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        calls = [
+            call("a", "background", "bg-a"),
+            call("a", "interactive", "a1"),
+            call("a", "interactive", "a2"),
+            call("b", "interactive", "b1"),
+        ]
+        tasks = [asyncio.create_task(c) for c in calls]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+
+    run(scenario())
+    assert order == ["a1", "b1", "a2", "bg-a"]
+
+def test_tokens_per_minute_bucket_delays_calls():
+    scheduler = UpstreamScheduler("llm", max_concurrency=4, tokens_per_minute=600)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        async with scheduler.slot(600):
+            pass
+        start = loop.time()
+        # The bucket refills at 10 tokens per second
+        async with scheduler.slot(5):
+            return loop.time() - start
+
+    assert 0.3 < run(scenario()) < 2
+
+def _client_id(middleware, peer, header=None):
+    headers = [(b"x-client-id", header.encode())] if header else []
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["client_id"] = current_client_id()
+
+    async def scenario():
+        await SchedulerContextMiddleware(app, **middleware)(
+            {"type": "http", "client": (peer, 1234), "headers": headers}, None, None
+        )
+
+    run(scenario())
+    return seen["client_id"]
+
+def test_client_id_header_ignored_from_untrusted_peers():
+    assert _client_id({}, "203.0.113.5", "rotating-id") == "203.0.113.5"
+    assert _client_id({"trusted_proxies": ["10.0.0.0/8"]}, "203.0.113.5", "rotating-id") == "203.0.113.5"
+
+def test_client_id_header_honoured_from_trusted_proxies():
+    assert _client_id({"trusted_proxies": ["10.0.0.0/8"]}, "10.1.2.3", "user-42") == "user-42"
+    assert _client_id({"trusted_proxies": ["10.0.0.0/8"]}, "10.1.2.3") == "10.1.2.3"
+
+def test_search_quota_rejection_reaches_the_caller(monkeypatch):
+    from contextlib import asynccontextmanager
+    from app import pipeline_generator
+    from app.cache import Cache, MemoryCacheBackend
+
+    class OverQuota:
+        @asynccontextmanager
+        async def slot(self, tokens=0):
+            raise ClientOverQuota(retry_after=3, reason="too many queued calls")
+            yield
+
+    cache = Cache(MemoryCacheBackend(max_entries=10), "search")
+    monkeypatch.setattr(pipeline_generator, "get_cache", lambda *args, **kwargs: cache)
+    monkeypatch.setattr(pipeline_generator, "get_scheduler", lambda upstream: OverQuota())
+    with pytest.raises(ClientOverQuota):
+        run(pipeline_generator.perform_tavily_search("churn prediction"))
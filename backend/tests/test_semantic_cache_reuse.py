@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+from app.core.config import get_settings
+from app.pipeline_generator import (
+    Component,
+    PipelineResponse,
+    adapt_cached_pipeline,
+    component_to_dict,
+    set_pipeline_graph,
+)
+from app.pipeline_store import PipelineStore
+from app.semantic_cache import request_text
+
+def _catalog():
+    with open(get_settings().COMPONENT_CATALOG_PATH) as f:
+        return [Component(**c) for c in json.load(f)]
+
+def test_cache_hit_is_stored_under_the_cached_id(tmp_path):
+    catalog = _catalog()
+    pipeline = PipelineResponse(
+        components=[component_to_dict(c) for c in catalog[:3]],
+        connections=[],
+        name="ML Pipeline for predict churn...",
+        description="Cached pipeline",
+    )
+    set_pipeline_graph(pipeline)
+    store = PipelineStore(str(tmp_path / "pipelines.sqlite3"))
+    cached_id = store.save(pipeline.model_dump(), source={"prompt": "predict churn"})
+
+    adapted = asyncio.run(adapt_cached_pipeline(store.get(cached_id)["pipeline"], "churn prediction", catalog, None))
+    new_id = store.save(adapted.model_dump(), source={"prompt": "churn prediction"})
+
+    assert new_id == cached_id
+    assert [s["prompt"] for s in store.get(cached_id)["sources"]] == ["predict churn", "churn prediction"]
+    store.close()
+
+def test_request_text_includes_clarification_questions():
+    assert request_text("predict churn", {"target": "churned", "data": "csv"}) == (
+        "predict churn data: csv target: churned"
+    )
+    assert request_text("predict churn", {"target": "yes"}) != request_text("predict churn", {"labels": "yes"})
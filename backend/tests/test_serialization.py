@@ -0,0 +1,34 @@
+import json
+
+from app.core.config import get_settings
+from app.pipeline_generator import Component, PipelineResponse, component_to_dict
+from app.serialization import CatalogFragments
+
+def _catalog():
+    with open(get_settings().COMPONENT_CATALOG_PATH) as f:
+        return [Component(**c) for c in json.load(f)]
+
+def test_encode_pipeline_matches_model_dump():
+    catalog = _catalog()
+    pipeline = PipelineResponse(
+        components=[component_to_dict(c) for c in catalog[:3]],
+        connections=[{"source": catalog[0].id, "target": catalog[1].id}],
+        name="Churn",
+        description="Predict churn",
+    )
+    encoded = CatalogFragments(catalog).encode_pipeline(pipeline)
+    assert json.loads(encoded) == json.loads(pipeline.model_dump_json())
+
+def test_encode_pipeline_encodes_edited_catalog_components():
+    catalog = _catalog()
+    fragments = CatalogFragments(catalog)
+    edited = {**component_to_dict(catalog[0]), "code_snippet": "print('edited')"}
+    pipeline = PipelineResponse(
+        components=[edited, component_to_dict(catalog[1])],
+        connections=[],
+        name="Churn",
+        description="Predict churn",
+    )
+    components = json.loads(fragments.encode_pipeline(pipeline))["components"]
+    assert components[0]["code_snippet"] == "print('edited')"
+    assert components[1] == component_to_dict(catalog[1])
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.cache import Cache, MemoryCacheBackend
+from app.sessions import MAX_SESSION_PIPELINES, SessionStore, fingerprint
+
+SESSION_ID = "session-0001"
+
+@pytest.fixture
+def store(monkeypatch):
+    cache = Cache(MemoryCacheBackend(max_entries=100), "sessions", default_ttl=60)
+    monkeypatch.setattr(SessionStore, "cache", property(lambda self: cache))
+    return SessionStore(idle_ttl=60)
+
+def test_fingerprint_is_stable_and_input_sensitive():
+    answers = {"target": "churn", "horizon": "30 days"}
+    assert fingerprint("predict churn", answers) == fingerprint("predict churn", dict(reversed(answers.items())))
+    assert fingerprint("predict churn", answers) != fingerprint("predict churn", {**answers, "horizon": "90 days"})
+    assert fingerprint("a", "b") != fingerprint("ab")
+    assert fingerprint("predict churn", None) != fingerprint("predict churn", {})
+    # Values JSON can't encode are hashed by their string form
+    assert fingerprint(date(2024, 1, 1)) == fingerprint("2024-01-01")
+
+@pytest.mark.parametrize("session_id", ["abcdefgh", "A_b-9" * 4, "x" * 64])
+def test_valid_session_ids(session_id):
+    SessionStore.validate_id(session_id)
+
+@pytest.mark.parametrize("session_id", ["short", "x" * 65, "has space1", "../../etc", "ümlaut123", "abcdefgh\n"])
+def test_invalid_session_ids(session_id):
+    with pytest.raises(ValueError):
+        SessionStore.validate_id(session_id)
+
+def test_checkpoints_resume_only_for_the_same_inputs(store):
+    async def scenario():
+        session = await store.load(SESSION_ID)
+        await session.put("search", fingerprint("predict churn"), {"queries": ["churn"], "results": []})
+        resumed = await store.load(SESSION_ID)
+        return (
+            resumed.get("search", fingerprint("predict churn")),
+            resumed.get("search", fingerprint("predict fraud")),
+            resumed.get("selection", fingerprint("predict churn")),
+        )
+
+    same, changed, missing = asyncio.run(scenario())
+    assert same == {"queries": ["churn"], "results": []}
+    assert changed is None
+    assert missing is None
+
+def test_discard_and_pipeline_history(store):
+    async def scenario():
+        session = await store.load(SESSION_ID)
+        await session.put("selection", "key", ["standard_scaler"])
+        await session.discard("selection")
+        for i in range(MAX_SESSION_PIPELINES + 5):
+            await session.add_pipeline(f"p{i}")
+        await session.add_pipeline("p10")
+        return await store.load(SESSION_ID)
+
+    session = asyncio.run(scenario())
+    assert session.get("selection", "key") is None
+    pipelines = session.state["pipeline_ids"]
+    assert len(pipelines) == MAX_SESSION_PIPELINES
+    assert pipelines[-1] == "p10" and pipelines.count("p10") == 1
+    assert session.summary()["checkpoints"] == {}
+
+def test_load_without_create_and_delete(store):
+    async def scenario():
+        missing = await store.load(SESSION_ID, create=False)
+        await store.load(SESSION_ID)
+        deleted = await store.delete(SESSION_ID)
+        return missing, deleted, await store.delete(SESSION_ID), await store.load(SESSION_ID, create=False)
+
+    assert asyncio.run(scenario()) == (None, True, False, None)
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.config import get_settings
+from app.tracing import TracingMiddleware, profile_path, shutdown_tracing
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(settings, "TRACE_LOG_PATH", str(tmp_path / "traces.jsonl"))
+    shutdown_tracing()
+    app = Starlette(routes=[Route("/", lambda request: PlainTextResponse("ok"))])
+    app.add_middleware(TracingMiddleware)
+    yield TestClient(app)
+    shutdown_tracing()
+
+def test_client_trace_id_is_reused_when_not_profiling(client):
+    response = client.get("/", headers={"X-Trace-Id": "client-trace-0001"})
+    assert response.headers["x-trace-id"] == "client-trace-0001"
+    assert "x-profile-url" not in response.headers
+
+def test_profiled_requests_get_a_server_trace_id(client):
+    headers = {"X-Trace-Id": "client-trace-0001", "X-Profile": "1"}
+    first = client.get("/", headers=headers)
+    second = client.get("/", headers=headers)
+    trace_ids = {first.headers["x-trace-id"], second.headers["x-trace-id"]}
+    assert len(trace_ids) == 2 and "client-trace-0001" not in trace_ids
+    for trace_id in trace_ids:
+        assert os.path.exists(profile_path(trace_id))
+    assert not os.path.exists(profile_path("client-trace-0001"))
+
+def test_profile_path_rejects_unsafe_ids():
+    for trace_id in ("../../etc/passwd", "short", "abcdefgh\n"):
+        with pytest.raises(ValueError):
+            profile_path(trace_id)
@@ -0,0 +1,67 @@
+import json
+
+from app.core.config import get_settings
+from app.pipeline_generator import Component
+from app.transition_index import TransitionIndex
+
+def _catalog():
+    with open(get_settings().COMPONENT_CATALOG_PATH) as f:
+        return [Component(**c) for c in json.load(f)]
+
+def _ids(suggestions):
+    return [s["id"] for s in suggestions]
+
+def test_cold_start_follows_stage_order():
+    index = TransitionIndex(_catalog())
+    first = index.next_components([], limit=3)
+    assert {s["type"] for s in first} == {"preprocessing"}
+    after_model = index.next_components(["transformer_model"], limit=3)
+    assert all(s["type"] in ("postprocessing", "monitoring", "explainability") for s in after_model)
+
+def test_next_components_from_stored_transitions():
+    index = TransitionIndex(_catalog())
+    index.load([["standard_scaler", "pca", "transformer_model"]] * 3, [])
+    suggestions = index.next_components(["standard_scaler"])
+    assert suggestions[0]["id"] == "pca"
+    assert suggestions[0]["reason"] == "Follows Standard Scaler in 3 of 3 stored pipelines"
+    # An unseen two-component context backs off to the last component alone
+    assert index.next_components(["outlier_filter", "standard_scaler"])[0]["id"] == "pca"
+
+def test_next_components_skip_components_already_present():
+    index = TransitionIndex(_catalog())
+    index.load([["standard_scaler", "pca"]] * 3, [])
+    assert "pca" not in _ids(index.next_components(["pca", "standard_scaler"], limit=10))
+
+def test_observe_only_reranks_touched_contexts():
+    index = TransitionIndex(_catalog())
+    index.observe(["standard_scaler", "pca"])
+    untouched = index._next[("^", "standard_scaler")]
+    index.observe(["pca", "transformer_model"])
+    assert index._next[("^", "standard_scaler")] is untouched
+    assert index._next[("^",)] == [("standard_scaler", 0.5), ("pca", 0.5)]
+
+def test_catalog_alternatives_are_symmetric():
+    index = TransitionIndex(_catalog())
+    assert _ids(index.alternatives("min_max_scaler"))[0] == "standard_scaler"
+    assert {"min_max_scaler", "robust_scaler"} <= set(_ids(index.alternatives("standard_scaler"))[:2])
+    assert index.alternatives("unknown") is None
+
+def test_edit_swaps_become_alternatives():
+    index = TransitionIndex(_catalog())
+    index.observe_edit(["standard_scaler", "pca"], ["standard_scaler", "data_validator"])
+    swapped = {s["id"]: s for s in index.alternatives("pca", limit=10)}
+    assert swapped["data_validator"]["reason"] == "Swapped in for PCA in 1 stored edits"
+    # Edits changing more than one component, or the length, are not swaps
+    index.observe_edit(["pca", "shap_explainer"], ["json_exporter", "data_validator"])
+    index.observe_edit(["pca"], ["pca", "json_exporter"])
+    assert "json_exporter" not in _ids(index.alternatives("pca", limit=10))
+
+def test_alternatives_need_a_shared_environment():
+    catalog = _catalog()
+    for c in catalog:
+        if c.id == "robust_scaler":
+            c.requirements.environments = ["R 4.0+"]
+    index = TransitionIndex(catalog)
+    assert "robust_scaler" in _ids(index.alternatives("standard_scaler"))
+    assert "robust_scaler" not in _ids(index.alternatives("standard_scaler", ["standard_scaler", "pca"]))
+    assert "pca" not in _ids(index.alternatives("standard_scaler", ["standard_scaler", "pca"]))
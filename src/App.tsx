@@ -110,11 +110,14 @@ function App() {
   const [aiMode, setAIMode] = useState<'quick' | 'agentic'>('quick');
   const [generatedPipeline, setGeneratedPipeline] = useState<Pipeline | null>(null);
   const [searchSteps, setSearchSteps] = useState<any[]>([]);
+  // Generating the same request again asks for a fresh pipeline instead of a cached one
+  const [lastRequest, setLastRequest] = useState<string | null>(null);
 
   const handleGeneratePipeline = async () => {
     if (prompt.trim()) {
       setCurrentState('loading');
       setSearchSteps([]); // Reset search steps
+      const requestKey = `${aiMode}:${prompt.trim()}`;
       
       try {
         const response = await fetch('http://localhost:8000/generate-pipeline', {
@@ -124,7 +127,8 @@ function App() {
           },
           body: JSON.stringify({ 
             prompt: prompt.trim(),
-            mode: aiMode
+            mode: aiMode,
+            use_cache: requestKey !== lastRequest
           })
         });
 
@@ -141,7 +145,7 @@ function App() {
         }
 
         const pipeline: Pipeline = {
-          id: '1',  // We can generate this on the frontend for now
+          id: data.id,  // Stored pipeline id, usable with /pipelines/{id}
           name: data.name || 'ML Pipeline',
           description: data.description || 'Generated ML Pipeline',
           components: data.components.map((component: any) => ({
@@ -167,6 +171,7 @@ function App() {
         };
 
         setGeneratedPipeline(pipeline);
+        setLastRequest(requestKey);
         setCurrentState('results');
       } catch (error) {
         console.error('Error generating pipeline:', error);